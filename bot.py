@@ -1,10 +1,34 @@
+import time
+# Taken before the heavy imports so the time-to-ready log includes them
+PROCESS_STARTED = time.perf_counter()
+
 import discord
 from discord.ext import commands
 from discord import app_commands
 import os
 import json
 import asyncio
-from datetime import datetime
+import tempfile
+import sqlite3
+import heapq
+import hashlib
+import gzip
+import html
+import logging
+import logging.handlers
+import threading
+import multiprocessing.connection
+import contextvars
+import bisect
+import array
+import functools
+import math
+import re
+import tracemalloc
+import aiohttp
+from aiohttp import web
+from datetime import datetime, timedelta
+from collections import deque, OrderedDict, Counter
 
 # Helper function to add the standard footer to all embeds
 def add_default_footer(embed):
@@ -19,26 +43,37 @@ TICKET_CATEGORIES = [
     {"name": "Diğer", "emoji": "📝"}
 ]
 
+CONFIG_PATH = 'config.json'
+
+# Write JSON to a temp file next to the target and rename it over, so a crash
+# mid-write never leaves a truncated config behind
+def write_json_atomic(path, data):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".config-", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(data if isinstance(data, str) else json.dumps(data, indent=4))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
 # Check if config file exists, create one if it doesn't
 def load_config():
-    if not os.path.exists('config.json'):
+    if not os.path.exists(CONFIG_PATH):
+        # Per-guild settings live in tickets.db (see GuildConfigStore)
         default_config = {
-            "token": "YOUR_BOT_TOKEN_HERE",
-            "ticket_channel_id": None,
-            "ticket_counter": 0,
-            "staff_role_id": None,
-            "ticket_log_channel_id": None,
-            "guild_id": None,
-            "archive_category_id": None,
-            "category_roles": {},  # Map categories to support team role IDs
-            "frozen_tickets": [],   # List of frozen ticket channel IDs
-            "ticket_owners": {}     # Map ticket channel IDs to user IDs
+            "token": "YOUR_BOT_TOKEN_HERE"
         }
-        with open('config.json', 'w') as f:
-            json.dump(default_config, f, indent=4)
+        write_json_atomic(CONFIG_PATH, default_config)
         return default_config
     
-    with open('config.json', 'r') as f:
+    with open(CONFIG_PATH, 'r') as f:
         config = json.load(f)
         
     # Rename closed_category_id to archive_category_id if needed
@@ -46,47 +81,1654 @@ def load_config():
         config["archive_category_id"] = config["closed_category_id"]
         del config["closed_category_id"]
         
-    # Add category_roles if it doesn't exist in older configs
-    if "category_roles" not in config:
-        config["category_roles"] = {}
+    write_json_atomic(CONFIG_PATH, config)
+            
+    return config
+
+# Write-behind store for the config dict. Handlers mutate `config` in place and
+# call save(); the actual disk write is debounced so a burst of ticket events
+# collapses into a single atomic write that runs off the event loop.
+class ConfigStore:
+    def __init__(self, path, data, flush_delay=2.0):
+        self.path = path
+        self.data = data
+        self.flush_delay = flush_delay
+        self.dirty = False
+        self.flush_count = 0
+        self._flush_task = None
+        self._write_lock = None
+    
+    def save(self):
+        """Mark the config dirty and schedule a debounced flush."""
+        self.dirty = True
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop (startup/shutdown) - write straight away
+            self.flush()
+            return
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = loop.create_task(self._flush_later())
+    
+    async def _flush_later(self):
+        await asyncio.sleep(self.flush_delay)
+        await self.flush_async()
+    
+    async def flush_async(self):
+        if self._write_lock is None:
+            self._write_lock = asyncio.Lock()
+        async with self._write_lock:
+            if not self.dirty:
+                return
+            # Snapshot on the loop thread so handlers can keep mutating config
+            payload = json.dumps(self.data, indent=4)
+            self.dirty = False
+            try:
+                await asyncio.to_thread(write_json_atomic, self.path, payload)
+                self.flush_count += 1
+            except Exception as e:
+                self.dirty = True
+                print(f"Config kaydetme hatası: {e}")
+    
+    def flush(self):
+        """Write pending changes synchronously (used on shutdown)."""
+        if not self.dirty:
+            return
+        payload = json.dumps(self.data, indent=4)
+        self.dirty = False
+        write_json_atomic(self.path, payload)
+        self.flush_count += 1
+    
+    async def close(self):
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+        await self.flush_async()
+
+# Cluster mode: cluster.py starts one worker process per shard range and hands
+# it the shard ids and the launcher's IPC address through the environment.
+# Outside cluster mode the process owns every guild.
+CLUSTER_SHARD_IDS = [int(shard_id) for shard_id in os.environ["DISCOSOFT_SHARD_IDS"].split(",")] if os.environ.get("DISCOSOFT_SHARD_IDS") else None
+CLUSTER_SHARD_COUNT = int(os.environ.get("DISCOSOFT_SHARD_COUNT", 0)) or None
+CLUSTER_WORKER_ID = int(os.environ.get("DISCOSOFT_WORKER_ID", 0))
+CLUSTER_WORKERS = int(os.environ.get("DISCOSOFT_WORKERS", 1))
+
+def owns_guild(guild_id):
+    """Whether this worker's shards carry the guild (rows without a guild go to worker 0)."""
+    if CLUSTER_SHARD_IDS is None:
+        return True
+    if guild_id is None:
+        return CLUSTER_WORKER_ID == 0
+    return (guild_id >> 22) % CLUSTER_SHARD_COUNT in CLUSTER_SHARD_IDS
+
+# Link to the cluster.py launcher. Workers report readiness and stats, and
+# anything else they send is relayed to the other workers (e.g. "guild 123's
+# config changed"). A no-op when the bot runs on its own.
+class ClusterClient:
+    def __init__(self):
+        self.handlers = {}
+        self.received = 0
+        self._conn = None
+        self._loop = None
+    
+    @property
+    def connected(self):
+        return self._conn is not None
+    
+    def handler(self, kind):
+        """Decorator registering the callback for messages of `kind` from other workers."""
+        def decorator(func):
+            self.handlers[kind] = func
+            return func
+        return decorator
+    
+    def connect(self):
+        address = os.environ.get("DISCOSOFT_IPC_ADDRESS")
+        if not address or self._conn is not None:
+            return
+        host, port = address.rsplit(":", 1)
+        self._conn = multiprocessing.connection.Client((host, int(port)), authkey=bytes.fromhex(os.environ["DISCOSOFT_IPC_KEY"]))
+        self._loop = asyncio.get_running_loop()
+        # recv() blocks, so it gets its own daemon thread and hands messages to the loop
+        threading.Thread(target=self._read, name="kume-ipc", daemon=True).start()
+        self.send("hello", shard_ids=CLUSTER_SHARD_IDS)
+    
+    def send(self, kind, **data):
+        if self._conn is None:
+            return
+        try:
+            self._conn.send({"kind": kind, "worker_id": CLUSTER_WORKER_ID, **data})
+        except OSError as e:
+            print(f"Küme IPC hatası: {e}")
+    
+    def _read(self):
+        while True:
+            try:
+                message = self._conn.recv()
+            except (EOFError, OSError):
+                print("Küme başlatıcısıyla bağlantı koptu")
+                return
+            self._loop.call_soon_threadsafe(self._dispatch, message)
+    
+    def _dispatch(self, message):
+        self.received += 1
+        handler = self.handlers.get(message.get("kind"))
+        if handler is None:
+            return
+        try:
+            handler(message)
+        except Exception as e:
+            print(f"Küme mesajı işleme hatası ({message.get('kind')}): {e}")
+
+cluster = ClusterClient()
+
+TICKET_DB_PATH = 'tickets.db'
+
+# Ticket state registry backed by SQLite. Every ticket is one row keyed by its
+# channel id, so lookups and status changes touch a single row no matter how
+# many tickets have been opened over the bot's lifetime.
+class TicketStore:
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        # Lets queries skip rows belonging to other cluster workers
+        self.conn.create_function("owns_guild", 1, owns_guild, deterministic=True)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS tickets (
+                channel_id INTEGER PRIMARY KEY,
+                guild_id INTEGER,
+                owner_id INTEGER,
+                category TEXT,
+                number INTEGER,
+                status TEXT NOT NULL DEFAULT 'open',
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                closed_at REAL,
+                closed_by INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS idx_tickets_owner ON tickets(owner_id);
+            CREATE INDEX IF NOT EXISTS idx_tickets_status ON tickets(status);
+            CREATE INDEX IF NOT EXISTS idx_tickets_closed_at ON tickets(status, closed_at);
+            CREATE TABLE IF NOT EXISTS transcripts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                channel_id INTEGER NOT NULL,
+                path TEXT NOT NULL,
+                format TEXT NOT NULL,
+                message_count INTEGER NOT NULL,
+                size_bytes INTEGER NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_transcripts_channel ON transcripts(channel_id);
+        """)
+        self.conn.commit()
         
-    # Add frozen_tickets if it doesn't exist in older configs
-    if "frozen_tickets" not in config:
-        config["frozen_tickets"] = []
+        # (guild_id, owner_id) -> open ticket channel ids, plus the reverse map.
+        # Answers "does this user already have a ticket open?" without a query.
+        self.open_by_owner = {}
+        self.open_owner_of = {}
+        self._load_open_index()
+        # Tickets imported from config.json that still claim to be open. The
+        # legacy map kept closed tickets too, so each one is checked against
+        # its channel the first time that channel is seen (see settle_legacy).
+        self.unsettled = set()
+        self._load_unsettled()
+    
+    def _load_unsettled(self):
+        # Only imported rows lack a ticket number
+        self.unsettled = {
+            row["channel_id"] for row in self.conn.execute(
+                "SELECT channel_id FROM tickets WHERE number IS NULL AND status IN ('open', 'frozen')"
+            )
+        }
+    
+    def _load_open_index(self):
+        self.open_by_owner.clear()
+        self.open_owner_of.clear()
+        rows = self.conn.execute(
+            "SELECT channel_id, guild_id, owner_id FROM tickets "
+            "WHERE status IN ('open', 'frozen') AND owner_id IS NOT NULL AND owns_guild(guild_id)"
+        )
+        for row in rows:
+            self._index_open(row["channel_id"], row["guild_id"], row["owner_id"])
+    
+    def _index_open(self, channel_id, guild_id, owner_id):
+        key = (guild_id, owner_id)
+        self.open_by_owner.setdefault(key, set()).add(channel_id)
+        self.open_owner_of[channel_id] = key
+    
+    def _unindex_open(self, channel_id):
+        key = self.open_owner_of.pop(channel_id, None)
+        if key is None:
+            return
+        channels = self.open_by_owner.get(key)
+        if channels is not None:
+            channels.discard(channel_id)
+            if not channels:
+                del self.open_by_owner[key]
+    
+    def open_tickets_of(self, guild_id, owner_id):
+        return self.open_by_owner.get((guild_id, owner_id), set())
+    
+    def migrate_from_config(self, config):
+        """Move the legacy ticket_owners / frozen_tickets maps out of config.json."""
+        if "ticket_owners" not in config and "frozen_tickets" not in config:
+            return False
+        owners = config.pop("ticket_owners", None) or {}
+        frozen = config.pop("frozen_tickets", None) or []
+        guild_id = config.get("guild_id")
+        now = time.time()
+        # Imported as open; archived ones are closed once their channel is seen
+        with self.conn:
+            for channel_id, owner_id in owners.items():
+                self.conn.execute(
+                    "INSERT OR IGNORE INTO tickets (channel_id, guild_id, owner_id, status, created_at, updated_at) VALUES (?, ?, ?, 'open', ?, ?)",
+                    (int(channel_id), guild_id, owner_id, now, now)
+                )
+            for channel_id in frozen:
+                self.conn.execute(
+                    "INSERT INTO tickets (channel_id, guild_id, status, created_at, updated_at) VALUES (?, ?, 'frozen', ?, ?) "
+                    "ON CONFLICT(channel_id) DO UPDATE SET status = 'frozen', guild_id = COALESCE(guild_id, excluded.guild_id)",
+                    (int(channel_id), guild_id, now, now)
+                )
+        self._load_open_index()
+        self._load_unsettled()
+        print(f"{len(owners)} talep config.json'dan veritabanına taşındı")
+        return True
+    
+    def settle_legacy(self, channel, archived):
+        """Fix up an imported ticket on first sight of its channel: fill in the guild, close it if archived."""
+        if channel.id not in self.unsettled:
+            return
+        self.unsettled.discard(channel.id)
+        with self.conn:
+            self.conn.execute(
+                "UPDATE tickets SET guild_id = ? WHERE channel_id = ? AND guild_id IS NULL",
+                (channel.guild.id, channel.id)
+            )
+        if archived:
+            self.set_status(channel.id, "closed")
+            return
+        owner_id = self.get_owner(channel.id)
+        if owner_id is not None and self.open_owner_of.get(channel.id) != (channel.guild.id, owner_id):
+            self._unindex_open(channel.id)
+            self._index_open(channel.id, channel.guild.id, owner_id)
+    
+    def add_ticket(self, channel_id, guild_id, owner_id, category, number):
+        now = time.time()
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO tickets (channel_id, guild_id, owner_id, category, number, status, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, 'open', ?, ?)",
+                (channel_id, guild_id, owner_id, category, number, now, now)
+            )
+        self._index_open(channel_id, guild_id, owner_id)
+    
+    def get_ticket(self, channel_id):
+        return self.conn.execute("SELECT * FROM tickets WHERE channel_id = ?", (channel_id,)).fetchone()
+    
+    def get_owner(self, channel_id):
+        row = self.conn.execute("SELECT owner_id FROM tickets WHERE channel_id = ?", (channel_id,)).fetchone()
+        return row["owner_id"] if row else None
+    
+    def get_status(self, channel_id):
+        row = self.conn.execute("SELECT status FROM tickets WHERE channel_id = ?", (channel_id,)).fetchone()
+        return row["status"] if row else None
+    
+    def is_frozen(self, channel_id):
+        row = self.conn.execute("SELECT status FROM tickets WHERE channel_id = ?", (channel_id,)).fetchone()
+        return row is not None and row["status"] == "frozen"
+    
+    def set_status(self, channel_id, status, closed_by=None):
+        # Upsert so tickets opened before the registry existed can still change state
+        now = time.time()
+        closed_at = now if status == "closed" else None
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO tickets (channel_id, status, created_at, updated_at, closed_at, closed_by) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(channel_id) DO UPDATE SET status = excluded.status, updated_at = excluded.updated_at, "
+                "closed_at = COALESCE(excluded.closed_at, closed_at), closed_by = COALESCE(excluded.closed_by, closed_by)",
+                (channel_id, status, now, now, closed_at, closed_by)
+            )
+        # Freezing keeps a ticket open; anything else takes it out of the index
+        if status not in ("open", "frozen"):
+            self._unindex_open(channel_id)
+    
+    def oldest_closed(self, closed_before, limit, after=(0, 0)):
+        """Closed tickets whose channel still exists, oldest first (uses the status/closed_at index).
         
-    # Add ticket_owners if it doesn't exist in older configs
-    if "ticket_owners" not in config:
-        config["ticket_owners"] = {}
+        `after` is the (closed_at, channel_id) of the last row already handled, so a
+        caller can page past rows it chose to skip."""
+        return self.conn.execute(
+            "SELECT channel_id, guild_id, closed_at FROM tickets WHERE status = 'closed' AND closed_at < ? "
+            "AND (closed_at, channel_id) > (?, ?) AND owns_guild(guild_id) ORDER BY closed_at, channel_id LIMIT ?",
+            (closed_before, after[0], after[1], limit)
+        ).fetchall()
+    
+    def has_transcript(self, channel_id):
+        return self.conn.execute("SELECT 1 FROM transcripts WHERE channel_id = ? LIMIT 1", (channel_id,)).fetchone() is not None
+    
+    def add_transcript(self, channel_id, path, fmt, message_count, size_bytes):
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO transcripts (channel_id, path, format, message_count, size_bytes, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (channel_id, path, fmt, message_count, size_bytes, time.time())
+            )
+    
+    def get_transcripts(self, channel_id):
+        return self.conn.execute("SELECT * FROM transcripts WHERE channel_id = ?", (channel_id,)).fetchall()
+    
+    def count_by_status(self):
+        rows = self.conn.execute("SELECT status, COUNT(*) AS n FROM tickets GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+    
+    def close(self):
+        self.conn.close()
+
+# Settings that belong to one guild. They used to be top-level config.json keys.
+GUILD_CONFIG_KEYS = (
+    "ticket_channel_id", "ticket_counter", "staff_role_id", "ticket_log_channel_id",
+    "archive_category_id", "archive_overflow_category_ids", "category_roles"
+)
+
+def default_guild_config():
+    return {
+        "ticket_channel_id": None,
+        "ticket_counter": 0,
+        "staff_role_id": None,
+        "ticket_log_channel_id": None,
+        "archive_category_id": None,
+        "archive_overflow_category_ids": [],
+        "category_roles": {}   # Map categories to support team role IDs
+    }
+
+# Per-guild configuration, one JSON row per guild in tickets.db. A guild's
+# settings are read on first use and kept in a bounded LRU, so startup cost
+# and memory don't grow with the number of guilds. Writes go straight to the
+# row; handlers mutate the dict from get() and call save(guild_id).
+class GuildConfigStore:
+    def __init__(self, conn, capacity=1000):
+        self.conn = conn
+        self.capacity = capacity
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.loads = 0
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS guild_configs (
+                guild_id INTEGER PRIMARY KEY,
+                data TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self.conn.commit()
+    
+    def get(self, guild_id):
+        guild_config = self._cache.get(guild_id)
+        if guild_config is not None:
+            self._cache.move_to_end(guild_id)
+            self.hits += 1
+            return guild_config
         
-    with open('config.json', 'w') as f:
-        json.dump(config, f, indent=4)
+        self.loads += 1
+        guild_config = default_guild_config()
+        row = self.conn.execute("SELECT data FROM guild_configs WHERE guild_id = ?", (guild_id,)).fetchone()
+        if row:
+            guild_config.update(json.loads(row["data"]))
+        self._cache[guild_id] = guild_config
+        if len(self._cache) > self.capacity:
+            self._cache.popitem(last=False)
+        return guild_config
+    
+    def save(self, guild_id):
+        guild_config = self.get(guild_id)
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO guild_configs (guild_id, data, updated_at) VALUES (?, ?, ?)",
+                (guild_id, json.dumps(guild_config), time.time())
+            )
+        # Other cluster workers drop their cached copy
+        cluster.send("guild_config", guild_id=guild_id)
+    
+    def invalidate(self, guild_id):
+        self._cache.pop(guild_id, None)
+    
+    def next_ticket_number(self, guild_id):
+        guild_config = self.get(guild_id)
+        guild_config["ticket_counter"] += 1
+        self.save(guild_id)
+        return guild_config["ticket_counter"]
+    
+    def release_ticket_number(self, guild_id, number):
+        """Give back a number whose ticket was never created, unless a later one was taken since."""
+        guild_config = self.get(guild_id)
+        if guild_config["ticket_counter"] == number:
+            guild_config["ticket_counter"] -= 1
+            self.save(guild_id)
+    
+    def migrate_from_config(self, config, guild_id=None):
+        """Move the single-guild settings out of config.json into that guild's row."""
+        guild_id = guild_id or config.get("guild_id")
+        if not any(key in config for key in GUILD_CONFIG_KEYS):
+            return False
+        if not guild_id:
+            # /kurulum never ran, so config.json does not say which guild these belong to
+            print("Uyarı: config.json'daki sunucu ayarlarında guild_id yok; ayarlar sunucu bağlandığında taşınacak")
+            return False
+        guild_config = self.get(guild_id)
+        for key in GUILD_CONFIG_KEYS:
+            if key in config:
+                guild_config[key] = config.pop(key)
+        config.pop("guild_id", None)
+        self.save(guild_id)
+        print(f"Sunucu ayarları ({guild_id}) config.json'dan veritabanına taşındı")
+        return True
+
+# Moderation cases (warnings, timeouts, kicks, bans) per guild member. Cases
+# are indexed on (guild, user, id) so a member's history pages newest-first
+# with a keyset cursor, and a counter row per member holds the number of
+# active warnings, so escalation never has to count cases.
+class ModerationStore:
+    def __init__(self, conn):
+        self.conn = conn
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS mod_cases (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                guild_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                moderator_id INTEGER,
+                action TEXT NOT NULL,
+                reason TEXT,
+                active INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_mod_cases_member ON mod_cases(guild_id, user_id, id);
+            CREATE TABLE IF NOT EXISTS mod_case_counts (
+                guild_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                active_warnings INTEGER NOT NULL DEFAULT 0,
+                total_cases INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (guild_id, user_id)
+            ) WITHOUT ROWID;
+        """)
+        self.conn.commit()
+    
+    def add_case(self, guild_id, user_id, moderator_id, action, reason=None):
+        """Record a case and return (case id, active warnings afterwards)."""
+        warning = 1 if action == "warn" else 0
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO mod_cases (guild_id, user_id, moderator_id, action, reason, active, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (guild_id, user_id, moderator_id, action, reason, warning, time.time())
+            )
+            row = self.conn.execute(
+                "INSERT INTO mod_case_counts (guild_id, user_id, active_warnings, total_cases) VALUES (?, ?, ?, 1) "
+                "ON CONFLICT(guild_id, user_id) DO UPDATE SET active_warnings = active_warnings + excluded.active_warnings, "
+                "total_cases = total_cases + 1 RETURNING active_warnings",
+                (guild_id, user_id, warning)
+            ).fetchone()
+        return cursor.lastrowid, row["active_warnings"]
+    
+    def add_cases(self, guild_id, user_ids, moderator_id, action, reason=None):
+        """Record the same case for many members in one transaction (bulk moderation)."""
+        warning = 1 if action == "warn" else 0
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO mod_cases (guild_id, user_id, moderator_id, action, reason, active, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(guild_id, user_id, moderator_id, action, reason, warning, now) for user_id in user_ids]
+            )
+            self.conn.executemany(
+                "INSERT INTO mod_case_counts (guild_id, user_id, active_warnings, total_cases) VALUES (?, ?, ?, 1) "
+                "ON CONFLICT(guild_id, user_id) DO UPDATE SET active_warnings = active_warnings + excluded.active_warnings, "
+                "total_cases = total_cases + 1",
+                [(guild_id, user_id, warning) for user_id in user_ids]
+            )
+    
+    def counts(self, guild_id, user_id):
+        """(active warnings, total cases) for a member."""
+        row = self.conn.execute(
+            "SELECT active_warnings, total_cases FROM mod_case_counts WHERE guild_id = ? AND user_id = ?",
+            (guild_id, user_id)
+        ).fetchone()
+        return (row["active_warnings"], row["total_cases"]) if row else (0, 0)
+    
+    def clear_active_warnings(self, guild_id, user_id):
+        with self.conn:
+            self.conn.execute(
+                "UPDATE mod_cases SET active = 0 WHERE guild_id = ? AND user_id = ? AND active = 1",
+                (guild_id, user_id)
+            )
+            self.conn.execute(
+                "UPDATE mod_case_counts SET active_warnings = 0 WHERE guild_id = ? AND user_id = ?",
+                (guild_id, user_id)
+            )
+    
+    def history(self, guild_id, user_id, before=None, after=None, limit=10):
+        """One page of a member's cases, newest first, plus whether older and newer ones exist."""
+        if after is not None:
+            rows = self.conn.execute(
+                "SELECT * FROM mod_cases WHERE guild_id = ? AND user_id = ? AND id > ? ORDER BY id LIMIT ?",
+                (guild_id, user_id, after, limit + 1)
+            ).fetchall()
+            has_newer = len(rows) > limit
+            rows = rows[:limit][::-1]
+            has_older = True
+        else:
+            rows = self.conn.execute(
+                "SELECT * FROM mod_cases WHERE guild_id = ? AND user_id = ? AND id < ? ORDER BY id DESC LIMIT ?",
+                (guild_id, user_id, before if before is not None else 2 ** 63 - 1, limit + 1)
+            ).fetchall()
+            has_older = len(rows) > limit
+            rows = rows[:limit]
+            has_newer = before is not None
+        return rows, has_older, has_newer
+
+# Scheduler for delayed ticket actions (close, delete, auto-unfreeze). A single
+# task sleeps until the earliest due action in a heap; actions are persisted
+# in tickets.db so they survive restarts and can be cancelled by kind+channel.
+class ActionScheduler:
+    def __init__(self, conn):
+        self.conn = conn
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS scheduled_actions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                channel_id INTEGER NOT NULL,
+                due_at REAL NOT NULL,
+                payload TEXT
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_actions_target ON scheduled_actions(kind, channel_id)")
+        self.conn.commit()
+        self.handlers = {}
+        self._heap = []
+        self._pending = {}  # (kind, channel_id) -> action id
+        self._wakeup = None
+        self._task = None
+    
+    def handler(self, kind):
+        """Decorator registering the coroutine run when an action of `kind` is due."""
+        def decorator(func):
+            self.handlers[kind] = func
+            return func
+        return decorator
+    
+    def start(self):
+        if self._task and not self._task.done():
+            return
+        self._wakeup = asyncio.Event()
+        self._heap = []
+        self._pending = {}
+        # In cluster mode each worker only runs actions for tickets on its own shards
+        rows = self.conn.execute(
+            "SELECT a.id, a.kind, a.channel_id, a.due_at FROM scheduled_actions a "
+            "LEFT JOIN tickets t ON t.channel_id = a.channel_id WHERE owns_guild(t.guild_id)"
+        )
+        for row in rows:
+            self._push(row["id"], row["kind"], row["channel_id"], row["due_at"])
+        self._task = asyncio.create_task(self._run(), name="zamanlayici")
+    
+    def _push(self, action_id, kind, channel_id, due_at):
+        heapq.heappush(self._heap, (due_at, action_id, kind, channel_id))
+        self._pending[(kind, channel_id)] = action_id
+    
+    def schedule(self, kind, channel_id, delay, payload=None):
+        # Replace any earlier action of the same kind for this channel
+        self.cancel(kind, channel_id)
+        due_at = time.time() + delay
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO scheduled_actions (kind, channel_id, due_at, payload) VALUES (?, ?, ?, ?)",
+                (kind, channel_id, due_at, json.dumps(payload or {}))
+            )
+        self._push(cursor.lastrowid, kind, channel_id, due_at)
+        if self._wakeup:
+            self._wakeup.set()
+        return cursor.lastrowid
+    
+    def cancel(self, kind, channel_id):
+        # Heap entries are dropped lazily once they no longer match _pending
+        action_id = self._pending.pop((kind, channel_id), None)
+        if action_id is None:
+            return False
+        with self.conn:
+            self.conn.execute("DELETE FROM scheduled_actions WHERE id = ?", (action_id,))
+        return True
+    
+    def is_scheduled(self, kind, channel_id):
+        return (kind, channel_id) in self._pending
+    
+    def pending_count(self):
+        return len(self._pending)
+    
+    async def _run(self):
+        await bot.wait_until_ready()
+        while True:
+            # Discard cancelled entries sitting at the top of the heap
+            while self._heap and self._pending.get((self._heap[0][2], self._heap[0][3])) != self._heap[0][1]:
+                heapq.heappop(self._heap)
             
-    return config
+            self._wakeup.clear()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+            
+            delay = self._heap[0][0] - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            
+            due_at, action_id, kind, channel_id = heapq.heappop(self._heap)
+            del self._pending[(kind, channel_id)]
+            row = self.conn.execute("SELECT payload FROM scheduled_actions WHERE id = ?", (action_id,)).fetchone()
+            with self.conn:
+                self.conn.execute("DELETE FROM scheduled_actions WHERE id = ?", (action_id,))
+            
+            handler = self.handlers.get(kind)
+            if handler is None:
+                print(f"Bilinmeyen zamanlanmış işlem: {kind}")
+                continue
+            payload = json.loads(row["payload"]) if row and row["payload"] else {}
+            spawn_background(self._run_handler(kind, handler, channel_id, payload), f"{kind}-{channel_id}")
+    
+    async def _run_handler(self, kind, handler, channel_id, payload):
+        async with metrics.timed(f"scheduled_{kind}"):
+            await handler(channel_id, payload)
 
 config = load_config()
+config_store = ConfigStore(CONFIG_PATH, config)
+
+ticket_store = TicketStore(TICKET_DB_PATH)
+if ticket_store.migrate_from_config(config):
+    config_store.save()
+
+guild_configs = GuildConfigStore(ticket_store.conn, config.get("guild_config_cache_size", 1000))
+if guild_configs.migrate_from_config(config):
+    config_store.save()
+
+mod_cases = ModerationStore(ticket_store.conn)
+
+scheduler = ActionScheduler(ticket_store.conn)
+
+# Delay before a closed ticket is archived, and before an unarchivable one is deleted
+CLOSE_DELAY = 5
+DELETE_DELAY = 3
+
+# Metrics. Handlers are timed into fixed-bucket histograms and REST requests
+# are counted per handler through an aiohttp trace hook. The handler name
+# lives in a context variable, which tasks spawned by a handler inherit, so
+# background work (welcome messages, DMs...) is attributed to it too.
+# Recording is a few counter bumps per event, cheap enough to leave on;
+# the text below is only rendered when /metrics is scraped.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+current_handler = contextvars.ContextVar("current_handler", default="other")
+
+class Histogram:
+    __slots__ = ("counts", "total", "count")
+    
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+    
+    def observe(self, value):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+
+class HandlerTimer:
+    __slots__ = ("metrics", "handler", "started", "token")
+    
+    def __init__(self, metrics, handler):
+        self.metrics = metrics
+        self.handler = handler
+    
+    async def __aenter__(self):
+        self.token = current_handler.set(self.handler)
+        self.started = time.perf_counter()
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        self.metrics.observe(self.handler, time.perf_counter() - self.started)
+        if exc_type is not None and not issubclass(exc_type, asyncio.CancelledError):
+            self.metrics.errors[self.handler] += 1
+        current_handler.reset(self.token)
+        return False
+
+def escape_label_value(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def prometheus_labels(**labels):
+    return "{" + ",".join(f'{key}="{escape_label_value(value)}"' for key, value in labels.items()) + "}"
+
+class Metrics:
+    def __init__(self):
+        self.latency = {}               # handler -> Histogram
+        self.errors = Counter()         # handler -> unhandled exceptions
+        self.rest_requests = Counter()  # handler -> REST requests sent
+        self.rest_rate_limited = Counter()
+        self.loop_lag = Histogram()
+        self.last_loop_lag = 0.0
+        # Gauges sampled at scrape time: name -> (help, callable returning {labels: value} or a number)
+        self.gauges = {}
+        self._runner = None
+    
+    def observe(self, handler, seconds):
+        histogram = self.latency.get(handler)
+        if histogram is None:
+            histogram = self.latency[handler] = Histogram()
+        histogram.observe(seconds)
+    
+    def timed(self, handler):
+        """async with metrics.timed("close_ticket"): ..."""
+        return HandlerTimer(self, handler)
+    
+    def instrumented(self, handler):
+        """Decorator timing a coroutine function as `handler`."""
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                async with HandlerTimer(self, handler):
+                    return await func(*args, **kwargs)
+            return wrapper
+        return decorator
+    
+    def gauge(self, name, help_text, kind="gauge"):
+        """Decorator registering a function sampled on every scrape (kind="counter" for running totals)."""
+        def decorator(func):
+            self.gauges[name] = (help_text, func, kind)
+            return func
+        return decorator
+    
+    def trace_config(self):
+        trace = aiohttp.TraceConfig()
+        
+        async def on_request_end(session, context, params):
+            handler = current_handler.get()
+            self.rest_requests[handler] += 1
+            if params.response.status == 429:
+                self.rest_rate_limited[handler] += 1
+        
+        trace.on_request_end.append(on_request_end)
+        return trace
+    
+    async def monitor_loop_lag(self, interval=0.5):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(interval)
+            self.last_loop_lag = max(0.0, time.perf_counter() - started - interval)
+            self.loop_lag.observe(self.last_loop_lag)
+    
+    def _render_histogram(self, lines, name, histogram, **labels):
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, histogram.counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{prometheus_labels(**labels, le=bound)} {cumulative}")
+        lines.append(f"{name}_bucket{prometheus_labels(**labels, le='+Inf')} {histogram.count}")
+        suffix = prometheus_labels(**labels) if labels else ""
+        lines.append(f"{name}_sum{suffix} {histogram.total}")
+        lines.append(f"{name}_count{suffix} {histogram.count}")
+    
+    def render(self):
+        lines = [
+            "# HELP discosoft_handler_duration_seconds Handler latency.",
+            "# TYPE discosoft_handler_duration_seconds histogram"
+        ]
+        for handler, histogram in sorted(self.latency.items()):
+            self._render_histogram(lines, "discosoft_handler_duration_seconds", histogram, handler=handler)
+        for name, help_text, counter in (
+            ("discosoft_handler_errors_total", "Unhandled handler exceptions.", self.errors),
+            ("discosoft_rest_requests_total", "REST requests, by the handler that caused them.", self.rest_requests),
+            ("discosoft_rest_rate_limited_total", "REST requests answered with 429.", self.rest_rate_limited)
+        ):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for handler, value in sorted(counter.items()):
+                lines.append(f"{name}{prometheus_labels(handler=handler)} {value}")
+        lines.append("# HELP discosoft_event_loop_lag_seconds How late a periodic timer fires.")
+        lines.append("# TYPE discosoft_event_loop_lag_seconds histogram")
+        self._render_histogram(lines, "discosoft_event_loop_lag_seconds", self.loop_lag)
+        for name, (help_text, sample, kind) in self.gauges.items():
+            try:
+                value = sample()
+            except Exception as e:
+                print(f"Metrik okuma hatası ({name}): {e}")
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if isinstance(value, dict):
+                for labels, item in value.items():
+                    lines.append(f"{name}{prometheus_labels(**dict(labels))} {item}")
+            else:
+                lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+    
+    async def start_server(self, host, port):
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle_metrics)
+        app.router.add_get("/healthz", self.handle_healthz)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        print(f"Metrikler http://{host}:{port}/metrics adresinde")
+    
+    async def stop_server(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+    
+    async def handle_metrics(self, request):
+        return web.Response(text=self.render(), content_type="text/plain", headers={"X-Content-Type-Options": "nosniff"})
+    
+    async def handle_healthz(self, request):
+        # Ready: connected to the gateway with a live heartbeat and a responsive loop
+        problems = []
+        if bot.is_closed():
+            problems.append("closed")
+        elif not bot.is_ready():
+            problems.append("not ready")
+        elif not math.isfinite(bot.latency) or bot.latency > 10:
+            problems.append("gateway heartbeat")
+        if self.last_loop_lag > 1:
+            problems.append(f"event loop lag {self.last_loop_lag:.2f}s")
+        body = {"status": "ok" if not problems else "unavailable", "problems": problems}
+        return web.json_response(body, status=200 if not problems else 503)
+
+metrics = Metrics()
 
 # Initialize bot with intents
 intents = discord.Intents.default()
 intents.message_content = True
 intents.members = True
 
-bot = commands.Bot(command_prefix="!", intents=intents)
+# 429s asking for a longer wait than this (discord.py's minimum) are raised as
+# RateLimited instead of slept through, so the REST scheduler can park the bucket
+RATE_LIMIT_PARK_AFTER = 30.0
+
+# AutoShardedBot when cluster.py assigned shards or `sharded` is set in config.json
+SHARDED = CLUSTER_SHARD_IDS is not None or bool(config.get("sharded"))
+
+class DiscosoftBot(commands.AutoShardedBot if SHARDED else commands.Bot):
+    async def close(self):
+        # Drain buffered log entries and config changes before disconnecting
+        try:
+            await log_pipeline.close()
+            await config_store.close()
+            await metrics.stop_server()
+        except Exception as e:
+            print(f"Kapanış hatası: {e}")
+        await super().close()
+
+if CLUSTER_SHARD_IDS is not None:
+    bot = DiscosoftBot(
+        command_prefix="!", intents=intents, http_trace=metrics.trace_config(),
+        max_ratelimit_timeout=RATE_LIMIT_PARK_AFTER,
+        shard_ids=CLUSTER_SHARD_IDS, shard_count=CLUSTER_SHARD_COUNT
+    )
+else:
+    bot = DiscosoftBot(
+        command_prefix="!", intents=intents, http_trace=metrics.trace_config(),
+        max_ratelimit_timeout=RATE_LIMIT_PARK_AFTER
+    )
+
+# Setup process states
+setup_states = {}
+
+# Created in setup_hook, before any interaction can arrive
+ticket_manager = None
+first_ready_logged = False
+
+# Per-guild set of role ids that count as ticket staff (general staff role plus
+# every category support team). Rebuilt lazily after /kurulum, /yetkilirol or
+# /destekekibi invalidate it, so permission checks are a single set lookup.
+class PrivilegedRoleIndex:
+    def __init__(self):
+        self._roles = {}
+    
+    def get(self, guild_id):
+        role_ids = self._roles.get(guild_id)
+        if role_ids is None:
+            role_ids = self._build(guild_id)
+            self._roles[guild_id] = role_ids
+        return role_ids
+    
+    def _build(self, guild_id):
+        guild_config = guild_configs.get(guild_id)
+        role_ids = set()
+        if guild_config["staff_role_id"]:
+            role_ids.add(int(guild_config["staff_role_id"]))
+        for role_id in guild_config["category_roles"].values():
+            role_ids.add(int(role_id))
+        return frozenset(role_ids)
+    
+    def invalidate(self, guild_id=None):
+        if guild_id is None:
+            self._roles.clear()
+        else:
+            self._roles.pop(guild_id, None)
+
+privileged_roles = PrivilegedRoleIndex()
+
+# Admins and members holding any staff/support team role may manage tickets
+def is_privileged_member(member):
+    if member.guild_permissions.administrator:
+        return True
+    # Member._roles holds the raw role ids, which avoids resolving Role objects
+    return not privileged_roles.get(member.guild.id).isdisjoint(member._roles)
+
+# Dispatch table for component custom_ids. Ids look like "<prefix>" or
+# "<prefix>:<argument>"; the prefix selects the handler in one dict lookup and
+# the argument (e.g. the ticket id) is passed along. Ids without a route are
+# left alone and only counted. Clicks reach it through the view store via
+# TicketActionButton and LegacyTicketControlButtons.
+class ComponentRouter:
+    def __init__(self):
+        self.routes = {}
+        self.dispatched = Counter()
+        self.unrouted = 0
+    
+    def route(self, prefix):
+        def decorator(func):
+            self.routes[prefix] = func
+            return func
+        return decorator
+    
+    async def dispatch(self, interaction):
+        custom_id = interaction.data.get("custom_id")
+        if not custom_id:
+            return False
+        prefix, _, argument = custom_id.partition(":")
+        handler = self.routes.get(prefix)
+        if handler is None:
+            self.unrouted += 1
+            return False
+        self.dispatched[prefix] += 1
+        async with metrics.timed(prefix):
+            await handler(interaction, argument or None)
+        return True
+
+component_router = ComponentRouter()
+
+# Resolve the ticket id from a custom_id argument. Buttons created before ids
+# carried it have no argument; they always live in their own ticket channel.
+def resolve_ticket_id(interaction, argument):
+    if argument:
+        try:
+            return int(argument)
+        except ValueError:
+            return None
+    return interaction.channel.id
+
+# Strong references to fire-and-forget tasks so they are not garbage collected
+background_tasks = set()
+
+def _on_background_task_done(task):
+    background_tasks.discard(task)
+    if task.cancelled():
+        return
+    error = task.exception()
+    if error:
+        print(f"Arka plan görevi hatası ({task.get_name()}): {error!r}")
+
+# Run a coroutine in the background and report its errors when it finishes
+def spawn_background(coro, name=None):
+    task = asyncio.create_task(coro, name=name)
+    background_tasks.add(task)
+    task.add_done_callback(_on_background_task_done)
+    return task
+
+# Outgoing REST call priorities (lower runs first)
+PRIORITY_INTERACTION = 0   # interaction replies - the user is waiting on these
+PRIORITY_MUTATION = 1      # channel/member changes (create, edit, kick, ban...)
+PRIORITY_MESSAGE = 2       # messages inside ticket channels
+PRIORITY_BACKGROUND = 3    # log posts and DMs
+
+# Priority scheduler in front of discord.py's HTTP client. Calls are tagged
+# with a priority and a route bucket; each bucket runs one call at a time, the
+# highest-priority runnable call goes first, and non-interaction traffic is
+# paced below the global rate limit and capped at `concurrency` calls in
+# flight (interaction replies are exempt from both). discord.py still handles per-route
+# rate-limit headers and short 429 waits itself; a 429 with a long wait is
+# handed back here, and the bucket is parked for retry_after with the call
+# requeued, so it does not hold a concurrency slot while it waits.
+class RestScheduler:
+    def __init__(self, concurrency=8, global_rate=45):
+        self.concurrency = concurrency
+        self.global_interval = 1 / global_rate
+        self.completed = Counter()
+        self.rate_limited = 0
+        self.wait_totals = Counter()
+        self.wait_max = {}
+        self._heap = []
+        self._seq = 0
+        self._busy = set()
+        self._blocked_until = {}
+        self._running = 0
+        self._next_global_slot = 0.0
+        self._wakeup = None
+        self._task = None
+    
+    def _ensure_started(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run(), name="rest-zamanlayici")
+    
+    async def submit(self, priority, bucket, call):
+        """Queue `call` (a zero-argument coroutine factory) and return its result."""
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        self._seq += 1
+        # The job runs in the scheduler's task, so carry the submitter's handler for the metrics
+        heapq.heappush(self._heap, (priority, self._seq, bucket, call, future, time.monotonic(), current_handler.get()))
+        self._wakeup.set()
+        return await future
+    
+    def _pop_runnable(self, now, interactions_only=False):
+        # Skip over jobs whose bucket is busy or parked; they keep their place
+        deferred = []
+        job = None
+        while self._heap:
+            if interactions_only and self._heap[0][0] != PRIORITY_INTERACTION:
+                break
+            candidate = heapq.heappop(self._heap)
+            bucket = candidate[2]
+            if bucket in self._busy or self._blocked_until.get(bucket, 0) > now:
+                deferred.append(candidate)
+                continue
+            job = candidate
+            break
+        for candidate in deferred:
+            heapq.heappush(self._heap, candidate)
+        return job
+    
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            now = time.monotonic()
+            # Interaction replies have a 3 second window, so they never wait for a
+            # slot held by a slow call (one can sit out a 429 for up to 30 s)
+            job = self._pop_runnable(now, interactions_only=self._running >= self.concurrency)
+            if job is None:
+                # Sleep until something finishes, is submitted or a parked bucket reopens
+                timeout = None
+                parked = [until - now for until in self._blocked_until.values() if until > now]
+                if parked:
+                    timeout = min(parked)
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            
+            priority = job[0]
+            if priority != PRIORITY_INTERACTION:
+                # Interaction callbacks are exempt from the global bot limit
+                delay = self._next_global_slot - now
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                self._next_global_slot = max(now, self._next_global_slot) + self.global_interval
+            
+            self._running += 1
+            self._busy.add(job[2])
+            spawn_background(self._execute(*job), "rest-cagrisi")
+    
+    async def _execute(self, priority, seq, bucket, call, future, queued_at, handler):
+        # This task's context is its own copy, so the set never leaks
+        current_handler.set(handler)
+        waited = time.monotonic() - queued_at
+        self.wait_totals[priority] += waited
+        self.wait_max[priority] = max(self.wait_max.get(priority, 0), waited)
+        requeued = False
+        try:
+            if future.done():
+                return
+            try:
+                result = await call()
+            except discord.RateLimited as e:
+                # Keep the call's place in line; it runs again once the bucket reopens
+                self.rate_limited += 1
+                self._blocked_until[bucket] = time.monotonic() + e.retry_after
+                heapq.heappush(self._heap, (priority, seq, bucket, call, future, queued_at, handler))
+                requeued = True
+                return
+            except discord.HTTPException as e:
+                if e.status == 429:
+                    self.rate_limited += 1
+                    self._blocked_until[bucket] = time.monotonic() + 1
+                error = e
+            except Exception as e:
+                error = e
+            else:
+                if not future.done():
+                    future.set_result(result)
+                return
+            if not future.done():
+                future.set_exception(error)
+        finally:
+            if not requeued:
+                self.completed[priority] += 1
+            self._running -= 1
+            self._busy.discard(bucket)
+            self._wakeup.set()
+    
+    def stats(self):
+        depth = Counter(job[0] for job in self._heap)
+        return {
+            "queue_depth": dict(depth),
+            "running": self._running,
+            "completed": dict(self.completed),
+            "rate_limited": self.rate_limited,
+            "avg_wait_ms": {
+                priority: self.wait_totals[priority] / count * 1000
+                for priority, count in self.completed.items() if count
+            },
+            "max_wait_ms": {priority: wait * 1000 for priority, wait in self.wait_max.items()}
+        }
+
+# The global rate limit is per bot token, so cluster workers split it
+rest_scheduler = RestScheduler(global_rate=45 / CLUSTER_WORKERS)
+
+# Ticket log sinks. Each receives batches of up to 10 (guild_id, embed) pairs.
+class ChannelLogSink:
+    """Posts batches to the configured log channel, one message per batch."""
+    
+    async def write(self, guild_id, embeds):
+        log_channel_id = guild_configs.get(guild_id)["ticket_log_channel_id"]
+        if not log_channel_id:
+            return
+        log_channel = bot.get_channel(log_channel_id)
+        if not log_channel:
+            return
+        await rest_scheduler.submit(
+            PRIORITY_BACKGROUND, f"channels/{log_channel.id}/messages",
+            lambda: log_channel.send(embeds=embeds)
+        )
+    
+    async def write_files(self, guild_id, embed, paths):
+        log_channel_id = guild_configs.get(guild_id)["ticket_log_channel_id"]
+        if not log_channel_id:
+            return
+        log_channel = bot.get_channel(log_channel_id)
+        if not log_channel:
+            return
+        await rest_scheduler.submit(
+            PRIORITY_BACKGROUND, f"channels/{log_channel.id}/messages",
+            lambda: log_channel.send(embed=embed, files=[discord.File(path) for path in paths])
+        )
+
+class WebhookLogSink:
+    """Posts batches through a webhook, which has its own rate limit bucket."""
+    
+    def __init__(self, url):
+        self.url = url
+        self.webhook = None
+    
+    async def write(self, guild_id, embeds):
+        if self.webhook is None:
+            self.webhook = discord.Webhook.from_url(self.url, client=bot)
+        await rest_scheduler.submit(
+            PRIORITY_BACKGROUND, f"webhooks/{self.webhook.id}",
+            lambda: self.webhook.send(embeds=embeds)
+        )
+    
+    async def write_files(self, guild_id, embed, paths):
+        if self.webhook is None:
+            self.webhook = discord.Webhook.from_url(self.url, client=bot)
+        await rest_scheduler.submit(
+            PRIORITY_BACKGROUND, f"webhooks/{self.webhook.id}",
+            lambda: self.webhook.send(embed=embed, files=[discord.File(path) for path in paths])
+        )
+
+class JsonlFileLogSink:
+    """Appends one JSON line per event to a size-rotated local file."""
+    
+    def __init__(self, path, max_bytes=5 * 1024 * 1024, backup_count=5):
+        self.handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True
+        )
+    
+    def _write_lines(self, lines):
+        # handle() takes the handler's lock, so batches and file records
+        # written from different threads never interleave or race a rollover
+        for line in lines:
+            self.handler.handle(logging.makeLogRecord({"msg": line}))
+    
+    async def write(self, guild_id, embeds):
+        now = datetime.now().isoformat(timespec="seconds")
+        lines = [
+            json.dumps({"time": now, "guild_id": guild_id, "embed": embed.to_dict()}, ensure_ascii=False)
+            for embed in embeds
+        ]
+        await asyncio.to_thread(self._write_lines, lines)
+    
+    async def write_files(self, guild_id, embed, paths):
+        # The file itself is already on disk; record where it is
+        line = json.dumps({
+            "time": datetime.now().isoformat(timespec="seconds"),
+            "guild_id": guild_id,
+            "embed": embed.to_dict(),
+            "files": paths
+        }, ensure_ascii=False)
+        await asyncio.to_thread(self._write_lines, [line])
+
+# Discord rejects a message whose embeds add up to more than 6000 characters
+EMBED_TOTAL_LIMIT = 6000
+
+def fit_embed(embed, limit=EMBED_TOTAL_LIMIT):
+    """Return `embed`, or a copy trimmed (description first, then field values) to `limit` characters."""
+    excess = len(embed) - limit
+    if excess <= 0:
+        return embed
+    embed = embed.copy()
+    if embed.description:
+        keep = max(len(embed.description) - excess - 1, 0)
+        excess -= len(embed.description) - keep - 1
+        embed.description = embed.description[:keep] + "…"
+    for index in reversed(range(len(embed.fields))):
+        if excess <= 0:
+            break
+        field = embed.fields[index]
+        keep = max(len(field.value) - excess - 1, 0)
+        excess -= len(field.value) - keep - 1
+        embed.set_field_at(index, name=field.name, value=field.value[:keep] + "…", inline=field.inline)
+    return embed
+
+# Buffers ticket log embeds and flushes them to every sink in batches of up
+# to 10 embeds and 6000 characters (the per-message limits), either every
+# `flush_interval` seconds or as soon as a guild's buffer fills. emit() never
+# waits on the network.
+class LogPipeline:
+    def __init__(self, flush_interval=2.0, batch_size=10, max_buffer=1000):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_buffer = max_buffer
+        self.sinks = []
+        self.events = 0
+        self.batches = 0
+        self.dropped = 0
+        self._buffers = {}
+        self._buffered = 0
+        self._wakeup = None
+        self._task = None
+        self._closing = False
+    
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+    
+    def emit(self, guild_id, embed):
+        if self._buffered >= self.max_buffer:
+            self.dropped += 1
+            return
+        self._ensure_started()
+        buffer = self._buffers.setdefault(guild_id, [])
+        buffer.append(embed)
+        self._buffered += 1
+        self.events += 1
+        if len(buffer) >= self.batch_size:
+            self._wakeup.set()
+    
+    def _ensure_started(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run(), name="log-akisi")
+    
+    async def _run(self):
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+    
+    def _batches(self, embeds):
+        batch, size = [], 0
+        for embed in embeds:
+            embed = fit_embed(embed)
+            if batch and (len(batch) >= self.batch_size or size + len(embed) > EMBED_TOTAL_LIMIT):
+                yield batch
+                batch, size = [], 0
+            batch.append(embed)
+            size += len(embed)
+        if batch:
+            yield batch
+    
+    async def flush(self):
+        buffers, self._buffers = self._buffers, {}
+        self._buffered = 0
+        for guild_id, embeds in buffers.items():
+            for batch in self._batches(embeds):
+                self.batches += 1
+                for sink in self.sinks:
+                    try:
+                        await sink.write(guild_id, batch)
+                    except Exception as e:
+                        print(f"Log gönderme hatası ({type(sink).__name__}): {e}")
+    
+    async def send_files(self, guild_id, embed, paths):
+        """Deliver an embed with file attachments to every sink (not batched)."""
+        for sink in self.sinks:
+            try:
+                await sink.write_files(guild_id, embed, paths)
+            except Exception as e:
+                print(f"Log dosyası gönderme hatası ({type(sink).__name__}): {e}")
+    
+    async def close(self):
+        # Let a flush in progress finish delivering the batch it already took
+        self._closing = True
+        if self._task and not self._task.done():
+            self._wakeup.set()
+            await self._task
+        await self.flush()
+
+log_pipeline = LogPipeline()
+
+# Largest transcript file uploaded to the log sinks; bigger ones stay on disk
+TRANSCRIPT_UPLOAD_LIMIT = 8 * 1024 * 1024
+
+# Writes a ticket channel's history to gzip-compressed JSONL and/or HTML.
+# Messages are streamed from channel.history and flushed to disk in chunks
+# from a worker thread, so memory stays bounded by the chunk size. With
+# `trace_memory` (for benchmarks only - tracemalloc slows every allocation in
+# the process) peak memory is traced while exports run; the tracer is
+# process-wide, so overlapping exports report their shared peak.
+class TranscriptExporter:
+    def __init__(self, directory, formats=("jsonl",), chunk_size=500, trace_memory=False):
+        self.directory = directory
+        self.formats = tuple(formats)
+        self.chunk_size = chunk_size
+        self.trace_memory = trace_memory
+        self._tracing = 0
+    
+    def _start_tracing(self):
+        if not self.trace_memory:
+            return None
+        if self._tracing == 0:
+            if tracemalloc.is_tracing():
+                # Someone else's tracer: leave its peak alone and report nothing
+                return None
+            tracemalloc.start()
+        self._tracing += 1
+        return tracemalloc.get_traced_memory()[0]
+    
+    def _stop_tracing(self, baseline):
+        if baseline is None:
+            return None
+        peak = max(tracemalloc.get_traced_memory()[1] - baseline, 0)
+        self._tracing -= 1
+        if self._tracing == 0:
+            tracemalloc.stop()
+        return peak
+    
+    @staticmethod
+    def serialize(message):
+        return {
+            "id": message.id,
+            "author_id": message.author.id,
+            "author": str(message.author),
+            "created_at": message.created_at.isoformat(),
+            "content": message.content,
+            "attachments": [attachment.url for attachment in message.attachments],
+            "embeds": [embed.to_dict() for embed in message.embeds]
+        }
+    
+    async def iter_messages(self, channel):
+        async for message in channel.history(limit=None, oldest_first=True):
+            yield self.serialize(message)
+    
+    def _open_writers(self, base_path, title):
+        writers = {}
+        if "jsonl" in self.formats:
+            writers["jsonl"] = gzip.open(f"{base_path}.jsonl.gz", "wt", encoding="utf-8")
+        if "html" in self.formats:
+            f = open(f"{base_path}.html", "w", encoding="utf-8")
+            f.write(
+                "<!DOCTYPE html><html><head><meta charset=\"utf-8\">"
+                f"<title>{html.escape(title)}</title></head><body><h1>{html.escape(title)}</h1>\n"
+            )
+            writers["html"] = f
+        return writers
+    
+    @staticmethod
+    def _write_chunk(writers, chunk):
+        if "jsonl" in writers:
+            writers["jsonl"].write("".join(json.dumps(item, ensure_ascii=False) + "\n" for item in chunk))
+        if "html" in writers:
+            parts = []
+            for item in chunk:
+                attachments = "".join(
+                    f'<div><a href="{html.escape(url)}">{html.escape(url)}</a></div>' for url in item["attachments"]
+                )
+                parts.append(
+                    f'<div class="message"><b>{html.escape(item["author"])}</b> '
+                    f'<small>{html.escape(item["created_at"])}</small>'
+                    f'<div>{html.escape(item["content"])}</div>{attachments}</div>\n'
+                )
+            writers["html"].write("".join(parts))
+    
+    @staticmethod
+    def _close_writers(writers):
+        if "html" in writers:
+            writers["html"].write("</body></html>\n")
+        for writer in writers.values():
+            writer.close()
+        return {fmt: writer.name for fmt, writer in writers.items()}
+    
+    async def export(self, channel):
+        """Export the channel and return paths plus count/throughput figures."""
+        os.makedirs(self.directory, exist_ok=True)
+        base_path = os.path.join(self.directory, f"{channel.id}-{int(time.time())}")
+        started = time.perf_counter()
+        baseline = self._start_tracing()
+        count = 0
+        chunk = []
+        try:
+            writers = await asyncio.to_thread(self._open_writers, base_path, f"#{channel.name}")
+            try:
+                async for item in self.iter_messages(channel):
+                    chunk.append(item)
+                    if len(chunk) >= self.chunk_size:
+                        count += len(chunk)
+                        await asyncio.to_thread(self._write_chunk, writers, chunk)
+                        chunk = []
+                if chunk:
+                    count += len(chunk)
+                    await asyncio.to_thread(self._write_chunk, writers, chunk)
+            finally:
+                paths = await asyncio.to_thread(self._close_writers, writers)
+        finally:
+            peak_memory = self._stop_tracing(baseline)
+        elapsed = time.perf_counter() - started
+        return {
+            "paths": paths,
+            "message_count": count,
+            "seconds": elapsed,
+            "messages_per_second": count / elapsed if elapsed > 0 else 0.0,
+            "peak_memory_bytes": peak_memory
+        }
+
+transcript_exporter = TranscriptExporter(
+    config.get("transcript_dir", "transcripts"),
+    config.get("transcript_formats", ["jsonl"]),
+    trace_memory=config.get("transcript_trace_memory", False)
+)
+
+# Export a ticket's transcript, index it in tickets.db and hand it to the log sinks
+async def export_ticket_transcript(channel):
+    result = await transcript_exporter.export(channel)
+    uploads = []
+    for fmt, path in result["paths"].items():
+        size = os.path.getsize(path)
+        ticket_store.add_transcript(channel.id, path, fmt, result["message_count"], size)
+        if size <= TRANSCRIPT_UPLOAD_LIMIT:
+            uploads.append(path)
+    
+    summary = f"Transkript #{channel.name}: {result['message_count']} mesaj, {result['messages_per_second']:.0f} mesaj/sn"
+    if result["peak_memory_bytes"] is not None:
+        summary += f", en yüksek bellek {result['peak_memory_bytes'] / 2**20:.1f} MB"
+    print(summary)
+    
+    embed = discord.Embed(
+        title="Talep Transkripti",
+        description=f"Talep {channel.name} için {result['message_count']} mesaj dışa aktarıldı.",
+        color=discord.Color.dark_grey()
+    )
+    if len(uploads) < len(result["paths"]):
+        embed.add_field(name="Not", value="Bazı dosyalar yükleme sınırını aştığı için sadece sunucuda saklandı.", inline=False)
+    add_default_footer(embed)
+    await log_pipeline.send_files(channel.guild.id, embed, uploads)
+    return result
+
+# TTL/LRU cache of user objects. The gateway cache (bot.get_user) is tried
+# first; fetch_user is only hit on a miss or after the entry expires.
+class UserCache:
+    def __init__(self, max_size=5000, ttl=600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._users = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    async def get(self, user_id):
+        user = bot.get_user(user_id)
+        if user:
+            self.hits += 1
+            return user
+        
+        entry = self._users.get(user_id)
+        if entry and entry[1] > time.monotonic():
+            self._users.move_to_end(user_id)
+            self.hits += 1
+            return entry[0]
+        
+        self.misses += 1
+        user = await bot.fetch_user(user_id)
+        self._users[user_id] = (user, time.monotonic() + self.ttl)
+        self._users.move_to_end(user_id)
+        while len(self._users) > self.max_size:
+            self._users.popitem(last=False)
+        return user
+    
+    async def get_name(self, user_id, default="Kullanıcı"):
+        try:
+            user = await self.get(user_id)
+            return user.name
+        except Exception:
+            return default
+    
+    def __len__(self):
+        return len(self._users)
+
+user_cache = UserCache()
+
+# Bounded DM delivery queue. DMs are sent by a couple of worker tasks with
+# retry and exponential backoff; opened DM channels are cached and users whose
+# DMs are closed are remembered for a while so we stop retrying them.
+class DMQueue:
+    def __init__(self, max_size=1000, workers=2, max_attempts=4, closed_ttl=3600):
+        self.max_size = max_size
+        self.worker_count = workers
+        self.max_attempts = max_attempts
+        self.closed_ttl = closed_ttl
+        self.dm_channels = OrderedDict()
+        self.closed_dms = {}
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self._queue = None
+        self._workers = []
+    
+    def _ensure_workers(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._workers = [w for w in self._workers if not w.done()]
+        while len(self._workers) < self.worker_count:
+            self._workers.append(asyncio.create_task(self._worker(), name="dm-kuyrugu"))
+    
+    def has_closed_dms(self, user_id):
+        until = self.closed_dms.get(user_id)
+        if until is None:
+            return False
+        if until < time.monotonic():
+            del self.closed_dms[user_id]
+            return False
+        return True
+    
+    def enqueue(self, user_id, content=None, embed=None):
+        """Queue a DM without waiting for it to be delivered."""
+        if self.has_closed_dms(user_id):
+            return False
+        self._ensure_workers()
+        try:
+            self._queue.put_nowait((user_id, content, embed))
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            print(f"DM kuyruğu dolu, mesaj atlandı: {user_id}")
+            return False
+    
+    def pending(self):
+        return self._queue.qsize() if self._queue else 0
+    
+    async def _get_dm_channel(self, user_id):
+        channel = self.dm_channels.get(user_id)
+        if channel is None:
+            user = await user_cache.get(user_id)
+            channel = user.dm_channel or await user.create_dm()
+            self.dm_channels[user_id] = channel
+            while len(self.dm_channels) > user_cache.max_size:
+                self.dm_channels.popitem(last=False)
+        else:
+            self.dm_channels.move_to_end(user_id)
+        return channel
+    
+    async def _deliver(self, user_id, content, embed):
+        delay = 1.0
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                channel = await self._get_dm_channel(user_id)
+                await rest_scheduler.submit(
+                    PRIORITY_BACKGROUND, f"channels/{channel.id}/messages",
+                    lambda: channel.send(content=content, embed=embed)
+                )
+                self.sent += 1
+                return
+            except discord.Forbidden:
+                # DMs closed or no mutual guild - retrying will not help
+                self.closed_dms[user_id] = time.monotonic() + self.closed_ttl
+                self.dm_channels.pop(user_id, None)
+                self.failed += 1
+                return
+            except discord.NotFound:
+                self.failed += 1
+                return
+            except (discord.HTTPException, OSError, asyncio.TimeoutError) as e:
+                if attempt == self.max_attempts:
+                    self.failed += 1
+                    print(f"DM gönderme hatası ({user_id}): {e}")
+                    return
+                await asyncio.sleep(delay)
+                delay *= 2
+    
+    async def _worker(self):
+        while True:
+            user_id, content, embed = await self._queue.get()
+            try:
+                await self._deliver(user_id, content, embed)
+            except Exception as e:
+                self.failed += 1
+                print(f"DM gönderme hatası: {e}")
+            finally:
+                self._queue.task_done()
 
-# Setup process states
-setup_states = {}
+dm_queue = DMQueue()
 
-# Helper function to send DM to user
+# Helper function to send DM to user (queued, returns once the DM is accepted)
 async def send_dm_to_user(user_id, message):
-    try:
-        # Get the user
-        user = await bot.fetch_user(user_id)
-        if user:
-            # Send DM
-            await user.send(message)
-            return True
-    except Exception as e:
-        print(f"DM gönderme hatası: {e}")
-        return False
+    return dm_queue.enqueue(user_id, message)
 
 # Ticket Information Modal
 class TicketInfoModal(discord.ui.Modal):
@@ -149,55 +1791,187 @@ class TicketInfoModal(discord.ui.Modal):
             }
         )
 
-# Ticket Control Buttons for close/freeze
+# Ticket action button whose custom_id carries the action and the ticket id
+# ("close_ticket:<ticket_id>"). Registered with bot.add_dynamic_items so
+# discord.py's view store routes clicks on old messages after a restart;
+# the action is then looked up in component_router.
+class TicketActionButton(discord.ui.DynamicItem[discord.ui.Button], template=r"(?P<action>[a-z_]+):(?P<ticket_id>[0-9]+)"):
+    def __init__(self, action, ticket_id, label, style):
+        super().__init__(discord.ui.Button(label=label, style=style, custom_id=f"{action}:{ticket_id}"))
+        self.action = action
+        self.ticket_id = ticket_id
+    
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(match["action"], int(match["ticket_id"]), item.label, item.style)
+    
+    async def callback(self, interaction):
+        await component_router.dispatch(interaction)
+
+# Pager button for /sicil; the custom_id carries the member and the keyset
+# cursor ("case_page:<user_id>:older:<case_id>"), so paging needs no state.
+class CasePageButton(discord.ui.DynamicItem[discord.ui.Button], template=r"case_page:(?P<user_id>[0-9]+):(?P<direction>older|newer):(?P<cursor>[0-9]+)"):
+    def __init__(self, user_id, direction, cursor, disabled=False):
+        label = "Eski ▶" if direction == "older" else "◀ Yeni"
+        super().__init__(discord.ui.Button(
+            label=label, style=discord.ButtonStyle.secondary, disabled=disabled,
+            custom_id=f"case_page:{user_id}:{direction}:{cursor}"
+        ))
+    
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(int(match["user_id"]), match["direction"], int(match["cursor"]))
+    
+    async def callback(self, interaction):
+        await component_router.dispatch(interaction)
+
+# Ticket Control Buttons for close/freeze. The ticket id (its channel id) is
+# carried in the custom_id so handlers never have to work it out again.
 class TicketControlButtons(discord.ui.View):
-    def __init__(self):
+    def __init__(self, ticket_id, frozen=False):
         super().__init__(timeout=None)
         
         # Add close button
-        close_button = discord.ui.Button(
-            label="Talebi Kapat", 
-            style=discord.ButtonStyle.danger, 
-            custom_id="close_ticket"
-        )
-        self.add_item(close_button)
+        self.add_item(TicketActionButton("close_ticket", ticket_id, "Talebi Kapat", discord.ButtonStyle.danger))
         
-        # Add freeze button
-        freeze_button = discord.ui.Button(
-            label="Talebi Dondur", 
-            style=discord.ButtonStyle.primary, 
-            custom_id="freeze_ticket"
-        )
-        self.add_item(freeze_button)
+        # Add freeze button ("Talebi Aç" while the ticket is frozen)
+        self.add_item(TicketActionButton(
+            "freeze_ticket",
+            ticket_id,
+            "Talebi Aç" if frozen else "Talebi Dondur",
+            discord.ButtonStyle.success if frozen else discord.ButtonStyle.primary
+        ))
+
+# Buttons on tickets opened before custom_ids carried the ticket id. Registered
+# as a persistent view so those messages keep working.
+class LegacyTicketControlButtons(discord.ui.View):
+    def __init__(self):
+        super().__init__(timeout=None)
+    
+    @discord.ui.button(label="Talebi Kapat", style=discord.ButtonStyle.danger, custom_id="close_ticket")
+    async def close_ticket(self, interaction, button):
+        await component_router.dispatch(interaction)
+    
+    @discord.ui.button(label="Talebi Dondur", style=discord.ButtonStyle.primary, custom_id="freeze_ticket")
+    async def freeze_ticket(self, interaction, button):
+        await component_router.dispatch(interaction)
+
+# Token buckets keyed by guild or (guild, user). Tokens refill lazily when a
+# key is touched; the least recently used keys are dropped past max_keys,
+# which only ever resets them to a full bucket.
+class TokenBucket:
+    def __init__(self, capacity, refill_seconds, max_keys=10000):
+        self.capacity = capacity
+        self.refill_seconds = refill_seconds
+        self.max_keys = max_keys
+        self.buckets = OrderedDict()
+    
+    def take(self, key):
+        """Take one token; returns 0 when admitted, else seconds until a token is free."""
+        now = time.monotonic()
+        tokens, updated = self.buckets.pop(key, (self.capacity, now))
+        tokens = min(self.capacity, tokens + (now - updated) / self.refill_seconds)
+        if tokens >= 1:
+            self.buckets[key] = (tokens - 1, now)
+            retry_after = 0
+        else:
+            self.buckets[key] = (tokens, now)
+            retry_after = (1 - tokens) * self.refill_seconds
+        if len(self.buckets) > self.max_keys:
+            self.buckets.popitem(last=False)
+        return retry_after
+
+# Ticket creation admission: per user a small burst refilling every few
+# minutes, per guild a larger burst that keeps channel creates well inside
+# Discord's rate limits
+user_ticket_buckets = TokenBucket(config.get("ticket_user_burst", 2), config.get("ticket_user_refill_seconds", 300))
+guild_ticket_buckets = TokenBucket(config.get("ticket_guild_burst", 30), config.get("ticket_guild_refill_seconds", 2))
 
 # Ticket manager class
 class TicketManager:
     def __init__(self, bot):
         self.bot = bot
-        self.ticket_counter = config["ticket_counter"]
+        # (response_ms, total_ms) of recent ticket creations
+        self.creation_latencies = deque(maxlen=100)
+        # (guild_id, user_id) whose ticket channel is being created right now
+        self.pending_creations = set()
+    
+    def open_ticket_of(self, guild, user):
+        """Channel of the user's open ticket in this guild, dropping entries whose channel is gone or archived."""
+        for channel_id in list(ticket_store.open_tickets_of(guild.id, user.id)):
+            channel = guild.get_channel(channel_id)
+            if channel is None:
+                # Deleted while the bot was offline
+                ticket_store.set_status(channel_id, "deleted")
+                continue
+            # An imported ticket may turn out to be archived already
+            settle_legacy_ticket(channel)
+            if channel_id not in ticket_store.open_owner_of:
+                continue
+            if is_archived_ticket_channel(channel):
+                # Archived without the status following (e.g. closed by hand); it must not block the owner
+                ticket_store.set_status(channel_id, "closed")
+                continue
+            return channel_id
+        return None
     
-    def save_ticket_counter(self):
-        config["ticket_counter"] = self.ticket_counter
-        with open('config.json', 'w') as f:
-            json.dump(config, f, indent=4)
+    def admission_error(self, guild, user, take_token=True):
+        """Why this user may not open a ticket right now, or None. Never spends a REST call."""
+        if (guild.id, user.id) in self.pending_creations:
+            return "Talebiniz zaten oluşturuluyor, lütfen bekleyin."
+        open_channel_id = self.open_ticket_of(guild, user)
+        if open_channel_id is not None:
+            return f"Zaten açık bir talebiniz var: <#{open_channel_id}>"
+        if not take_token:
+            return None
+        retry_after = user_ticket_buckets.take((guild.id, user.id))
+        if retry_after:
+            wait = f"{retry_after / 60:.0f} dakika" if retry_after >= 90 else f"{max(retry_after, 1):.0f} saniye"
+            return f"Çok sık talep oluşturuyorsunuz. Lütfen {wait} sonra tekrar deneyin."
+        retry_after = guild_ticket_buckets.take(guild.id)
+        if retry_after:
+            return f"Şu anda çok fazla talep açılıyor. Lütfen {max(retry_after, 1):.0f} saniye sonra tekrar deneyin."
+        return None
     
+    @metrics.instrumented("create_ticket")
     async def create_ticket(self, interaction, category, emoji, user_info=None):
-        self.ticket_counter += 1
-        self.save_ticket_counter()
+        started = time.perf_counter()
         
+        # Tokens were taken when the form was shown; only the open-ticket check
+        # is repeated here, for users who submitted two forms at once
+        error = self.admission_error(interaction.guild, interaction.user, take_token=False)
+        if error:
+            await interaction.response.send_message(error, ephemeral=True)
+            return
+        creation_key = (interaction.guild.id, interaction.user.id)
+        self.pending_creations.add(creation_key)
+        try:
+            await self._create_ticket(interaction, category, emoji, user_info, started)
+        finally:
+            self.pending_creations.discard(creation_key)
+    
+    async def _create_ticket(self, interaction, category, emoji, user_info, started):
         guild = interaction.guild
         user = interaction.user
+        # Channel creation queues behind every other ticket on the guild's
+        # channels bucket; acknowledge first so the 3 second window cannot lapse
+        await rest_scheduler.submit(
+            PRIORITY_INTERACTION, f"interactions/{interaction.id}",
+            lambda: interaction.response.defer(ephemeral=True, thinking=True)
+        )
+        guild_config = guild_configs.get(guild.id)
+        ticket_number = guild_configs.next_ticket_number(guild.id)
         
         # Get general staff role
         staff_role = None
-        if config["staff_role_id"]:
-            staff_role = guild.get_role(config["staff_role_id"])
+        if guild_config["staff_role_id"]:
+            staff_role = guild.get_role(guild_config["staff_role_id"])
         
         # Get category-specific support team role
         support_team_role = None
         support_team_mention = ""
-        if config["category_roles"] and category in config["category_roles"]:
-            role_id = config["category_roles"][category]
+        if guild_config["category_roles"] and category in guild_config["category_roles"]:
+            role_id = guild_config["category_roles"][category]
             support_team_role = guild.get_role(int(role_id))
             if support_team_role:
                 support_team_mention = f"\n\n{support_team_role.mention}, yeni bir destek talebi oluşturuldu!"
@@ -219,21 +1993,71 @@ class TicketManager:
             overwrites[support_team_role] = discord.PermissionOverwrite(read_messages=True, send_messages=True)
         
         # Create ticket channel
-        channel_name = f"talep-{self.ticket_counter}-{user.name}"
-        ticket_channel = await guild.create_text_channel(
-            name=channel_name,
-            overwrites=overwrites,
-            reason=f"Talep {user.name} tarafından oluşturuldu"
-        )
+        channel_name = f"talep-{ticket_number}-{user.name}"
+        try:
+            ticket_channel = await rest_scheduler.submit(
+                PRIORITY_MUTATION, f"guilds/{guild.id}/channels",
+                lambda: guild.create_text_channel(
+                    name=channel_name,
+                    overwrites=overwrites,
+                    reason=f"Talep {user.name} tarafından oluşturuldu"
+                )
+            )
+        except discord.HTTPException as e:
+            # Channel limits (50 per category, 500 per guild), missing permissions...
+            print(f"Talep #{ticket_number} kanal oluşturma hatası: {e}")
+            guild_configs.release_ticket_number(guild.id, ticket_number)
+            if isinstance(e, discord.Forbidden):
+                message = "Talep kanalı oluşturmak için yeterli yetkiye sahip değilim! Lütfen bir yöneticiye bildirin."
+            else:
+                message = "Talep kanalı oluşturulamadı (sunucunun kanal sınırı dolmuş olabilir). Lütfen daha sonra tekrar deneyin veya bir yöneticiye bildirin."
+            try:
+                await rest_scheduler.submit(
+                    PRIORITY_INTERACTION, f"interactions/{interaction.id}",
+                    lambda: interaction.followup.send(message, ephemeral=True)
+                )
+            except discord.HTTPException as e:
+                print(f"Talep #{ticket_number} yanıt hatası: {e}")
+            return
+        
+        # Register the ticket
+        ticket_store.add_ticket(ticket_channel.id, guild.id, user.id, category, ticket_number)
+        
+        # The log entry is buffered by the log pipeline
+        self.log_ticket_created(guild, user, category, emoji, ticket_number, support_team_role, user_info)
         
-        # Store ticket owner in config
-        config["ticket_owners"][str(ticket_channel.id)] = user.id
-        with open('config.json', 'w') as f:
-            json.dump(config, f, indent=4)
+        # Welcome embed and owner DM run concurrently in the background; they
+        # start before the reply so a failed reply cannot leave the ticket bare
+        tasks = [
+            spawn_background(
+                self.send_welcome_message(ticket_channel, user, category, emoji, ticket_number, support_team_mention, user_info),
+                f"talep-{ticket_number}-karsilama"
+            ),
+            spawn_background(
+                send_dm_to_user(user.id, f"Merhaba {user.name}, talebiniz şu anda açıktır. Destek ekibimiz en kısa sürede size yardımcı olacaktır."),
+                f"talep-{ticket_number}-dm"
+            )
+        ]
+        
+        # Notify user as soon as the channel exists - everything else is off the critical path
+        try:
+            await rest_scheduler.submit(
+                PRIORITY_INTERACTION, f"interactions/{interaction.id}",
+                lambda: interaction.followup.send(f"Talep oluşturuldu! {ticket_channel.mention} kanalını kontrol edin", ephemeral=True)
+            )
+        except discord.HTTPException as e:
+            print(f"Talep #{ticket_number} yanıt hatası: {e}")
+        responded = time.perf_counter()
         
+        spawn_background(
+            self.report_creation_latency(ticket_number, started, responded, tasks),
+            f"talep-{ticket_number}-sure"
+        )
+    
+    async def send_welcome_message(self, ticket_channel, user, category, emoji, ticket_number, support_team_mention, user_info):
         # Create initial embed
         embed = discord.Embed(
-            title=f"{emoji} Talep #{self.ticket_counter} - {category}",
+            title=f"{emoji} Talep #{ticket_number} - {category}",
             description=f"Talep oluşturduğunuz için teşekkürler, {user.mention}!\nDestek ekibimiz en kısa sürede sizinle ilgilenecektir.{support_team_mention}",
             color=discord.Color.blue()
         )
@@ -248,34 +2072,38 @@ class TicketManager:
             embed.add_field(name="Talep Sebebi", value=user_info["reason"], inline=False)
         
         # Create view with ticket control buttons
-        view = TicketControlButtons()
-        
-        await ticket_channel.send(embed=embed, view=view)
+        view = TicketControlButtons(ticket_channel.id)
         
-        # Notify user
-        await interaction.response.send_message(f"Talep oluşturuldu! {ticket_channel.mention} kanalını kontrol edin", ephemeral=True)
+        await rest_scheduler.submit(
+            PRIORITY_MESSAGE, f"channels/{ticket_channel.id}/messages",
+            lambda: ticket_channel.send(embed=embed, view=view)
+        )
+    
+    def log_ticket_created(self, guild, user, category, emoji, ticket_number, support_team_role, user_info):
+        # Log ticket creation
+        log_embed = discord.Embed(
+            title=f"{emoji} Talep Oluşturuldu",
+            description=f"Talep #{ticket_number} {user.mention} tarafından oluşturuldu\nKategori: {category}",
+            color=discord.Color.green()
+        )
+        add_default_footer(log_embed)
+        if user_info:
+            log_embed.add_field(name="İletişim", value=f"{user_info['first_name']} {user_info['last_name']} ({user_info['email']})", inline=False)
         
-        # Send DM to user
-        await send_dm_to_user(user.id, f"Merhaba {user.name}, talebiniz şu anda açıktır. Destek ekibimiz en kısa sürede size yardımcı olacaktır.")
+        # Add support team information
+        if support_team_role:
+            log_embed.add_field(name="Destek Ekibi", value=support_team_role.mention, inline=False)
         
-        # Log ticket creation if log channel is set
-        if config["ticket_log_channel_id"]:
-            log_channel = guild.get_channel(config["ticket_log_channel_id"])
-            if log_channel:
-                log_embed = discord.Embed(
-                    title=f"{emoji} Talep Oluşturuldu",
-                    description=f"Talep #{self.ticket_counter} {user.mention} tarafından oluşturuldu\nKategori: {category}",
-                    color=discord.Color.green()
-                )
-                add_default_footer(log_embed)
-                if user_info:
-                    log_embed.add_field(name="İletişim", value=f"{user_info['first_name']} {user_info['last_name']} ({user_info['email']})", inline=False)
-                
-                # Add support team information
-                if support_team_role:
-                    log_embed.add_field(name="Destek Ekibi", value=support_team_role.mention, inline=False)
-                
-                await log_channel.send(embed=log_embed)
+        log_pipeline.emit(guild.id, log_embed)
+    
+    async def report_creation_latency(self, ticket_number, started, responded, tasks):
+        # Wait for the fan-out to settle; errors are reported by the tasks themselves
+        await asyncio.wait(tasks)
+        finished = time.perf_counter()
+        response_ms = (responded - started) * 1000
+        total_ms = (finished - started) * 1000
+        self.creation_latencies.append((response_ms, total_ms))
+        print(f"Talep #{ticket_number}: yanıt {response_ms:.0f} ms, toplam {total_ms:.0f} ms")
 
 # Ticket View with category selection dropdown
 class TicketView(discord.ui.View):
@@ -305,30 +2133,565 @@ class CategorySelect(discord.ui.Select):
         category_info = next((c for c in TICKET_CATEGORIES if c["name"] == selected_category), None)
         
         if category_info:
+            # Reject duplicates and floods before the form is even shown
+            error = ticket_manager.admission_error(interaction.guild, interaction.user)
+            if error:
+                await interaction.response.send_message(error, ephemeral=True)
+                return
+            
             # Show modal form for user info
             await interaction.response.send_modal(TicketInfoModal(category_info["name"], category_info["emoji"]))
 
-# Event listeners
-@bot.event
-async def on_ready():
-    print(f"{bot.user.name} hazır!")
+# Hash of the slash command definitions; the tree is only synced when it changes.
+# The application id is included so switching to another bot token re-syncs.
+def command_tree_hash():
+    commands_payload = [command.to_dict(bot.tree) for command in bot.tree.get_commands()]
+    commands_payload.sort(key=lambda command: command["name"])
+    payload = {"application_id": bot.application_id, "commands": commands_payload}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+async def sync_command_tree():
+    tree_hash = command_tree_hash()
+    if config.get("command_tree_hash") == tree_hash:
+        print("Slash komutları değişmedi, senkronizasyon atlandı")
+        return
     try:
         await bot.tree.sync()
+        config["command_tree_hash"] = tree_hash
+        config_store.save()
         print("Slash komutları senkronize edildi!")
     except Exception as e:
         print(f"Komutları senkronize ederken hata oluştu: {e}")
+
+def log_startup_phase(name, started):
+    print(f"Başlatma - {name}: {(time.perf_counter() - started) * 1000:.0f} ms")
+
+# Gauges sampled on every /metrics scrape
+@metrics.gauge("discosoft_gateway_latency_seconds", "Gateway heartbeat latency.")
+def gateway_latency_gauge():
+    return bot.latency if math.isfinite(bot.latency) else -1
+
+@metrics.gauge("discosoft_guilds", "Guilds on this process.")
+def guilds_gauge():
+    return len(bot.guilds)
+
+@metrics.gauge("discosoft_tickets", "Tickets by status.")
+def tickets_gauge():
+    return {(("status", status),): count for status, count in ticket_store.count_by_status().items()}
+
+@metrics.gauge("discosoft_cache_entries", "Entries held in in-memory caches.")
+def cache_entries_gauge():
+    return {
+        (("cache", "guild_configs"),): len(guild_configs._cache),
+        (("cache", "users"),): len(user_cache),
+        (("cache", "privileged_roles"),): len(privileged_roles._roles),
+        (("cache", "open_tickets"),): len(ticket_store.open_owner_of),
+        (("cache", "dm_channels"),): len(dm_queue.dm_channels),
+        (("cache", "discord_messages"),): len(bot.cached_messages),
+        (("cache", "spam_users"),): len(automod.spam) if automod.spam is not None else 0
+    }
+
+@metrics.gauge("discosoft_queue_depth", "Work waiting in internal queues.")
+def queue_depth_gauge():
+    return {
+        (("queue", "rest"),): len(rest_scheduler._heap),
+        (("queue", "dm"),): dm_queue.pending(),
+        (("queue", "log"),): log_pipeline._buffered,
+        (("queue", "scheduled_actions"),): scheduler.pending_count(),
+        (("queue", "background_tasks"),): len(background_tasks)
+    }
+
+# Event listeners
+@bot.event
+async def setup_hook():
+    # One-time initialization; runs once per process, before the gateway connects
+    phase_started = time.perf_counter()
     
     # Initialize the ticket manager
     global ticket_manager
     ticket_manager = TicketManager(bot)
+    
+    # Persistent views: ticket panels and control buttons keep working after a restart
+    bot.add_view(TicketView())
+    bot.add_view(LegacyTicketControlButtons())
+    bot.add_dynamic_items(TicketActionButton, CasePageButton)
+    log_startup_phase("talep yöneticisi ve kalıcı görünümler", phase_started)
+    
+    # Ticket log sinks: log channel always, webhook and local file when configured
+    log_pipeline.add_sink(ChannelLogSink())
+    if config.get("log_webhook_url"):
+        log_pipeline.add_sink(WebhookLogSink(config["log_webhook_url"]))
+    if config.get("log_file"):
+        log_pipeline.add_sink(JsonlFileLogSink(config["log_file"]))
+    
+    # Start the delayed-action scheduler
+    phase_started = time.perf_counter()
+    scheduler.start()
+    retention_sweeper.start()
+    log_startup_phase(f"zamanlayıcı ({scheduler.pending_count()} bekleyen işlem)", phase_started)
+    
+    # Metrics: loop lag is always sampled; the HTTP endpoint only when a port is configured
+    spawn_background(metrics.monitor_loop_lag(), "dongu-gecikmesi")
+    spawn_background(watch_moderation_settings(), "moderasyon-ayarlari")
+    if config.get("metrics_port"):
+        try:
+            # Cluster workers each take the next port up
+            await metrics.start_server(config.get("metrics_host", "127.0.0.1"), config["metrics_port"] + CLUSTER_WORKER_ID)
+        except OSError as e:
+            print(f"Metrik sunucusu başlatılamadı: {e}")
+    
+    # Cluster workers: join the launcher; only worker 0 touches the global command tree
+    cluster.connect()
+    if cluster.connected:
+        spawn_background(report_cluster_stats(), "kume-istatistik")
+    if CLUSTER_WORKER_ID == 0:
+        phase_started = time.perf_counter()
+        await sync_command_tree()
+        log_startup_phase("komut senkronizasyonu", phase_started)
+
+@bot.event
+async def on_ready():
+    # on_ready fires again after every gateway reconnect, so keep it light
+    global first_ready_logged
+    print(f"{bot.user.name} hazır!")
+    if not first_ready_logged:
+        first_ready_logged = True
+        log_startup_phase("ilk hazır olma süresi", PROCESS_STARTED)
+        # The launcher waits for this before starting the next worker's shards
+        cluster.send("ready", guilds=len(bot.guilds))
+
+async def report_cluster_stats(interval=30):
+    await bot.wait_until_ready()
+    while not bot.is_closed():
+        cluster.send(
+            "stats",
+            guilds=len(bot.guilds),
+            latency_ms=round(bot.latency * 1000, 1) if bot.latency == bot.latency else None,
+            open_tickets=len(ticket_store.open_owner_of),
+            guild_configs_cached=len(guild_configs._cache)
+        )
+        await asyncio.sleep(interval)
+
+# Another worker changed a guild's settings: drop everything derived from them
+@cluster.handler("guild_config")
+def on_cluster_guild_config(message):
+    guild_id = message["guild_id"]
+    guild_configs.invalidate(guild_id)
+    privileged_roles.invalidate(guild_id)
+    archive_allocator.reset(guild_id)
+
+@cluster.handler("shutdown")
+def on_cluster_shutdown(message):
+    spawn_background(bot.close(), "kume-kapanis")
+
+# Discord caps a guild at 500 channels (categories included)
+GUILD_CHANNEL_LIMIT = 500
+CAPACITY_WARN_COOLDOWN = 6 * 3600
+# A retention row that failed to export or delete is retried after this long
+SWEEP_RETRY_DELAY = 3600
+
+# Deletes archived ticket channels older than `archive_retention_days`
+# (exporting a transcript first unless one exists) and warns when the guild is
+# running out of channel slots. Works through the tickets table's
+# (status, closed_at) index in small batches, paced and at background REST
+# priority so it never competes with interactive traffic.
+class RetentionSweeper:
+    def __init__(self, interval=600, batch_size=10, delete_spacing=2.0, warn_slots=50):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.delete_spacing = delete_spacing
+        self.warn_slots = warn_slots
+        self.deleted = 0
+        self.failed = 0
+        self._warned_at = {}
+        self._retry_at = {}  # channel_id -> monotonic time of the next attempt after a failure
+        self._task = None
+    
+    @staticmethod
+    def slots_remaining(guild):
+        return GUILD_CHANNEL_LIMIT - len(guild.channels)
+    
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="arsiv-temizleyici")
+    
+    async def _run(self):
+        await bot.wait_until_ready()
+        while True:
+            try:
+                await self.sweep()
+                self.check_capacity()
+            except Exception as e:
+                print(f"Arşiv temizleme hatası: {e}")
+            await asyncio.sleep(self.interval)
+    
+    async def sweep(self):
+        retention_days = config.get("archive_retention_days")
+        if not retention_days:
+            return 0
+        cutoff = time.time() - retention_days * 86400
+        removed = 0
+        after = (0, 0)
+        while True:
+            rows = ticket_store.oldest_closed(cutoff, self.batch_size, after)
+            if not rows:
+                break
+            # Failed rows keep their status, so page past them instead of re-reading them
+            after = (rows[-1]["closed_at"], rows[-1]["channel_id"])
+            for row in rows:
+                channel_id = row["channel_id"]
+                if self._retry_at.get(channel_id, 0) > time.monotonic():
+                    continue
+                try:
+                    deleted = await self.remove(channel_id)
+                except Exception as e:
+                    # One channel we cannot export or delete must not hold up the rest
+                    self.failed += 1
+                    self._retry_at[channel_id] = time.monotonic() + SWEEP_RETRY_DELAY
+                    print(f"Arşiv temizleme hatası ({channel_id}): {e}")
+                    continue
+                self._retry_at.pop(channel_id, None)
+                if deleted:
+                    removed += 1
+                    await asyncio.sleep(self.delete_spacing)
+        if removed:
+            print(f"Arşiv temizleme: {removed} eski talep kanalı silindi")
+        return removed
+    
+    async def remove(self, channel_id):
+        channel = bot.get_channel(channel_id)
+        if channel is not None:
+            if config.get("retention_export", True) and not ticket_store.has_transcript(channel_id):
+                await export_ticket_transcript(channel)
+            try:
+                await rest_scheduler.submit(
+                    PRIORITY_BACKGROUND, f"channels/{channel_id}",
+                    lambda: channel.delete(reason="Arşiv saklama süresi doldu")
+                )
+            except discord.NotFound:
+                # Already gone; all that is left is the bookkeeping below
+                channel = None
+            else:
+                self.deleted += 1
+        ticket_store.set_status(channel_id, "deleted")
+        return channel is not None
+    
+    def check_capacity(self):
+        for guild in bot.guilds:
+            remaining = self.slots_remaining(guild)
+            if remaining > self.warn_slots:
+                continue
+            # Log at most every six hours per guild
+            now = time.monotonic()
+            if now - self._warned_at.get(guild.id, -CAPACITY_WARN_COOLDOWN) < CAPACITY_WARN_COOLDOWN:
+                continue
+            self._warned_at[guild.id] = now
+            print(f"Uyarı: {guild.name} sunucusunda yalnızca {remaining} kanal yeri kaldı")
+            embed = discord.Embed(
+                title="Kanal Sınırı Yaklaşıyor",
+                description=(
+                    f"Sunucuda {GUILD_CHANNEL_LIMIT} kanal sınırına {remaining} kanal kaldı. "
+                    "Yeni talepler açılamayabilir; `archive_retention_days` ayarıyla eski arşivleri otomatik silebilirsiniz."
+                ),
+                color=discord.Color.orange()
+            )
+            add_default_footer(embed)
+            log_pipeline.emit(guild.id, embed)
+
+retention_sweeper = RetentionSweeper()
+
+# Deleted channels free their archive slot and their owner's open-ticket entry
+@bot.event
+async def on_guild_channel_delete(channel):
+    # A ticket channel deleted by hand no longer counts as its owner's open ticket
+    if channel.id in ticket_store.open_owner_of:
+        ticket_store.set_status(channel.id, "deleted")
+    if channel.category_id:
+        archive_allocator.release(channel.guild.id, channel.category_id)
 
 # Message handler for setup process
+# Spam detection for moderation.auto_mod.spam_protection. Each (guild, user)
+# gets a fixed ring of their last few messages in one array('Q'), each entry
+# packed into 64 bits: arrival time in ms (32 bits), a hash of the normalised
+# content (20 bits) and a hash of the channel (12 bits). One pass over the
+# ring finds message-rate floods, the same text posted repeatedly and the same
+# text posted across channels. Nothing older than the longest window can
+# change a verdict, so members idle longer than that are dropped from the
+# front of the LRU, and max_users caps it outright: memory follows the number
+# of members posting right now, not the size of the guild.
+SPAM_TIME_MASK = 0xFFFFFFFF
+SPAM_CONTENT_MASK = 0xFFFFF
+SPAM_CHANNEL_MASK = 0xFFF
+
+class SpamDetector:
+    def __init__(self, max_messages=5, interval=5.0, duplicates=3, duplicate_interval=30.0,
+                 channels=3, channel_interval=15.0, max_users=100000):
+        self.max_messages = max_messages
+        self.duplicates = duplicates
+        self.channels = channels
+        self.interval_ms = int(interval * 1000)
+        self.duplicate_ms = int(duplicate_interval * 1000)
+        self.channel_ms = int(channel_interval * 1000)
+        self.horizon_ms = max(self.interval_ms, self.duplicate_ms, self.channel_ms)
+        self.size = max(max_messages, duplicates, channels)
+        self.max_users = max_users
+        self.evicted = 0
+        self._users = OrderedDict()  # (guild_id << 64) | user_id -> ring, slot `size` counts writes
+        self._empty_ring = array.array("Q", bytes(8 * (self.size + 1)))
+        self._epoch = time.monotonic()
+    
+    def __len__(self):
+        return len(self._users)
+    
+    def observe(self, guild_id, user_id, channel_id, content, now=None):
+        """Record a message; returns "spam_rate", "spam_duplicate", "spam_cross_channel" or None."""
+        now_ms = int(((time.monotonic() if now is None else now) - self._epoch) * 1000) & SPAM_TIME_MASK
+        size = self.size
+        key = (guild_id << 64) | user_id
+        users = self._users
+        ring = users.get(key)
+        if ring is None:
+            ring = users[key] = array.array("Q", self._empty_ring)
+        else:
+            users.move_to_end(key)
+        
+        # 0 marks "no text" (attachments, stickers), so real text never hashes to it
+        digest = 0
+        if content:
+            digest = hash(" ".join(content.casefold().split())) & SPAM_CONTENT_MASK or 1
+        # Channel ids differ in their timestamp bits; the low 12 of those are spread well enough
+        channel = (channel_id >> 22) & SPAM_CHANNEL_MASK
+        
+        count = ring[size]
+        ring[count % size] = (now_ms << 32) | (digest << 12) | channel
+        count += 1
+        ring[size] = count
+        self._evict(now_ms)
+        
+        recent = same_content = 0
+        content_channels = set()
+        for index in range(min(count, size)):
+            entry = ring[index]
+            age = (now_ms - (entry >> 32)) & SPAM_TIME_MASK
+            if age <= self.interval_ms:
+                recent += 1
+            if digest and (entry >> 12) & SPAM_CONTENT_MASK == digest:
+                if age <= self.duplicate_ms:
+                    same_content += 1
+                if age <= self.channel_ms:
+                    content_channels.add(entry & SPAM_CHANNEL_MASK)
+        
+        if len(content_channels) >= self.channels:
+            return "spam_cross_channel"
+        if same_content >= self.duplicates:
+            return "spam_duplicate"
+        if recent >= self.max_messages:
+            return "spam_rate"
+        return None
+    
+    def _evict(self, now_ms):
+        users = self._users
+        size = self.size
+        while users:
+            key = next(iter(users))
+            ring = users[key]
+            last = ring[(ring[size] - 1) % size] >> 32
+            if len(users) <= self.max_users and (now_ms - last) & SPAM_TIME_MASK <= self.horizon_ms:
+                return
+            del users[key]
+            self.evicted += 1
+
+# Auto-moderation for the filters toggled in the GUI (moderation.auto_mod).
+# Enabled filters are compiled once per settings change: the text filters
+# become one regex with a named group each, so a message's content is
+# scanned once, and caps/mentions are plain counts. Exempt channels, exempt
+# roles and staff return before any of that.
+AUTOMOD_PATTERNS = {
+    "invite_filter": r"(?:discord(?:app)?\.com/invite|discord\.gg|dsc\.gg)/[\w-]+",
+    "link_filter": r"https?://[^\s<]+|www\.[^\s<]+"
+}
+AUTOMOD_REASONS = {
+    "spam_rate": "Çok hızlı mesaj gönderimi",
+    "spam_duplicate": "Aynı mesajı tekrar tekrar göndermek",
+    "spam_cross_channel": "Aynı mesajı birçok kanala göndermek",
+    "invite_filter": "Sunucu daveti paylaşmak yasak",
+    "link_filter": "Bağlantı paylaşmak yasak",
+    "caps_filter": "Çok fazla büyük harf",
+    "mass_mention_filter": "Çok fazla etiket"
+}
+AUTOMOD_NOTICE_COOLDOWN = 30
+
+class AutoModEngine:
+    def __init__(self):
+        self.enabled = False
+        self.pattern = None
+        self.caps = None
+        self.max_mentions = None
+        self.spam = None
+        self.exempt_channels = frozenset()
+        self.exempt_roles = frozenset()
+        self.hits = Counter()
+        self.checked = 0
+        self.compiles = 0
+        self._notified = OrderedDict()
+    
+    def configure(self, moderation):
+        moderation = moderation or {}
+        flags = moderation.get("auto_mod") or {}
+        # Invites come first so an invite link counts as an invite, not a plain link
+        groups = [f"(?P<{name}>{pattern})" for name, pattern in AUTOMOD_PATTERNS.items() if flags.get(name)]
+        self.pattern = re.compile("|".join(groups), re.IGNORECASE) if groups else None
+        self.caps = (moderation.get("caps_min_length", 10), moderation.get("caps_ratio", 0.7)) if flags.get("caps_filter") else None
+        self.max_mentions = moderation.get("max_mentions", 5) if flags.get("mass_mention_filter") else None
+        self.spam = None
+        if flags.get("spam_protection"):
+            self.spam = SpamDetector(
+                max_messages=moderation.get("spam_max_messages", 5),
+                interval=moderation.get("spam_interval", 5),
+                duplicates=moderation.get("spam_duplicates", 3),
+                duplicate_interval=moderation.get("spam_duplicate_interval", 30),
+                channels=moderation.get("spam_channels", 3),
+                channel_interval=moderation.get("spam_channel_interval", 15),
+                max_users=moderation.get("spam_max_users", 100000)
+            )
+        self.exempt_channels = frozenset(int(channel_id) for channel_id in moderation.get("exempt_channel_ids", []))
+        self.exempt_roles = frozenset(int(role_id) for role_id in moderation.get("exempt_role_ids", []))
+        self.enabled = bool(moderation.get("enabled")) and any(
+            (self.pattern is not None, self.caps is not None, self.max_mentions is not None, self.spam is not None)
+        )
+        self.compiles += 1
+    
+    def check(self, message):
+        """Name of the filter the message breaks, or None."""
+        if not self.enabled or message.channel.id in self.exempt_channels:
+            return None
+        author = message.author
+        if not isinstance(author, discord.Member) or not self.exempt_roles.isdisjoint(author._roles) or is_privileged_member(author):
+            return None
+        self.checked += 1
+        
+        # Every message goes into the spam rings, even ones another filter removes
+        rule = None
+        if self.spam is not None:
+            rule = self.spam.observe(message.guild.id, author.id, message.channel.id, message.content)
+        if rule is None:
+            rule = self._check_content(message)
+        
+        if rule:
+            self.hits[rule] += 1
+        return rule
+    
+    def _check_content(self, message):
+        # Mentions are already parsed out of the payload
+        if self.max_mentions is not None and (
+            message.mention_everyone or len(message.mentions) + len(message.role_mentions) >= self.max_mentions
+        ):
+            return "mass_mention_filter"
+        content = message.content
+        if self.pattern is not None:
+            match = self.pattern.search(content)
+            if match:
+                return match.lastgroup
+        if self.caps is not None and len(content) >= self.caps[0]:
+            letters = sum(map(str.isalpha, content))
+            if letters >= self.caps[0] and sum(map(str.isupper, content)) >= letters * self.caps[1]:
+                return "caps_filter"
+        return None
+    
+    def should_notify(self, guild_id, user_id):
+        """At most one channel notice per member per cooldown; the map stays bounded."""
+        key = (guild_id, user_id)
+        now = time.monotonic()
+        last = self._notified.get(key)
+        if last is not None and now - last < AUTOMOD_NOTICE_COOLDOWN:
+            return False
+        self._notified[key] = now
+        self._notified.move_to_end(key)
+        while len(self._notified) > 10000:
+            self._notified.popitem(last=False)
+        return True
+
+automod = AutoModEngine()
+automod.configure(config.get("moderation"))
+
+@metrics.gauge("discosoft_automod_hits_total", "Messages removed by auto-moderation, by filter.", kind="counter")
+def automod_hits_counter():
+    return {(("filter", rule),): count for rule, count in automod.hits.items()}
+
+async def enforce_automod(message, rule):
+    try:
+        await rest_scheduler.submit(
+            PRIORITY_MUTATION, f"channels/{message.channel.id}/messages/single-delete",
+            lambda: message.delete()
+        )
+    except discord.NotFound:
+        return
+    except discord.HTTPException as e:
+        print(f"Otomatik moderasyon silme hatası: {e}")
+        return
+    
+    reason = AUTOMOD_REASONS.get(rule, rule)
+    if automod.should_notify(message.guild.id, message.author.id):
+        # A flood keeps tripping the detector; time the member out once per cooldown
+        if rule.startswith("spam_"):
+            mute_duration = moderation_settings()[1]
+            try:
+                await rest_scheduler.submit(
+                    PRIORITY_MUTATION, f"guilds/{message.guild.id}/members",
+                    lambda: message.author.timeout(timedelta(seconds=min(mute_duration, 28 * 24 * 3600)), reason=f"{reason} (otomatik)")
+                )
+                mod_cases.add_case(message.guild.id, message.author.id, bot.user.id, "timeout", f"{reason} (otomatik)")
+            except discord.HTTPException as e:
+                print(f"Spam susturma hatası: {e}")
+        await rest_scheduler.submit(
+            PRIORITY_BACKGROUND, f"channels/{message.channel.id}/messages",
+            lambda: message.channel.send(f"{message.author.mention}, mesajınız silindi: {reason}.", delete_after=5)
+        )
+    
+    log_embed = discord.Embed(
+        title="🛡️ Otomatik Moderasyon",
+        description=f"{message.author.mention} kullanıcısının {message.channel.mention} kanalındaki mesajı silindi.",
+        color=discord.Color.orange(),
+        timestamp=datetime.now()
+    )
+    log_embed.add_field(name="Sebep", value=reason, inline=True)
+    if message.content:
+        log_embed.add_field(name="Mesaj", value=message.content[:1024], inline=False)
+    add_default_footer(log_embed)
+    log_pipeline.emit(message.guild.id, log_embed)
+
+# The GUI edits config.json while the bot runs; pick up moderation changes
+# and recompile the auto-mod filters when the file changes
+async def watch_moderation_settings(interval=15):
+    last_mtime = None
+    while True:
+        try:
+            mtime = os.path.getmtime(CONFIG_PATH)
+            if last_mtime is not None and mtime != last_mtime:
+                with open(CONFIG_PATH, "r", encoding="utf-8") as f:
+                    moderation = json.load(f).get("moderation")
+                if moderation is not None and moderation != config.get("moderation"):
+                    config["moderation"] = moderation
+                    automod.configure(moderation)
+                    print("Moderasyon ayarları yeniden yüklendi")
+            last_mtime = mtime
+        except (OSError, ValueError) as e:
+            print(f"Moderasyon ayarları okunamadı: {e}")
+        await asyncio.sleep(interval)
+
 @bot.event
 async def on_message(message):
     # Don't respond to bot messages
     if message.author.bot:
         return
     
+    # Auto-moderation; a removed message goes no further
+    if message.guild is not None:
+        rule = automod.check(message)
+        if rule:
+            spawn_background(enforce_automod(message, rule), "otomatik-moderasyon")
+            return
+    
     # Check if this user is in setup process
     if message.author.id in setup_states and setup_states[message.author.id]["waiting_for_archive_id"]:
         try:
@@ -336,9 +2699,11 @@ async def on_message(message):
             archive_id = int(message.content.strip())
             
             # Save the archive category ID
-            config["archive_category_id"] = archive_id
-            with open('config.json', 'w') as f:
-                json.dump(config, f, indent=4)
+            guild_config = guild_configs.get(message.guild.id)
+            guild_config["archive_category_id"] = archive_id
+            guild_config["archive_overflow_category_ids"] = []
+            guild_configs.save(message.guild.id)
+            archive_allocator.reset(message.guild.id)
             
             # Get the category and check if it's valid
             archive_category = message.guild.get_channel(archive_id)
@@ -374,170 +2739,449 @@ async def on_message(message):
     # Process commands as usual
     await bot.process_commands(message)
 
-# Button interaction handler
-@bot.event
-async def on_interaction(interaction):
-    if interaction.type == discord.InteractionType.component:
-        custom_id = interaction.data.get("custom_id")
-        
-        if custom_id == "close_ticket":
-            # Handle ticket closing
-            await handle_close_ticket(interaction)
-            
-        elif custom_id == "freeze_ticket":
-            # Handle ticket freezing/unfreezing
-            await handle_freeze_ticket(interaction)
+# Discord allows at most 50 channels in one category
+ARCHIVE_CATEGORY_LIMIT = 50
+
+# Hands out archive categories for closed tickets. The configured archive
+# category is the first of a pool; when every category in the pool is full a
+# new overflow category is created. Occupancy is counted in memory (loaded
+# once per guild from the pool's categories only) and each placement is an
+# O(1) look at the first category that still has room.
+class ArchiveAllocator:
+    def __init__(self):
+        self._occupancy = {}   # category id -> channels in it
+        self._open = {}        # guild id -> deque of category ids with room
+        self._create_locks = {}
+        self.created = 0
+    
+    def _pool_ids(self, guild_id):
+        guild_config = guild_configs.get(guild_id)
+        pool = []
+        if guild_config["archive_category_id"]:
+            pool.append(guild_config["archive_category_id"])
+        pool.extend(guild_config["archive_overflow_category_ids"])
+        return pool
+    
+    def _load(self, guild):
+        open_ids = deque()
+        for category_id in self._pool_ids(guild.id):
+            category = guild.get_channel(category_id)
+            if isinstance(category, discord.CategoryChannel):
+                self._occupancy[category_id] = len(category.channels)
+                if self._occupancy[category_id] < ARCHIVE_CATEGORY_LIMIT:
+                    open_ids.append(category_id)
+        self._open[guild.id] = open_ids
+        return open_ids
+    
+    def _take_slot(self, guild):
+        open_ids = self._open.get(guild.id)
+        if open_ids is None:
+            open_ids = self._load(guild)
+        while open_ids:
+            category = guild.get_channel(open_ids[0])
+            if not isinstance(category, discord.CategoryChannel):
+                self._occupancy.pop(open_ids.popleft(), None)
+                continue
+            self._occupancy[category.id] += 1
+            if self._occupancy[category.id] >= ARCHIVE_CATEGORY_LIMIT:
+                open_ids.popleft()
+            return category
+        return None
+    
+    async def allocate(self, guild):
+        """Reserve a slot in an archive category, creating an overflow one if needed."""
+        category = self._take_slot(guild)
+        if category is not None or not self._pool_ids(guild.id):
+            return category
+        
+        create_lock = self._create_locks.setdefault(guild.id, asyncio.Lock())
+        async with create_lock:
+            # Another close may have created a category while we waited
+            category = self._take_slot(guild)
+            if category is not None:
+                return category
+            
+            template = next(
+                (guild.get_channel(category_id) for category_id in self._pool_ids(guild.id)
+                 if isinstance(guild.get_channel(category_id), discord.CategoryChannel)),
+                None
+            )
+            if template is None:
+                return None
+            
+            name = f"{template.name} {len(self._pool_ids(guild.id)) + 1}"
+            category = await rest_scheduler.submit(
+                PRIORITY_MUTATION, f"guilds/{guild.id}/channels",
+                lambda: guild.create_category(name, overwrites=template.overwrites, reason="Arşiv kategorisi doldu")
+            )
+            guild_configs.get(guild.id)["archive_overflow_category_ids"].append(category.id)
+            guild_configs.save(guild.id)
+            self.created += 1
+            
+            self._occupancy[category.id] = 1
+            self._open.setdefault(guild.id, deque()).append(category.id)
+            return category
+    
+    def release(self, guild_id, category_id):
+        """Give back a slot (channel deleted from, or never moved into, the category)."""
+        if category_id not in self._occupancy:
+            return
+        was_full = self._occupancy[category_id] >= ARCHIVE_CATEGORY_LIMIT
+        self._occupancy[category_id] = max(0, self._occupancy[category_id] - 1)
+        open_ids = self._open.get(guild_id)
+        if was_full and open_ids is not None and category_id not in open_ids:
+            open_ids.append(category_id)
+    
+    def is_archive_category(self, guild_id, category_id):
+        return category_id is not None and category_id in self._pool_ids(guild_id)
+    
+    def mark_full(self, guild_id, category_id):
+        """Discord rejected a move: our count was stale, treat the category as full."""
+        self._occupancy[category_id] = ARCHIVE_CATEGORY_LIMIT
+        open_ids = self._open.get(guild_id)
+        if open_ids is not None and category_id in open_ids:
+            open_ids.remove(category_id)
+    
+    def reset(self, guild_id):
+        for category_id in self._open.pop(guild_id, ()):
+            self._occupancy.pop(category_id, None)
+
+archive_allocator = ArchiveAllocator()
+
+def is_archived_ticket_channel(channel):
+    """Closed tickets are renamed kapali-... and moved into the archive pool."""
+    return channel.name.startswith("kapali-") or archive_allocator.is_archive_category(channel.guild.id, channel.category_id)
+
+def settle_legacy_ticket(channel):
+    if channel is not None and channel.id in ticket_store.unsettled:
+        ticket_store.settle_legacy(channel, is_archived_ticket_channel(channel))
+
+# Imported tickets are checked as soon as their guild's channels are cached, so
+# archived ones become closed (and eventually swept) without being touched
+def owns_legacy_guild_config(guild):
+    """Whether config.json's guild-less legacy settings belong to this guild."""
+    if not any(key in config for key in GUILD_CONFIG_KEYS):
+        return False
+    channel_ids = [config.get("ticket_channel_id"), config.get("ticket_log_channel_id"), config.get("archive_category_id")]
+    channel_ids.extend(config.get("archive_overflow_category_ids") or [])
+    channel_ids = [channel_id for channel_id in channel_ids if channel_id]
+    role_id = config.get("staff_role_id")
+    if not channel_ids and not role_id:
+        # Nothing to recognise the guild by (e.g. only the counter): take the first one
+        return True
+    return any(guild.get_channel(channel_id) for channel_id in channel_ids) or bool(role_id and guild.get_role(role_id))
+
+@bot.event
+async def on_guild_available(guild):
+    # Settings written before /kurulum recorded a guild_id go to the guild they point at
+    if owns_legacy_guild_config(guild) and guild_configs.migrate_from_config(config, guild.id):
+        config_store.save()
+        privileged_roles.invalidate(guild.id)
+        archive_allocator.reset(guild.id)
+    for channel_id in list(ticket_store.unsettled):
+        settle_legacy_ticket(guild.get_channel(channel_id))
+
+# Compute the final overwrites, name and category of a ticket channel and
+# return only the channel.edit() fields that would actually change
+def plan_channel_edit(channel, member_send_messages=None, member_filter=None, name=None, category=None):
+    edit = {}
+    
+    if member_send_messages is not None:
+        overwrites = {}
+        changed = False
+        for target, overwrite in channel.overwrites.items():
+            planned = discord.PermissionOverwrite.from_pair(*overwrite.pair())
+            if isinstance(target, discord.Member) and (member_filter is None or member_filter(target)):
+                planned.send_messages = member_send_messages
+                if planned != overwrite:
+                    changed = True
+            overwrites[target] = planned
+        if changed:
+            edit["overwrites"] = overwrites
+    
+    if name is not None and name != channel.name:
+        edit["name"] = name
+    
+    if category is not None and channel.category_id != category.id:
+        edit["category"] = category
+    
+    return edit
+
+# Apply a planned edit with a single REST call, skipping it when nothing changed
+async def apply_channel_edit(channel, edit, reason=None):
+    if not edit:
+        return False
+    await rest_scheduler.submit(
+        PRIORITY_MUTATION, f"channels/{channel.id}",
+        lambda: channel.edit(reason=reason, **edit)
+    )
+    return True
+
+# Members whose messaging is toggled by freeze/unfreeze (not the bot, admins, staff or support teams)
+def is_regular_ticket_member(target):
+    if target.id == bot.user.id:
+        return False
+    return not is_privileged_member(target)
+
+@component_router.route("close_ticket")
+async def handle_close_ticket(interaction, argument=None):
+    channel = interaction.channel
+    ticket_id = resolve_ticket_id(interaction, argument)
+    if ticket_id is not None:
+        settle_legacy_ticket(interaction.guild.get_channel(ticket_id))
+    status = ticket_store.get_status(ticket_id)
+    
+    if status == "closed":
+        await interaction.response.send_message("Bu talep zaten kapatılmış.", ephemeral=True)
+        return
+    
+    # Check if this is an open ticket channel
+    if status in ("open", "frozen"):
+        # Check if archive category is set
+        if not guild_configs.get(interaction.guild.id)["archive_category_id"]:
+            await interaction.response.send_message(
+                "Arşiv kategorisi ayarlanmamış! Lütfen bir yöneticiden `/arşivkategorisi` komutunu kullanmasını isteyin.",
+                ephemeral=True
+            )
+            return
+        
+        if scheduler.is_scheduled("close_ticket", ticket_id):
+            await interaction.response.send_message("Bu talep zaten kapatılıyor.", ephemeral=True)
+            return
+        
+        embed = discord.Embed(
+            title="Talep Kapatılıyor",
+            description=f"Bu talep {CLOSE_DELAY} saniye içinde kapatılacak ve arşive taşınacak...",
+            color=discord.Color.red()
+        )
+        add_default_footer(embed)
+        
+        cancel_view = discord.ui.View(timeout=None)
+        cancel_view.add_item(TicketActionButton("cancel_close", ticket_id, "Kapatmayı İptal Et", discord.ButtonStyle.secondary))
+        
+        # Hand the delayed archive over to the scheduler instead of sleeping here
+        scheduler.schedule("close_ticket", ticket_id, CLOSE_DELAY, {
+            "closed_by": interaction.user.id,
+            "closed_by_name": interaction.user.name
+        })
+        await rest_scheduler.submit(
+            PRIORITY_INTERACTION, f"interactions/{interaction.id}",
+            lambda: interaction.response.send_message(embed=embed, view=cancel_view)
+        )
+    else:
+        # Deleted or unknown ticket (e.g. a button left on an old message)
+        await interaction.response.send_message("Bu aktif bir talep değil.", ephemeral=True)
+
+@component_router.route("cancel_close")
+async def handle_cancel_close(interaction, argument=None):
+    if scheduler.cancel("close_ticket", resolve_ticket_id(interaction, argument)):
+        embed = discord.Embed(
+            title="Kapatma İptal Edildi",
+            description=f"Talebin kapatılması {interaction.user.mention} tarafından iptal edildi.",
+            color=discord.Color.green()
+        )
+        add_default_footer(embed)
+        await interaction.response.edit_message(embed=embed, view=None)
+    else:
+        await interaction.response.send_message("İptal edilecek bir kapatma işlemi yok.", ephemeral=True)
+
+def is_category_full_error(error):
+    """True for Discord's 400 rejecting a move into a category that already holds 50 channels."""
+    # Reported as a form error on parent_id: "Maximum number of channels in category reached (50)"
+    text = error.text.lower()
+    return error.status == 400 and "parent_id" in text and "maximum number of channels" in text
+
+@scheduler.handler("close_ticket")
+async def close_ticket_now(channel_id, payload):
+    channel = bot.get_channel(channel_id)
+    if channel is None:
+        return
+    closed_by = payload.get("closed_by")
+    closed_by_name = payload.get("closed_by_name", "Kullanıcı")
+    closed_by_mention = f"<@{closed_by}>" if closed_by else closed_by_name
+    
+    # Scheduled auto-unfreeze is pointless once the ticket is closed
+    scheduler.cancel("unfreeze_ticket", channel.id)
+    
+    try:
+        # Get ticket owner ID
+        owner_id = ticket_store.get_owner(channel.id)
+        
+        # Reserve a slot in an archive category (overflow categories are created as needed)
+        archive_category = await archive_allocator.allocate(channel.guild)
+        
+        if archive_category and isinstance(archive_category, discord.CategoryChannel):
+            # Move to archive, disable member messaging and add the kapali prefix in one edit.
+            # If Discord says the category is full after all, retry once with another one.
+            for attempt in range(2):
+                edit = plan_channel_edit(
+                    channel,
+                    member_send_messages=False,
+                    member_filter=lambda target: target.id != bot.user.id,
+                    name=f"kapali-{channel.name.removeprefix('talep-')}",
+                    category=archive_category
+                )
+                try:
+                    await apply_channel_edit(channel, edit, reason=f"Talep {closed_by_name} tarafından kapatıldı")
+                    break
+                except discord.HTTPException as e:
+                    if not is_category_full_error(e):
+                        archive_allocator.release(channel.guild.id, archive_category.id)
+                        raise
+                    if attempt == 1:
+                        archive_allocator.release(channel.guild.id, archive_category.id)
+                        raise
+                    archive_allocator.mark_full(channel.guild.id, archive_category.id)
+                    archive_category = await archive_allocator.allocate(channel.guild)
+                    if archive_category is None:
+                        raise
+            
+            # Send closed message
+            closed_embed = discord.Embed(
+                title="Talep Kapatıldı",
+                description=f"Bu talep {closed_by_mention} tarafından kapatıldı.",
+                color=discord.Color.red()
+            )
+            add_default_footer(closed_embed)
+            await rest_scheduler.submit(
+                PRIORITY_MESSAGE, f"channels/{channel.id}/messages",
+                lambda: channel.send(embed=closed_embed)
+            )
+            
+            # Send DM to user if we have their ID
+            if owner_id:
+                # Get username if possible
+                owner_name = await user_cache.get_name(owner_id)
+                await send_dm_to_user(owner_id, f"Merhaba {owner_name}, talebiniz kapatılmıştır. Teşekkür ederiz.")
+            
+            # Mark the ticket closed (this also clears a frozen state)
+            ticket_store.set_status(channel.id, "closed", closed_by=closed_by)
+            
+            # Export the transcript in the background; the channel stays in the archive
+            spawn_background(export_ticket_transcript(channel), f"transkript-{channel.id}")
+        else:
+            # If category isn't found, notify and schedule the channel for deletion
+            error_embed = discord.Embed(
+                title="Hata",
+                description="Arşiv kategorisi bulunamadı! Talep kanalı siliniyor...",
+                color=discord.Color.red()
+            )
+            add_default_footer(error_embed)
+            await rest_scheduler.submit(
+                PRIORITY_MESSAGE, f"channels/{channel.id}/messages",
+                lambda: channel.send(embed=error_embed)
+            )
+            ticket_store.set_status(channel.id, "closed", closed_by=closed_by)
+            
+            # The channel is about to be deleted - keep its history first
+            try:
+                await export_ticket_transcript(channel)
+            except Exception as e:
+                print(f"Transkript hatası: {e}")
+            scheduler.schedule("delete_channel", channel.id, DELETE_DELAY, {
+                "reason": f"Talep {closed_by_name} tarafından kapatıldı (Arşiv kategorisi bulunamadı)"
+            })
+    except Exception as e:
+        # Log the error and delete the channel
+        print(f"Talep kapatma hatası: {e}")
+        ticket_store.set_status(channel.id, "closed", closed_by=closed_by)
+        try:
+            await export_ticket_transcript(channel)
+        except Exception as export_error:
+            print(f"Transkript hatası: {export_error}")
+        await rest_scheduler.submit(
+            PRIORITY_MUTATION, f"channels/{channel.id}",
+            lambda: channel.delete(reason=f"Talep {closed_by_name} tarafından kapatıldı (Hata: {e})")
+        )
+    
+    # Log ticket closing
+    log_embed = discord.Embed(
+        title="Talep Kapatıldı",
+        description=f"Talep {channel.name} {closed_by_mention} tarafından kapatıldı",
+        color=discord.Color.red()
+    )
+    add_default_footer(log_embed)
+    log_pipeline.emit(channel.guild.id, log_embed)
+
+@scheduler.handler("delete_channel")
+async def delete_channel_now(channel_id, payload):
+    channel = bot.get_channel(channel_id)
+    if channel is not None:
+        await rest_scheduler.submit(
+            PRIORITY_MUTATION, f"channels/{channel.id}",
+            lambda: channel.delete(reason=payload.get("reason"))
+        )
 
-async def handle_close_ticket(interaction):
-    channel = interaction.channel
+@scheduler.handler("unfreeze_ticket")
+async def auto_unfreeze_ticket(channel_id, payload):
+    channel = bot.get_channel(channel_id)
+    if channel is None or not ticket_store.is_frozen(channel_id):
+        return
     
-    # Check if this is a ticket channel
-    if channel.name.startswith("talep-"):
-        # Check if archive category is set
-        if not config["archive_category_id"]:
-            await interaction.response.send_message(
-                "Arşiv kategorisi ayarlanmamış! Lütfen bir yöneticiden `/arşivkategorisi` komutunu kullanmasını isteyin.",
-                ephemeral=True
-            )
-            return
-        
-        embed = discord.Embed(
-            title="Talep Kapatılıyor",
-            description="Bu talep 5 saniye içinde kapatılacak ve arşive taşınacak...",
-            color=discord.Color.red()
-        )
-        add_default_footer(embed)
-        await interaction.response.send_message(embed=embed)
-        
-        # Wait 5 seconds then move the channel to archive category
-        await asyncio.sleep(5)
-        
-        try:
-            # Get ticket owner ID
-            owner_id = None
-            if str(channel.id) in config["ticket_owners"]:
-                owner_id = config["ticket_owners"][str(channel.id)]
-            
-            # Get archive category from config
-            archive_category = interaction.guild.get_channel(config["archive_category_id"])
-            
-            if archive_category and isinstance(archive_category, discord.CategoryChannel):
-                # Move channel to archive category
-                await channel.edit(category=archive_category, reason=f"Talep {interaction.user.name} tarafından kapatıldı")
-                
-                # Disable sending messages for everyone except staff
-                for target, overwrite in channel.overwrites.items():
-                    if isinstance(target, discord.Member) and target.id != bot.user.id:
-                        overwrite.send_messages = False
-                        await channel.set_permissions(target, overwrite=overwrite)
-                
-                # Add kapali prefix to channel name
-                await channel.edit(name=f"kapali-{channel.name[6:]}")
-                
-                # Send closed message
-                closed_embed = discord.Embed(
-                    title="Talep Kapatıldı",
-                    description=f"Bu talep {interaction.user.mention} tarafından kapatıldı.",
-                    color=discord.Color.red()
-                )
-                add_default_footer(closed_embed)
-                await channel.send(embed=closed_embed)
-                
-                # Send DM to user if we have their ID
-                if owner_id:
-                    # Get username if possible
-                    try:
-                        owner = await bot.fetch_user(owner_id)
-                        owner_name = owner.name
-                    except:
-                        owner_name = "Kullanıcı"
-                        
-                    await send_dm_to_user(owner_id, f"Merhaba {owner_name}, talebiniz kapatılmıştır. Teşekkür ederiz.")
-                
-                # If ticket was frozen, remove it from frozen tickets list
-                if channel.id in config["frozen_tickets"]:
-                    config["frozen_tickets"].remove(channel.id)
-                    with open('config.json', 'w') as f:
-                        json.dump(config, f, indent=4)
-            else:
-                # If category isn't found, notify and delete the channel
-                error_embed = discord.Embed(
-                    title="Hata",
-                    description="Arşiv kategorisi bulunamadı! Talep kanalı siliniyor...",
-                    color=discord.Color.red()
-                )
-                add_default_footer(error_embed)
-                await channel.send(embed=error_embed)
-                await asyncio.sleep(3)
-                await channel.delete(reason=f"Talep {interaction.user.name} tarafından kapatıldı (Arşiv kategorisi bulunamadı)")
-        except Exception as e:
-            # Log the error and delete the channel
-            print(f"Talep kapatma hatası: {e}")
-            await channel.delete(reason=f"Talep {interaction.user.name} tarafından kapatıldı (Hata: {e})")
-        
-        # Log ticket closing if log channel is set
-        if config["ticket_log_channel_id"]:
-            log_channel = interaction.guild.get_channel(config["ticket_log_channel_id"])
-            if log_channel:
-                log_embed = discord.Embed(
-                    title="Talep Kapatıldı",
-                    description=f"Talep {channel.name} {interaction.user.mention} tarafından kapatıldı",
-                    color=discord.Color.red()
-                )
-                add_default_footer(log_embed)
-                await log_channel.send(embed=log_embed)
+    ticket_store.set_status(channel.id, "open")
+    edit = plan_channel_edit(channel, member_send_messages=True, member_filter=is_regular_ticket_member)
+    await apply_channel_edit(channel, edit, reason="Talep otomatik olarak açıldı")
+    
+    embed = discord.Embed(
+        title="Talep Açıldı",
+        description="Dondurma süresi doldu, talep otomatik olarak açıldı. Artık mesaj gönderebilirsiniz.",
+        color=discord.Color.green()
+    )
+    add_default_footer(embed)
+    await rest_scheduler.submit(
+        PRIORITY_MESSAGE, f"channels/{channel.id}/messages",
+        lambda: channel.send(embed=embed)
+    )
+    
+    owner_id = ticket_store.get_owner(channel.id)
+    if owner_id:
+        owner_name = await user_cache.get_name(owner_id)
+        await send_dm_to_user(owner_id, f"Merhaba {owner_name}, talebiniz şu anda açıktır. Artık mesaj gönderebilirsiniz.")
+    
+    log_embed = discord.Embed(
+        title="Talep Açıldı",
+        description=f"Talep {channel.name} dondurma süresi dolduğu için otomatik olarak açıldı",
+        color=discord.Color.yellow()
+    )
+    add_default_footer(log_embed)
+    log_pipeline.emit(channel.guild.id, log_embed)
 
-async def handle_freeze_ticket(interaction):
+@component_router.route("freeze_ticket")
+async def handle_freeze_ticket(interaction, argument=None):
     channel = interaction.channel
+    ticket_id = resolve_ticket_id(interaction, argument)
+    if ticket_id is not None:
+        settle_legacy_ticket(interaction.guild.get_channel(ticket_id))
+    status = ticket_store.get_status(ticket_id)
     
-    # Check if this is a ticket channel
-    if channel.name.startswith("talep-"):
-        # Check if user has permission (staff or support team)
-        has_permission = False
-        
-        # Check if user is admin
-        if interaction.user.guild_permissions.administrator:
-            has_permission = True
-            
-        # Check if user has staff role
-        if not has_permission and config["staff_role_id"]:
-            staff_role = interaction.guild.get_role(config["staff_role_id"])
-            if staff_role and staff_role in interaction.user.roles:
-                has_permission = True
-                
-        # Check if user has any of the support team roles
-        if not has_permission:
-            for category, role_id in config["category_roles"].items():
-                role = interaction.guild.get_role(int(role_id))
-                if role and role in interaction.user.roles:
-                    has_permission = True
-                    break
+    if status == "closed":
+        await interaction.response.send_message("Bu talep zaten kapatılmış.", ephemeral=True)
+        return
+    
+    # Check if this is an open ticket channel
+    if status in ("open", "frozen"):
+        # Check if user has permission (admin, staff or support team)
+        has_permission = is_privileged_member(interaction.user)
         
         if not has_permission:
             await interaction.response.send_message("Bu işlemi yapmak için yetkiniz yok!", ephemeral=True)
             return
         
         # Check if channel is already frozen or not
-        is_frozen = channel.id in config["frozen_tickets"]
+        is_frozen = status == "frozen"
         
         # Get ticket owner ID
-        owner_id = None
-        if str(channel.id) in config["ticket_owners"]:
-            owner_id = config["ticket_owners"][str(channel.id)]
+        owner_id = ticket_store.get_owner(ticket_id)
         
         # Toggle frozen state
         if is_frozen:
             # Unfreeze the ticket
-            config["frozen_tickets"].remove(channel.id)
+            ticket_store.set_status(ticket_id, "open")
+            scheduler.cancel("unfreeze_ticket", ticket_id)
             
-            # Update permissions to allow messages again
-            for target, overwrite in channel.overwrites.items():
-                if isinstance(target, discord.Member) and target.id != bot.user.id and target.id != interaction.guild.me.id:
-                    # Restore original permissions (allow regular users to send messages)
-                    if not target.guild_permissions.administrator and not any(role.id == config["staff_role_id"] for role in target.roles):
-                        # Check if user is not staff/admin, enable messaging
-                        overwrite.send_messages = True
-                        await channel.set_permissions(target, overwrite=overwrite)
+            # Update permissions to allow regular users to send messages again
+            edit = plan_channel_edit(channel, member_send_messages=True, member_filter=is_regular_ticket_member)
+            await apply_channel_edit(channel, edit, reason=f"Talep {interaction.user.name} tarafından açıldı")
             
             # Send notification
             embed = discord.Embed(
@@ -546,34 +3190,35 @@ async def handle_freeze_ticket(interaction):
                 color=discord.Color.green()
             )
             add_default_footer(embed)
-            await interaction.response.send_message(embed=embed)
+            await rest_scheduler.submit(
+                PRIORITY_INTERACTION, f"interactions/{interaction.id}",
+                lambda: interaction.response.send_message(embed=embed)
+            )
             
             # Send DM to user if we have their ID
             if owner_id:
                 # Get username if possible
-                try:
-                    owner = await bot.fetch_user(owner_id)
-                    owner_name = owner.name
-                except:
-                    owner_name = "Kullanıcı"
-                    
+                owner_name = await user_cache.get_name(owner_id)
                 await send_dm_to_user(owner_id, f"Merhaba {owner_name}, talebiniz şu anda açıktır. Artık mesaj gönderebilirsiniz.")
             
             # Update button to show "Talebi Dondur"
-            view = TicketControlButtons()
-            await interaction.message.edit(view=view)
+            view = TicketControlButtons(ticket_id)
+            await rest_scheduler.submit(
+                PRIORITY_MESSAGE, f"channels/{channel.id}/messages",
+                lambda: interaction.message.edit(view=view)
+            )
             
         else:
             # Freeze the ticket
-            config["frozen_tickets"].append(channel.id)
+            ticket_store.set_status(ticket_id, "frozen")
+            
+            # Optionally unfreeze automatically after the configured time
+            if config.get("auto_unfreeze_minutes"):
+                scheduler.schedule("unfreeze_ticket", ticket_id, config["auto_unfreeze_minutes"] * 60)
             
             # Update permissions to prevent regular users from sending messages
-            for target, overwrite in channel.overwrites.items():
-                if isinstance(target, discord.Member) and target.id != bot.user.id and target.id != interaction.guild.me.id:
-                    # If member is not staff/admin, disable messaging
-                    if not target.guild_permissions.administrator and not any(role.id == config["staff_role_id"] for role in target.roles):
-                        overwrite.send_messages = False
-                        await channel.set_permissions(target, overwrite=overwrite)
+            edit = plan_channel_edit(channel, member_send_messages=False, member_filter=is_regular_ticket_member)
+            await apply_channel_edit(channel, edit, reason=f"Talep {interaction.user.name} tarafından donduruldu")
             
             # Send notification
             embed = discord.Embed(
@@ -582,50 +3227,36 @@ async def handle_freeze_ticket(interaction):
                 color=discord.Color.yellow()
             )
             add_default_footer(embed)
-            await interaction.response.send_message(embed=embed)
+            await rest_scheduler.submit(
+                PRIORITY_INTERACTION, f"interactions/{interaction.id}",
+                lambda: interaction.response.send_message(embed=embed)
+            )
             
             # Send DM to user if we have their ID
             if owner_id:
                 # Get username if possible
-                try:
-                    owner = await bot.fetch_user(owner_id)
-                    owner_name = owner.name
-                except:
-                    owner_name = "Kullanıcı"
-                    
+                owner_name = await user_cache.get_name(owner_id)
                 await send_dm_to_user(owner_id, f"Merhaba {owner_name}, talebiniz şu anda dondurulmuştur. Geçici olarak mesaj gönderemezsiniz.")
             
             # Update button to show "Talebi Aç"
-            unfreeze_view = discord.ui.View(timeout=None)
-            unfreeze_button = discord.ui.Button(
-                label="Talebi Aç", 
-                style=discord.ButtonStyle.success, 
-                custom_id="freeze_ticket"
+            unfreeze_view = TicketControlButtons(ticket_id, frozen=True)
+            await rest_scheduler.submit(
+                PRIORITY_MESSAGE, f"channels/{channel.id}/messages",
+                lambda: interaction.message.edit(view=unfreeze_view)
             )
-            close_button = discord.ui.Button(
-                label="Talebi Kapat", 
-                style=discord.ButtonStyle.danger, 
-                custom_id="close_ticket"
-            )
-            unfreeze_view.add_item(close_button)
-            unfreeze_view.add_item(unfreeze_button)
             
-        # Save frozen state
-        with open('config.json', 'w') as f:
-            json.dump(config, f, indent=4)
-        
-        # Log ticket freezing if log channel is set
-        if config["ticket_log_channel_id"]:
-            log_channel = interaction.guild.get_channel(config["ticket_log_channel_id"])
-            if log_channel:
-                action = "açıldı" if is_frozen else "donduruldu"
-                log_embed = discord.Embed(
-                    title=f"Talep {action.capitalize()}",
-                    description=f"Talep {channel.name} {interaction.user.mention} tarafından {action}",
-                    color=discord.Color.yellow()
-                )
-                add_default_footer(log_embed)
-                await log_channel.send(embed=log_embed)
+        # Log ticket freezing
+        action = "açıldı" if is_frozen else "donduruldu"
+        log_embed = discord.Embed(
+            title=f"Talep {action.capitalize()}",
+            description=f"Talep {channel.name} {interaction.user.mention} tarafından {action}",
+            color=discord.Color.yellow()
+        )
+        add_default_footer(log_embed)
+        log_pipeline.emit(interaction.guild.id, log_embed)
+    else:
+        # Deleted or unknown ticket (e.g. a button left on an old message)
+        await interaction.response.send_message("Bu aktif bir talep değil.", ephemeral=True)
 
 # Support Team Selection View for setup
 class SupportTeamSelectionView(discord.ui.View):
@@ -686,10 +3317,11 @@ class SupportTeamSelectionView(discord.ui.View):
             await interaction.response.edit_message(embed=embed, view=self)
     
     async def finish_setup(self, interaction):
-        # Save the category roles to config
-        config["category_roles"] = self.category_roles
-        with open('config.json', 'w') as f:
-            json.dump(config, f, indent=4)
+        # Save the category roles to the guild's config
+        guild_id = self.original_interaction.guild.id
+        guild_configs.get(guild_id)["category_roles"] = self.category_roles
+        guild_configs.save(guild_id)
+        privileged_roles.invalidate(guild_id)
         
         # Continue with the rest of the setup
         # Create ticket message with button
@@ -713,9 +3345,8 @@ class SupportTeamSelectionView(discord.ui.View):
         message = await self.original_interaction.channel.send(embed=embed, view=view)
         
         # Save the ticket channel ID
-        config["ticket_channel_id"] = self.original_interaction.channel.id
-        with open('config.json', 'w') as f:
-            json.dump(config, f, indent=4)
+        guild_configs.get(guild_id)["ticket_channel_id"] = self.original_interaction.channel.id
+        guild_configs.save(guild_id)
         
         # Build the completion message
         setup_msg = f"Talep sistemi bu kanalda kuruldu! Kapatılan talepler {self.archive_category.mention} kategorisine taşınacak.\n\n"
@@ -832,9 +3463,6 @@ class RoleSelect(discord.ui.RoleSelect):
 @bot.tree.command(name="kurulum", description="Talep sistemini kur")
 @app_commands.default_permissions(administrator=True)
 async def setup(interaction: discord.Interaction):
-    # Save guild ID for future reference
-    config["guild_id"] = interaction.guild.id
-    
     # Store setup state for this user
     setup_states[interaction.user.id] = {
         "waiting_for_archive_id": True,
@@ -848,9 +3476,9 @@ async def setup(interaction: discord.Interaction):
 @app_commands.describe(role="Tüm taleplere erişimi olacak rol")
 @app_commands.default_permissions(administrator=True)
 async def setstaffrole(interaction: discord.Interaction, role: discord.Role):
-    config["staff_role_id"] = role.id
-    with open('config.json', 'w') as f:
-        json.dump(config, f, indent=4)
+    guild_configs.get(interaction.guild.id)["staff_role_id"] = role.id
+    guild_configs.save(interaction.guild.id)
+    privileged_roles.invalidate(interaction.guild.id)
     
     embed = discord.Embed(
         title="Yetkili Rolü Ayarlandı",
@@ -864,9 +3492,8 @@ async def setstaffrole(interaction: discord.Interaction, role: discord.Role):
 @app_commands.describe(channel="Talep loglarının gönderileceği kanal")
 @app_commands.default_permissions(administrator=True)
 async def setlogchannel(interaction: discord.Interaction, channel: discord.TextChannel):
-    config["ticket_log_channel_id"] = channel.id
-    with open('config.json', 'w') as f:
-        json.dump(config, f, indent=4)
+    guild_configs.get(interaction.guild.id)["ticket_log_channel_id"] = channel.id
+    guild_configs.save(interaction.guild.id)
     
     embed = discord.Embed(
         title="Log Kanalı Ayarlandı",
@@ -880,9 +3507,11 @@ async def setlogchannel(interaction: discord.Interaction, channel: discord.TextC
 @app_commands.describe(category="Arşivlenecek taleplerin taşınacağı kategori")
 @app_commands.default_permissions(administrator=True)
 async def setarchivecategory(interaction: discord.Interaction, category: discord.CategoryChannel):
-    config["archive_category_id"] = category.id
-    with open('config.json', 'w') as f:
-        json.dump(config, f, indent=4)
+    guild_config = guild_configs.get(interaction.guild.id)
+    guild_config["archive_category_id"] = category.id
+    guild_config["archive_overflow_category_ids"] = []
+    guild_configs.save(interaction.guild.id)
+    archive_allocator.reset(interaction.guild.id)
     
     embed = discord.Embed(
         title="Arşiv Kategorisi Ayarlandı",
@@ -908,12 +3537,9 @@ async def setsupportteam(
     role: discord.Role
 ):
     # Save the support team role for this category
-    if "category_roles" not in config:
-        config["category_roles"] = {}
-    
-    config["category_roles"][category] = str(role.id)
-    with open('config.json', 'w') as f:
-        json.dump(config, f, indent=4)
+    guild_configs.get(interaction.guild.id)["category_roles"][category] = str(role.id)
+    guild_configs.save(interaction.guild.id)
+    privileged_roles.invalidate(interaction.guild.id)
     
     # Find the category emoji
     category_info = next((c for c in TICKET_CATEGORIES if c["name"] == category), None)
@@ -998,8 +3624,10 @@ async def handle_moderasyon_komutlari(interaction: discord.Interaction):
         {"name": "/at", "description": "Kullanıcıyı sunucudan at (kick)"},
         {"name": "/yasakla", "description": "Kullanıcıyı sunucudan yasakla (ban)"},
         {"name": "/sustur", "description": "Kullanıcıyı belirli bir süre sustur"},
-        {"name": "/temizle", "description": "Belirli sayıda mesajı sil"},
-        {"name": "/uyarı", "description": "Kullanıcıya uyarı ver"}
+        {"name": "/temizle", "description": "Mesajları filtreleyerek toplu sil"},
+        {"name": "/uyarı", "description": "Kullanıcıya uyarı ver"},
+        {"name": "/sicil", "description": "Kullanıcının uyarı ve ceza geçmişi"},
+        {"name": "/toplu", "description": "Baskın sonrası toplu yasaklama, atma veya susturma"}
     ]
     
     for cmd in commands:
@@ -1034,6 +3662,7 @@ async def yonetim(interaction: discord.Interaction):
     sebep="Atılma sebebi (isteğe bağlı)"
 )
 @app_commands.default_permissions(kick_members=True)
+@metrics.instrumented("kick")
 async def kick(interaction: discord.Interaction, kullanici: discord.Member, sebep: str = None):
     # Kendini veya botları atamaz
     if kullanici == interaction.user:
@@ -1053,7 +3682,11 @@ async def kick(interaction: discord.Interaction, kullanici: discord.Member, sebe
     reason = f"{interaction.user} tarafından atıldı: {sebep}" if sebep else f"{interaction.user} tarafından atıldı"
     
     try:
-        await kullanici.kick(reason=reason)
+        await rest_scheduler.submit(
+            PRIORITY_MUTATION, f"guilds/{interaction.guild.id}/members",
+            lambda: kullanici.kick(reason=reason)
+        )
+        mod_cases.add_case(interaction.guild.id, kullanici.id, interaction.user.id, "kick", sebep)
         
         # Başarılı kick mesajı
         embed = discord.Embed(
@@ -1065,21 +3698,20 @@ async def kick(interaction: discord.Interaction, kullanici: discord.Member, sebe
         embed.set_footer(text=f"{interaction.user} tarafından atıldı")
         add_default_footer(embed)
         
-        await interaction.response.send_message(embed=embed, ephemeral=False)
+        await rest_scheduler.submit(
+            PRIORITY_INTERACTION, f"interactions/{interaction.id}",
+            lambda: interaction.response.send_message(embed=embed, ephemeral=False)
+        )
         
-        # DM olarak bildirim göndermeye çalış
-        try:
-            dm_embed = discord.Embed(
-                title=f"👢 {interaction.guild.name} sunucusundan atıldınız",
-                description=f"Yetkili: {interaction.user.mention}",
-                color=discord.Color.red()
-            )
-            dm_embed.add_field(name="Sebep", value=sebep or "Sebep belirtilmedi", inline=False)
-            add_default_footer(dm_embed)
-            
-            await kullanici.send(embed=dm_embed)
-        except:
-            pass
+        # DM olarak bildirim göndermeye çalış (arka planda)
+        dm_embed = discord.Embed(
+            title=f"👢 {interaction.guild.name} sunucusundan atıldınız",
+            description=f"Yetkili: {interaction.user.mention}",
+            color=discord.Color.red()
+        )
+        dm_embed.add_field(name="Sebep", value=sebep or "Sebep belirtilmedi", inline=False)
+        add_default_footer(dm_embed)
+        dm_queue.enqueue(kullanici.id, embed=dm_embed)
         
     except discord.Forbidden:
         await interaction.response.send_message("Bu kullanıcıyı atmak için yeterli yetkiye sahip değilim!", ephemeral=True)
@@ -1100,6 +3732,7 @@ async def kick(interaction: discord.Interaction, kullanici: discord.Member, sebe
     app_commands.Choice(name="Son 7 gün", value=7)
 ])
 @app_commands.default_permissions(ban_members=True)
+@metrics.instrumented("ban")
 async def ban(interaction: discord.Interaction, kullanici: discord.Member, sebep: str = None, mesaj_sil: int = 0):
     # Kendini veya botları yasaklayamaz
     if kullanici == interaction.user:
@@ -1129,12 +3762,20 @@ async def ban(interaction: discord.Interaction, kullanici: discord.Member, sebep
             dm_embed.add_field(name="Sebep", value=sebep or "Sebep belirtilmedi", inline=False)
             add_default_footer(dm_embed)
             
-            await kullanici.send(embed=dm_embed)
+            # Yasaktan sonra DM gönderilemeyeceği için bu DM beklenir
+            await rest_scheduler.submit(
+                PRIORITY_MESSAGE, f"users/{kullanici.id}/dm",
+                lambda: kullanici.send(embed=dm_embed)
+            )
         except:
             pass
         
         # Kullanıcıyı yasakla
-        await kullanici.ban(reason=reason, delete_message_days=mesaj_sil)
+        await rest_scheduler.submit(
+            PRIORITY_MUTATION, f"guilds/{interaction.guild.id}/bans",
+            lambda: kullanici.ban(reason=reason, delete_message_seconds=mesaj_sil * 86400)
+        )
+        mod_cases.add_case(interaction.guild.id, kullanici.id, interaction.user.id, "ban", sebep)
         
         # Başarılı ban mesajı
         embed = discord.Embed(
@@ -1147,7 +3788,10 @@ async def ban(interaction: discord.Interaction, kullanici: discord.Member, sebep
         embed.set_footer(text=f"{interaction.user} tarafından yasaklandı")
         add_default_footer(embed)
         
-        await interaction.response.send_message(embed=embed, ephemeral=False)
+        await rest_scheduler.submit(
+            PRIORITY_INTERACTION, f"interactions/{interaction.id}",
+            lambda: interaction.response.send_message(embed=embed, ephemeral=False)
+        )
         
     except discord.Forbidden:
         await interaction.response.send_message("Bu kullanıcıyı yasaklamak için yeterli yetkiye sahip değilim!", ephemeral=True)
@@ -1162,6 +3806,7 @@ async def ban(interaction: discord.Interaction, kullanici: discord.Member, sebep
     sebep="Susturulma sebebi (isteğe bağlı)"
 )
 @app_commands.default_permissions(moderate_members=True)
+@metrics.instrumented("timeout")
 async def timeout(interaction: discord.Interaction, kullanici: discord.Member, sure: int, sebep: str = None):
     # Kendini veya botları susturamaz
     if kullanici == interaction.user:
@@ -1191,8 +3836,12 @@ async def timeout(interaction: discord.Interaction, kullanici: discord.Member, s
     
     try:
         # Timeout süresi hesapla
-        timeout_duration = datetime.timedelta(minutes=sure)
-        await kullanici.timeout_for(timeout_duration, reason=reason)
+        timeout_duration = timedelta(minutes=sure)
+        await rest_scheduler.submit(
+            PRIORITY_MUTATION, f"guilds/{interaction.guild.id}/members",
+            lambda: kullanici.timeout(timeout_duration, reason=reason)
+        )
+        mod_cases.add_case(interaction.guild.id, kullanici.id, interaction.user.id, "timeout", sebep)
         
         # Bitiş zamanını hesapla
         end_time = discord.utils.utcnow() + timeout_duration
@@ -1208,23 +3857,22 @@ async def timeout(interaction: discord.Interaction, kullanici: discord.Member, s
         embed.set_footer(text=f"{interaction.user} tarafından susturuldu")
         add_default_footer(embed)
         
-        await interaction.response.send_message(embed=embed, ephemeral=False)
+        await rest_scheduler.submit(
+            PRIORITY_INTERACTION, f"interactions/{interaction.id}",
+            lambda: interaction.response.send_message(embed=embed, ephemeral=False)
+        )
         
-        # DM olarak bildirim göndermeye çalış
-        try:
-            dm_embed = discord.Embed(
-                title=f"🔇 {interaction.guild.name} sunucusunda susturuldunuz",
-                description=f"Yetkili: {interaction.user.mention}",
-                color=discord.Color.orange()
-            )
-            dm_embed.add_field(name="Sebep", value=sebep or "Sebep belirtilmedi", inline=False)
-            dm_embed.add_field(name="Süre", value=f"{sure} dakika", inline=False)
-            dm_embed.add_field(name="Bitiş Zamanı", value=f"<t:{int(end_time.timestamp())}:R>", inline=False)
-            add_default_footer(dm_embed)
-            
-            await kullanici.send(embed=dm_embed)
-        except:
-            pass
+        # DM olarak bildirim göndermeye çalış (arka planda)
+        dm_embed = discord.Embed(
+            title=f"🔇 {interaction.guild.name} sunucusunda susturuldunuz",
+            description=f"Yetkili: {interaction.user.mention}",
+            color=discord.Color.orange()
+        )
+        dm_embed.add_field(name="Sebep", value=sebep or "Sebep belirtilmedi", inline=False)
+        dm_embed.add_field(name="Süre", value=f"{sure} dakika", inline=False)
+        dm_embed.add_field(name="Bitiş Zamanı", value=f"<t:{int(end_time.timestamp())}:R>", inline=False)
+        add_default_footer(dm_embed)
+        dm_queue.enqueue(kullanici.id, embed=dm_embed)
         
     except discord.Forbidden:
         await interaction.response.send_message("Bu kullanıcıyı susturmak için yeterli yetkiye sahip değilim!", ephemeral=True)
@@ -1238,6 +3886,7 @@ async def timeout(interaction: discord.Interaction, kullanici: discord.Member, s
     sebep="Susturma kaldırma sebebi (isteğe bağlı)"
 )
 @app_commands.default_permissions(moderate_members=True)
+@metrics.instrumented("remove_timeout")
 async def remove_timeout(interaction: discord.Interaction, kullanici: discord.Member, sebep: str = None):
     # Yetkili kontrolü
     if kullanici.top_role >= interaction.user.top_role and interaction.user.id != interaction.guild.owner_id:
@@ -1250,7 +3899,11 @@ async def remove_timeout(interaction: discord.Interaction, kullanici: discord.Me
     try:
         # Şu anki susturması var mı kontrol et
         if kullanici.is_timed_out():
-            await kullanici.timeout(None, reason=reason)
+            await rest_scheduler.submit(
+                PRIORITY_MUTATION, f"guilds/{interaction.guild.id}/members",
+                lambda: kullanici.timeout(None, reason=reason)
+            )
+            mod_cases.add_case(interaction.guild.id, kullanici.id, interaction.user.id, "remove_timeout")
             
             # Başarılı mesajı
             embed = discord.Embed(
@@ -1262,21 +3915,20 @@ async def remove_timeout(interaction: discord.Interaction, kullanici: discord.Me
             embed.set_footer(text=f"{interaction.user} tarafından kaldırıldı")
             add_default_footer(embed)
             
-            await interaction.response.send_message(embed=embed, ephemeral=False)
+            await rest_scheduler.submit(
+                PRIORITY_INTERACTION, f"interactions/{interaction.id}",
+                lambda: interaction.response.send_message(embed=embed, ephemeral=False)
+            )
             
-            # DM olarak bildirim göndermeye çalış
-            try:
-                dm_embed = discord.Embed(
-                    title=f"🔊 {interaction.guild.name} sunucusundaki susturmanız kaldırıldı",
-                    description=f"Yetkili: {interaction.user.mention}",
-                    color=discord.Color.green()
-                )
-                dm_embed.add_field(name="Sebep", value=sebep or "Sebep belirtilmedi", inline=False)
-                add_default_footer(dm_embed)
-                
-                await kullanici.send(embed=dm_embed)
-            except:
-                pass
+            # DM olarak bildirim göndermeye çalış (arka planda)
+            dm_embed = discord.Embed(
+                title=f"🔊 {interaction.guild.name} sunucusundaki susturmanız kaldırıldı",
+                description=f"Yetkili: {interaction.user.mention}",
+                color=discord.Color.green()
+            )
+            dm_embed.add_field(name="Sebep", value=sebep or "Sebep belirtilmedi", inline=False)
+            add_default_footer(dm_embed)
+            dm_queue.enqueue(kullanici.id, embed=dm_embed)
             
         else:
             await interaction.response.send_message(f"{kullanici.mention} şu anda susturulmamış.", ephemeral=True)
@@ -1286,39 +3938,281 @@ async def remove_timeout(interaction: discord.Interaction, kullanici: discord.Me
     except Exception as e:
         await interaction.response.send_message(f"Bir hata oluştu: {e}", ephemeral=True)
 
+# Purge engine behind /temizle. Channel history is streamed newest-first and
+# matching messages are bulk-deleted in chunks of 100, one chunk in flight
+# while the next page is read. Discord refuses to bulk-delete messages older
+# than 14 days, so those go through a separate lane that deletes them one at
+# a time. Only messages sent before the command are looked at, so a raid that
+# is still going on cannot keep the scan alive.
+PURGE_MAX = config.get("purge_max", 5000)
+PURGE_SCAN_LIMIT = config.get("purge_scan_limit", 20000)
+PURGE_OLD_DELETE_SPACING = config.get("purge_old_delete_spacing", 1.0)
+PURGE_PROGRESS_INTERVAL = 2
+BULK_DELETE_CHUNK = 100
+# A few minutes short of 14 days so a chunk never ages out while it waits
+BULK_DELETE_MAX_AGE = timedelta(days=14) - timedelta(minutes=5)
+LINK_PATTERN = re.compile(r"https?://|www\.|discord(?:\.gg|(?:app)?\.com/invite)/", re.IGNORECASE)
+
+# Message filters for a purge; a message is deleted only if every filter matches
+def build_purge_filters(user=None, links=False, attachments=False, bots=False):
+    filters = []
+    if user is not None:
+        filters.append(lambda message: message.author.id == user.id)
+    if links:
+        filters.append(lambda message: LINK_PATTERN.search(message.content) is not None)
+    if attachments:
+        filters.append(lambda message: bool(message.attachments))
+    if bots:
+        filters.append(lambda message: message.author.bot)
+    return filters
+
+class PurgeJob:
+    def __init__(self, channel, amount, filters=(), since=None, before=None, reason=None):
+        self.channel = channel
+        self.amount = amount
+        self.filters = list(filters)
+        self.since = since
+        self.before = before
+        self.reason = reason
+        self.scanned = 0
+        self.matched = 0
+        self.deleted = 0
+        self.old_deleted = 0
+        self.failed = 0
+        self.cancelled = False
+        self.finished = False
+        self.error = None
+        self._old_queue = asyncio.Queue(maxsize=BULK_DELETE_CHUNK)
+    
+    def cancel(self):
+        self.cancelled = True
+    
+    def matches(self, message):
+        return all(check(message) for check in self.filters)
+    
+    def progress_text(self):
+        text = f"🧹 {self.deleted}/{self.amount} mesaj silindi ({self.scanned} mesaj tarandı)"
+        if self.old_deleted:
+            text += f"\n14 günden eski {self.old_deleted} mesaj tek tek silindi"
+        if self.failed:
+            text += f"\n{self.failed} mesaj silinemedi"
+        return text
+    
+    def _stop(self, error):
+        self.error = error
+        self.cancelled = True
+    
+    async def _bulk_delete(self, chunk):
+        try:
+            await rest_scheduler.submit(
+                PRIORITY_MUTATION, f"channels/{self.channel.id}/messages/bulk-delete",
+                lambda: self.channel.delete_messages(chunk, reason=self.reason)
+            )
+            self.deleted += len(chunk)
+        except discord.Forbidden:
+            self._stop("Mesajları silmek için yeterli yetkiye sahip değilim!")
+        except discord.HTTPException:
+            # Typically a message that crossed the 14-day line; fall back to single deletes
+            for message in chunk:
+                await self._old_queue.put(message)
+    
+    async def _single_delete_lane(self):
+        while True:
+            message = await self._old_queue.get()
+            if message is None:
+                return
+            if self.cancelled:
+                continue
+            try:
+                await rest_scheduler.submit(
+                    PRIORITY_BACKGROUND, f"channels/{self.channel.id}/messages/single-delete",
+                    lambda: message.delete()
+                )
+                self.deleted += 1
+                self.old_deleted += 1
+            except discord.NotFound:
+                self.failed += 1
+            except discord.Forbidden:
+                self._stop("Mesajları silmek için yeterli yetkiye sahip değilim!")
+            except discord.HTTPException as e:
+                print(f"Mesaj silme hatası: {e}")
+                self.failed += 1
+            await asyncio.sleep(PURGE_OLD_DELETE_SPACING)
+    
+    async def run(self):
+        lane = asyncio.create_task(self._single_delete_lane(), name="temizleme-tekli")
+        bulk_task = None
+        chunk = []
+        cutoff = discord.utils.utcnow() - BULK_DELETE_MAX_AGE
+        try:
+            async for message in self.channel.history(limit=PURGE_SCAN_LIMIT, before=self.before):
+                if self.cancelled or (self.since and message.created_at < self.since):
+                    break
+                self.scanned += 1
+                if not self.matches(message):
+                    continue
+                self.matched += 1
+                if message.created_at > cutoff:
+                    chunk.append(message)
+                    if len(chunk) == BULK_DELETE_CHUNK:
+                        if bulk_task:
+                            await bulk_task
+                        bulk_task = asyncio.create_task(self._bulk_delete(chunk))
+                        chunk = []
+                else:
+                    await self._old_queue.put(message)
+                if self.matched >= self.amount:
+                    break
+            if bulk_task:
+                await bulk_task
+            if chunk and not self.cancelled:
+                await self._bulk_delete(chunk)
+        except BaseException:
+            self.cancelled = True
+            raise
+        finally:
+            await self._old_queue.put(None)
+            await lane
+            self.finished = True
+
+# Purges currently running, by channel id
+purges = {}
+
+# Keep an ephemeral reply up to date while a long job (purge, bulk moderation)
+# runs. The job provides progress_text(), finished and cancelled.
+async def report_job_progress(interaction, job, view):
+    while True:
+        await asyncio.sleep(PURGE_PROGRESS_INTERVAL)
+        if job.finished:
+            return
+        try:
+            await rest_scheduler.submit(
+                PRIORITY_INTERACTION, f"interactions/{interaction.id}",
+                lambda: interaction.edit_original_response(content=job.progress_text(), embed=None, view=None if job.cancelled else view)
+            )
+        except discord.HTTPException:
+            # The interaction token expires after 15 minutes; the job itself keeps going
+            return
+
+@component_router.route("cancel_purge")
+async def handle_cancel_purge(interaction, argument=None):
+    job = purges.get(int(argument)) if argument else None
+    if job is None or job.finished:
+        await interaction.response.send_message("Durdurulacak bir temizleme işlemi yok.", ephemeral=True)
+        return
+    job.cancel()
+    await interaction.response.edit_message(content=f"{job.progress_text()}\nDurduruluyor...", view=None)
+
 # Mesaj silme komutu
-@bot.tree.command(name="temizle", description="Belirli sayıda mesajı sil")
+@bot.tree.command(name="temizle", description="Mesajları toplu olarak sil")
 @app_commands.describe(
-    adet="Silinecek mesaj adedi (1-100)",
-    kullanici="Sadece belirli bir kullanıcının mesajlarını sil (isteğe bağlı)"
+    adet=f"Silinecek mesaj adedi (1-{PURGE_MAX})",
+    kullanici="Sadece belirli bir kullanıcının mesajlarını sil (isteğe bağlı)",
+    baglanti="Sadece bağlantı içeren mesajları sil",
+    dosya="Sadece dosya veya ek içeren mesajları sil",
+    botlar="Sadece botların mesajlarını sil",
+    son_dakika="Sadece son N dakikada gönderilen mesajları sil"
 )
 @app_commands.default_permissions(manage_messages=True)
-async def clear(interaction: discord.Interaction, adet: int, kullanici: discord.Member = None):
+@metrics.instrumented("clear")
+async def clear(
+    interaction: discord.Interaction,
+    adet: int,
+    kullanici: discord.User = None,
+    baglanti: bool = False,
+    dosya: bool = False,
+    botlar: bool = False,
+    son_dakika: int = None
+):
     # Adet kontrolü
-    if adet < 1 or adet > 100:
-        await interaction.response.send_message("Lütfen 1 ile 100 arasında bir değer girin.", ephemeral=True)
+    if adet < 1 or adet > PURGE_MAX:
+        await interaction.response.send_message(f"Lütfen 1 ile {PURGE_MAX} arasında bir değer girin.", ephemeral=True)
+        return
+    if son_dakika is not None and son_dakika < 1:
+        await interaction.response.send_message("Dakika en az 1 olmalı.", ephemeral=True)
         return
     
+    channel = interaction.channel
+    if channel.id in purges:
+        await interaction.response.send_message("Bu kanalda zaten bir temizleme işlemi sürüyor.", ephemeral=True)
+        return
+    
+    job = PurgeJob(
+        channel, adet,
+        filters=build_purge_filters(kullanici, baglanti, dosya, botlar),
+        since=discord.utils.utcnow() - timedelta(minutes=son_dakika) if son_dakika else None,
+        before=discord.Object(id=interaction.id),
+        reason=f"/temizle - {interaction.user}"
+    )
+    purges[channel.id] = job
+    view = discord.ui.View(timeout=None)
+    view.add_item(TicketActionButton("cancel_purge", channel.id, "Durdur", discord.ButtonStyle.danger))
+    
     # Mesajları silme
     try:
-        await interaction.response.defer(ephemeral=True)
+        await interaction.response.send_message(job.progress_text(), view=view, ephemeral=True)
+        spawn_background(report_job_progress(interaction, job, view), "temizleme-ilerleme")
+        await job.run()
         
-        if kullanici:
-            # Belirli bir kullanıcının mesajlarını sil
-            def check(message):
-                return message.author == kullanici
-            
-            deleted = await interaction.channel.purge(limit=adet, check=check)
-            await interaction.followup.send(f"{len(deleted)} adet {kullanici.mention} tarafından gönderilen mesaj silindi.", ephemeral=True)
+        if job.error:
+            summary = f"{job.error}\n{job.deleted} mesaj silinmişti."
         else:
-            # Tüm mesajları sil
-            deleted = await interaction.channel.purge(limit=adet)
-            await interaction.followup.send(f"{len(deleted)} adet mesaj silindi.", ephemeral=True)
-        
+            summary = f"{job.deleted} adet mesaj silindi"
+            if kullanici:
+                summary += f" ({kullanici.mention} tarafından gönderilen)"
+            summary += "."
+            if job.cancelled:
+                summary += " İşlem durduruldu."
+            elif job.scanned >= PURGE_SCAN_LIMIT:
+                summary += f" Tarama sınırına ({PURGE_SCAN_LIMIT} mesaj) ulaşıldı."
+            elif job.matched < adet:
+                summary += f" Kanalda eşleşen başka mesaj bulunamadı ({job.scanned} mesaj tarandı)."
+            if job.failed:
+                summary += f" {job.failed} mesaj silinemedi."
     except discord.Forbidden:
-        await interaction.followup.send("Mesajları silmek için yeterli yetkiye sahip değilim!", ephemeral=True)
+        summary = "Mesajları silmek için yeterli yetkiye sahip değilim!"
     except Exception as e:
-        await interaction.followup.send(f"Bir hata oluştu: {e}", ephemeral=True)
+        summary = f"Bir hata oluştu: {e}"
+    finally:
+        job.finished = True
+        purges.pop(channel.id, None)
+    
+    try:
+        await interaction.edit_original_response(content=summary, view=None)
+    except discord.HTTPException:
+        # Long purges outlive the interaction token; leave the result in the console instead
+        print(f"#{channel.name} temizliği bitti: {summary}")
+
+# Warnings escalate to a timeout once a member collects warn_threshold active
+# warnings (the moderation settings the GUI writes to config.json). The
+# warnings behind it are then retired, so the count starts over.
+def moderation_settings():
+    moderation = config.get("moderation") or {}
+    return int(moderation.get("warn_threshold", 3)), int(moderation.get("mute_duration", 300))
+
+def format_duration(seconds):
+    if seconds % 3600 == 0:
+        return f"{seconds // 3600} saat"
+    if seconds % 60 == 0:
+        return f"{seconds // 60} dakika"
+    return f"{seconds} saniye"
+
+async def escalate_warnings(member, warnings, mute_duration):
+    reason = f"{warnings} aktif uyarı (otomatik)"
+    # Discord caps timeouts at 28 days
+    duration = timedelta(seconds=min(mute_duration, 28 * 24 * 3600))
+    try:
+        await rest_scheduler.submit(
+            PRIORITY_MUTATION, f"guilds/{member.guild.id}/members",
+            lambda: member.timeout(duration, reason=reason)
+        )
+    except discord.HTTPException as e:
+        # Warnings stay active, so the next warning tries again
+        print(f"Otomatik susturma hatası: {e}")
+        return False
+    mod_cases.add_case(member.guild.id, member.id, bot.user.id, "timeout", reason)
+    mod_cases.clear_active_warnings(member.guild.id, member.id)
+    return True
 
 # Uyarı komutu
 @bot.tree.command(name="uyarı", description="Bir kullanıcıya uyarı ver")
@@ -1327,6 +4221,7 @@ async def clear(interaction: discord.Interaction, adet: int, kullanici: discord.
     sebep="Uyarı sebebi"
 )
 @app_commands.default_permissions(kick_members=True)
+@metrics.instrumented("warn")
 async def warn(interaction: discord.Interaction, kullanici: discord.Member, sebep: str):
     # Kendine uyarı veremez
     if kullanici == interaction.user:
@@ -1342,6 +4237,13 @@ async def warn(interaction: discord.Interaction, kullanici: discord.Member, sebe
         await interaction.response.send_message("Bu kullanıcıya uyarı vermek için yetkiniz yok! Sizden daha yüksek ya da aynı yetkide.", ephemeral=True)
         return
     
+    # Uyarıyı kaydet, eşiğe ulaşıldıysa otomatik sustur
+    case_id, active_warnings = mod_cases.add_case(interaction.guild.id, kullanici.id, interaction.user.id, "warn", sebep)
+    threshold, mute_duration = moderation_settings()
+    escalated = False
+    if threshold > 0 and active_warnings >= threshold:
+        escalated = await escalate_warnings(kullanici, active_warnings, mute_duration)
+    
     # Uyarı mesajları
     embed = discord.Embed(
         title="⚠️ Kullanıcı Uyarıldı",
@@ -1349,10 +4251,22 @@ async def warn(interaction: discord.Interaction, kullanici: discord.Member, sebe
         color=discord.Color.yellow()
     )
     embed.add_field(name="Sebep", value=sebep, inline=False)
+    if threshold > 0:
+        embed.add_field(name="Aktif Uyarı", value=f"{active_warnings}/{threshold}", inline=True)
+    embed.add_field(name="Kayıt", value=f"#{case_id}", inline=True)
+    if escalated:
+        embed.add_field(
+            name="🔇 Otomatik Susturma",
+            value=f"Uyarı sınırına ulaşıldığı için {format_duration(mute_duration)} susturuldu. Uyarılar sıfırlandı.",
+            inline=False
+        )
     embed.set_footer(text=f"{interaction.user} tarafından uyarıldı")
     add_default_footer(embed)
     
-    await interaction.response.send_message(embed=embed, ephemeral=False)
+    await rest_scheduler.submit(
+        PRIORITY_INTERACTION, f"interactions/{interaction.id}",
+        lambda: interaction.response.send_message(embed=embed, ephemeral=False)
+    )
     
     # DM olarak bildirim göndermeye çalış
     try:
@@ -1362,12 +4276,448 @@ async def warn(interaction: discord.Interaction, kullanici: discord.Member, sebe
             color=discord.Color.yellow()
         )
         dm_embed.add_field(name="Sebep", value=sebep, inline=False)
+        if escalated:
+            dm_embed.add_field(name="Susturma", value=f"Uyarı sınırına ulaştığınız için {format_duration(mute_duration)} susturuldunuz.", inline=False)
         add_default_footer(dm_embed)
         
-        await kullanici.send(embed=dm_embed)
+        await rest_scheduler.submit(
+            PRIORITY_BACKGROUND, f"users/{kullanici.id}/dm",
+            lambda: kullanici.send(embed=dm_embed)
+        )
     except:
         await interaction.followup.send(f"{kullanici.mention} kullanıcısına DM gönderilemedi, mesajları kapalı olabilir.", ephemeral=True)
 
+CASE_PAGE_SIZE = 10
+CASE_ACTION_NAMES = {
+    "warn": "⚠️ Uyarı",
+    "timeout": "🔇 Susturma",
+    "remove_timeout": "🔊 Susturma Kaldırıldı",
+    "kick": "👢 Atıldı",
+    "ban": "🔨 Yasaklandı"
+}
+
+# One page of a member's record; reads go through the (guild, user, id) index
+def build_case_page(guild, user_id, before=None, after=None):
+    rows, has_older, has_newer = mod_cases.history(guild.id, user_id, before=before, after=after, limit=CASE_PAGE_SIZE)
+    active_warnings, total_cases = mod_cases.counts(guild.id, user_id)
+    threshold, _ = moderation_settings()
+    
+    description = f"<@{user_id}> - {total_cases} kayıt, {active_warnings} aktif uyarı"
+    if threshold > 0:
+        description += f" (sınır {threshold})"
+    if not rows:
+        description += "\n\nKayıt bulunamadı."
+    embed = discord.Embed(title="📋 Sicil", description=description, color=discord.Color.blue())
+    for row in rows:
+        name = f"#{row['id']} {CASE_ACTION_NAMES.get(row['action'], row['action'])}"
+        if row["active"]:
+            name += " (aktif)"
+        moderator = f"<@{row['moderator_id']}>" if row["moderator_id"] else "Bilinmiyor"
+        value = f"{row['reason'] or 'Sebep belirtilmedi'}\nYetkili: {moderator} - <t:{int(row['created_at'])}:R>"
+        embed.add_field(name=name, value=value[:1024], inline=False)
+    add_default_footer(embed)
+    
+    view = discord.ui.View(timeout=None)
+    if rows and (has_older or has_newer):
+        view.add_item(CasePageButton(user_id, "newer", rows[0]["id"], disabled=not has_newer))
+        view.add_item(CasePageButton(user_id, "older", rows[-1]["id"], disabled=not has_older))
+    return embed, view
+
+@component_router.route("case_page")
+async def handle_case_page(interaction, argument=None):
+    user_id, direction, cursor = argument.split(":")
+    if direction == "older":
+        embed, view = build_case_page(interaction.guild, int(user_id), before=int(cursor))
+    else:
+        embed, view = build_case_page(interaction.guild, int(user_id), after=int(cursor))
+    await interaction.response.edit_message(embed=embed, view=view)
+
+# Sicil komutu
+@bot.tree.command(name="sicil", description="Bir kullanıcının uyarı ve ceza geçmişini göster")
+@app_commands.describe(kullanici="Geçmişi gösterilecek kullanıcı")
+@app_commands.default_permissions(kick_members=True)
+@metrics.instrumented("case_history")
+async def case_history(interaction: discord.Interaction, kullanici: discord.User):
+    embed, view = build_case_page(interaction.guild, kullanici.id)
+    await rest_scheduler.submit(
+        PRIORITY_INTERACTION, f"interactions/{interaction.id}",
+        lambda: interaction.response.send_message(embed=embed, view=view, ephemeral=True)
+    )
+
+# Raid response: one action (ban, kick or timeout) applied to many members.
+# Targets come from selectors - explicit ids, everyone who joined in the last
+# N minutes, a name fragment - and are shown for confirmation first. Bans go out
+# through Discord's bulk-ban endpoint, 200 users per request; everything else
+# is worked off by a small pool of workers whose calls pass through the REST
+# scheduler, so the global rate limit and 429s are handled there. DMs are
+# optional; kick/ban DMs are awaited (briefly) before the member is removed,
+# since they cannot be delivered afterwards, timeout DMs are only queued.
+BULK_MODERATION_CONCURRENCY = config.get("bulk_moderation_concurrency", 4)
+BULK_MODERATION_MAX = config.get("bulk_moderation_max", 1000)
+BULK_BAN_CHUNK = 200
+BULK_DM_TIMEOUT = 3
+BULK_NAME_FILTER_MAX = 100
+BULK_ACTIONS = {
+    "ban": {"done": "yasaklandı", "pending": "yasaklanacak", "dm": "sunucusundan yasaklandınız", "permission": "ban_members", "emoji": "🔨"},
+    "kick": {"done": "atıldı", "pending": "atılacak", "dm": "sunucusundan atıldınız", "permission": "kick_members", "emoji": "👢"},
+    "timeout": {"done": "susturuldu", "pending": "susturulacak", "dm": "sunucusunda susturuldunuz", "permission": "moderate_members", "emoji": "🔇"}
+}
+
+def parse_user_ids(text):
+    """User ids from free text: raw ids or mentions, separated by anything."""
+    return list(dict.fromkeys(int(match) for match in re.findall(r"[0-9]{15,20}", text or "")))
+
+# Why a member cannot be targeted by `moderator`, or None if they can
+def bulk_protection(member, moderator):
+    guild = member.guild
+    if member.id in (moderator.id, guild.owner_id) or member.id == bot.user.id:
+        return "korunan"
+    if member.bot:
+        return "bot"
+    if is_privileged_member(member):
+        return "yetkili"
+    if moderator.id != guild.owner_id and member.top_role >= moderator.top_role:
+        return "sizden yüksek rol"
+    if member.top_role >= guild.me.top_role:
+        return "bottan yüksek rol"
+    return None
+
+def select_bulk_targets(guild, moderator, action, user_ids=(), joined_minutes=None, name_filter=None):
+    """Members matched by the selectors; member filters combine, explicit ids are added."""
+    targets = {}
+    if joined_minutes or name_filter:
+        joined_since = discord.utils.utcnow() - timedelta(minutes=joined_minutes) if joined_minutes else None
+        # A plain substring, not a regex: linear in the name, whatever moderators type
+        name_filter = name_filter.casefold() if name_filter else None
+        for member in guild.members:
+            if joined_since and (member.joined_at is None or member.joined_at < joined_since):
+                continue
+            if name_filter and name_filter not in member.name.casefold() and name_filter not in member.display_name.casefold():
+                continue
+            targets[member.id] = member
+    for user_id in user_ids:
+        # Users who already left can still be banned by id
+        targets.setdefault(user_id, guild.get_member(user_id) or discord.Object(id=user_id))
+    
+    selected = []
+    skipped = Counter()
+    for target in targets.values():
+        if isinstance(target, discord.Member):
+            reason = bulk_protection(target, moderator)
+        else:
+            reason = None if action == "ban" else "sunucuda değil"
+        if reason:
+            skipped[reason] += 1
+        else:
+            selected.append(target)
+    return selected, skipped
+
+class BulkModerationJob:
+    def __init__(self, guild, moderator, action, targets, reason=None, duration=None, delete_message_days=0, send_dm=False):
+        self.guild = guild
+        self.moderator = moderator
+        self.action = action
+        self.targets = targets
+        self.reason = reason
+        self.duration = duration
+        self.delete_message_days = delete_message_days
+        self.send_dm = send_dm
+        self.audit_reason = f"Toplu işlem - {moderator}: {reason}" if reason else f"Toplu işlem - {moderator}"
+        self.done = 0
+        self.succeeded = []
+        self.failures = Counter()
+        self.cancelled = False
+        self.finished = False
+    
+    def cancel(self):
+        self.cancelled = True
+    
+    def progress_text(self):
+        failed = sum(self.failures.values())
+        return (
+            f"{BULK_ACTIONS[self.action]['emoji']} {self.done}/{len(self.targets)} işlendi: "
+            f"{len(self.succeeded)} kullanıcı {BULK_ACTIONS[self.action]['done']}, {failed} başarısız"
+        )
+    
+    def summary_text(self):
+        text = f"{len(self.succeeded)}/{len(self.targets)} kullanıcı {BULK_ACTIONS[self.action]['done']}."
+        if self.cancelled:
+            text += f" İşlem durduruldu, {len(self.targets) - self.done} kullanıcıya dokunulmadı."
+        if self.failures:
+            text += "\nBaşarısız: " + ", ".join(f"{count} {reason}" for reason, count in self.failures.most_common())
+        return text
+    
+    async def _notify(self, target):
+        if not self.send_dm or not isinstance(target, discord.Member):
+            return
+        dm_embed = discord.Embed(
+            title=f"{BULK_ACTIONS[self.action]['emoji']} {self.guild.name} {BULK_ACTIONS[self.action]['dm']}",
+            description=f"Yetkili: {self.moderator.mention}",
+            color=discord.Color.red()
+        )
+        dm_embed.add_field(name="Sebep", value=self.reason or "Sebep belirtilmedi", inline=False)
+        add_default_footer(dm_embed)
+        if self.action == "timeout":
+            # The member stays in the guild, so the DM queue can deliver it later
+            dm_queue.enqueue(target.id, embed=dm_embed)
+            return
+        # Kick/ban DMs cannot be delivered once the member has left: send now, but not for long
+        if dm_queue.has_closed_dms(target.id):
+            return
+        try:
+            await asyncio.wait_for(rest_scheduler.submit(
+                PRIORITY_MESSAGE, f"users/{target.id}/dm",
+                lambda: target.send(embed=dm_embed)
+            ), BULK_DM_TIMEOUT)
+        except (discord.HTTPException, asyncio.TimeoutError):
+            pass
+    
+    def _record_failure(self, error, count=1):
+        if isinstance(error, discord.NotFound):
+            self.failures["bulunamadı"] += count
+        elif isinstance(error, discord.Forbidden):
+            self.failures["yetki yok"] += count
+        else:
+            self.failures[f"HTTP {error.status}"] += count
+    
+    async def _bulk_ban(self, targets):
+        for start in range(0, len(targets), BULK_BAN_CHUNK):
+            if self.cancelled:
+                return
+            chunk = targets[start:start + BULK_BAN_CHUNK]
+            await asyncio.gather(*(self._notify(target) for target in chunk))
+            try:
+                result = await rest_scheduler.submit(
+                    PRIORITY_MUTATION, f"guilds/{self.guild.id}/bulk-ban",
+                    lambda: self.guild.bulk_ban(chunk, reason=self.audit_reason, delete_message_seconds=self.delete_message_days * 86400)
+                )
+                self.succeeded.extend(user.id for user in result.banned)
+                if result.failed:
+                    self.failures["zaten yasaklı veya bulunamadı"] += len(result.failed)
+            except discord.HTTPException as e:
+                self._record_failure(e, len(chunk))
+            self.done += len(chunk)
+    
+    async def _apply(self, target):
+        if self.action == "ban":
+            call = lambda: self.guild.ban(target, reason=self.audit_reason, delete_message_seconds=self.delete_message_days * 86400)
+        elif self.action == "kick":
+            call = lambda: target.kick(reason=self.audit_reason)
+        else:
+            call = lambda: target.timeout(self.duration, reason=self.audit_reason)
+        # One bucket per member so the pool really runs in parallel; discord.py
+        # still waits on Discord's shared guild bucket when it runs dry
+        await rest_scheduler.submit(PRIORITY_MUTATION, f"guilds/{self.guild.id}/members/{target.id}", call)
+    
+    async def _worker(self, queue):
+        while not self.cancelled:
+            try:
+                target = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            # Kick/ban DMs have to go out before the member leaves the guild
+            await self._notify(target)
+            try:
+                await self._apply(target)
+                self.succeeded.append(target.id)
+            except discord.HTTPException as e:
+                self._record_failure(e)
+            self.done += 1
+    
+    async def run(self):
+        try:
+            pending = list(self.targets)
+            # The bulk-ban endpoint also needs Manage Server; without it, ban one by one
+            if self.action == "ban" and self.guild.me.guild_permissions.manage_guild:
+                await self._bulk_ban(pending)
+                pending = []
+            if pending:
+                queue = asyncio.Queue()
+                for target in pending:
+                    queue.put_nowait(target)
+                workers = min(BULK_MODERATION_CONCURRENCY, len(pending))
+                await asyncio.gather(*(self._worker(queue) for _ in range(workers)))
+        finally:
+            self.finished = True
+            if self.succeeded:
+                mod_cases.add_cases(self.guild.id, self.succeeded, self.moderator.id, self.action, self.reason)
+
+# Bulk moderation jobs currently running, by guild id
+bulk_jobs = {}
+
+async def run_bulk_job(interaction, command_interaction, job):
+    guild = job.guild
+    bulk_jobs[guild.id] = job
+    view = discord.ui.View(timeout=None)
+    view.add_item(TicketActionButton("cancel_bulk", guild.id, "Durdur", discord.ButtonStyle.danger))
+    try:
+        await interaction.response.edit_message(content=job.progress_text(), embed=None, view=view)
+        spawn_background(report_job_progress(command_interaction, job, view), "toplu-ilerleme")
+        async with metrics.timed("bulk_moderation_run"):
+            await job.run()
+        summary = job.summary_text()
+    except Exception as e:
+        summary = f"Bir hata oluştu: {e}"
+    finally:
+        job.finished = True
+        bulk_jobs.pop(guild.id, None)
+    
+    try:
+        await command_interaction.edit_original_response(content=summary, embed=None, view=None)
+    except discord.HTTPException:
+        print(f"Toplu işlem bitti ({guild.name}): {summary}")
+    
+    log_embed = discord.Embed(
+        title=f"{BULK_ACTIONS[job.action]['emoji']} Toplu İşlem",
+        description=summary,
+        color=discord.Color.red(),
+        timestamp=datetime.now()
+    )
+    log_embed.add_field(name="Yetkili", value=job.moderator.mention, inline=True)
+    log_embed.add_field(name="Sebep", value=job.reason or "Sebep belirtilmedi", inline=True)
+    add_default_footer(log_embed)
+    log_pipeline.emit(guild.id, log_embed)
+
+class BulkConfirmView(discord.ui.View):
+    def __init__(self, command_interaction, job):
+        super().__init__(timeout=120)
+        self.command_interaction = command_interaction
+        self.job = job
+    
+    @discord.ui.button(label="Onayla", style=discord.ButtonStyle.danger)
+    async def confirm(self, interaction, button):
+        self.stop()
+        if self.job.guild.id in bulk_jobs:
+            await interaction.response.edit_message(content="Bu sunucuda zaten bir toplu işlem sürüyor.", embed=None, view=None)
+            return
+        await run_bulk_job(interaction, self.command_interaction, self.job)
+    
+    @discord.ui.button(label="Vazgeç", style=discord.ButtonStyle.secondary)
+    async def abort(self, interaction, button):
+        self.stop()
+        await interaction.response.edit_message(content="Toplu işlem iptal edildi.", embed=None, view=None)
+
+@component_router.route("cancel_bulk")
+async def handle_cancel_bulk(interaction, argument=None):
+    job = bulk_jobs.get(int(argument)) if argument else None
+    if job is None or job.finished:
+        await interaction.response.send_message("Durdurulacak bir toplu işlem yok.", ephemeral=True)
+        return
+    job.cancel()
+    await interaction.response.edit_message(content=f"{job.progress_text()}\nDurduruluyor...", view=None)
+
+# Toplu moderasyon komutu
+@bot.tree.command(name="toplu", description="Birden fazla kullanıcıyı aynı anda yasakla, at veya sustur")
+@app_commands.describe(
+    islem="Uygulanacak işlem",
+    idler="Kullanıcı ID'leri veya etiketleri (boşluk ya da virgülle ayrılmış)",
+    son_katilan="Son N dakikada sunucuya katılan herkes",
+    isim="Kullanıcı adında veya sunucu takma adında bu metin geçenler (büyük/küçük harf fark etmez)",
+    sebep="Sebep (isteğe bağlı)",
+    sure="Susturma süresi, dakika (varsayılan: moderasyon ayarlarındaki süre)",
+    mesaj_sil="Yasaklananların son X gündeki mesajlarını sil",
+    dm="Kullanıcılara DM ile bildir"
+)
+@app_commands.choices(
+    islem=[
+        app_commands.Choice(name="Yasakla", value="ban"),
+        app_commands.Choice(name="At", value="kick"),
+        app_commands.Choice(name="Sustur", value="timeout")
+    ],
+    mesaj_sil=[
+        app_commands.Choice(name="Silme", value=0),
+        app_commands.Choice(name="Son 1 gün", value=1),
+        app_commands.Choice(name="Son 3 gün", value=3),
+        app_commands.Choice(name="Son 7 gün", value=7)
+    ]
+)
+# No default_permissions: Discord can only require all of a set, and each
+# action needs a different one (ban_members, kick_members, moderate_members),
+# so the permission for the chosen action is checked below instead
+@app_commands.guild_only()
+@metrics.instrumented("bulk_moderation")
+async def bulk_moderation(
+    interaction: discord.Interaction,
+    islem: str,
+    idler: str = None,
+    son_katilan: int = None,
+    isim: str = None,
+    sebep: str = None,
+    sure: int = None,
+    mesaj_sil: int = 0,
+    dm: bool = False
+):
+    guild = interaction.guild
+    permission = BULK_ACTIONS[islem]["permission"]
+    if not getattr(interaction.user.guild_permissions, permission):
+        await interaction.response.send_message("Bu işlem için yetkiniz yok!", ephemeral=True)
+        return
+    if not getattr(guild.me.guild_permissions, permission):
+        await interaction.response.send_message("Bu işlem için yeterli yetkiye sahip değilim!", ephemeral=True)
+        return
+    if not (idler or son_katilan or isim):
+        await interaction.response.send_message("En az bir seçici girin: `idler`, `son_katilan` veya `isim`.", ephemeral=True)
+        return
+    if son_katilan is not None and son_katilan < 1:
+        await interaction.response.send_message("Dakika en az 1 olmalı.", ephemeral=True)
+        return
+    
+    if isim and len(isim) > BULK_NAME_FILTER_MAX:
+        await interaction.response.send_message(f"İsim en fazla {BULK_NAME_FILTER_MAX} karakter olabilir.", ephemeral=True)
+        return
+    
+    duration = None
+    if islem == "timeout":
+        seconds = sure * 60 if sure is not None else moderation_settings()[1]
+        if seconds <= 0 or seconds > 28 * 24 * 3600:
+            await interaction.response.send_message("Susturma süresi 1 dakika ile 28 gün arasında olmalı!", ephemeral=True)
+            return
+        duration = timedelta(seconds=seconds)
+    
+    await interaction.response.defer(ephemeral=True)
+    
+    # Join/name selectors need the full member list
+    if (son_katilan or isim) and not guild.chunked:
+        await guild.chunk()
+    targets, skipped = select_bulk_targets(guild, interaction.user, islem, parse_user_ids(idler), son_katilan, isim)
+    
+    skipped_text = ", ".join(f"{count} {reason}" for reason, count in skipped.most_common())
+    if not targets:
+        message = "Seçicilere uyan kullanıcı bulunamadı."
+        if skipped_text:
+            message += f" Atlananlar: {skipped_text}"
+        await interaction.edit_original_response(content=message)
+        return
+    if len(targets) > BULK_MODERATION_MAX:
+        await interaction.edit_original_response(
+            content=f"{len(targets)} kullanıcı seçildi, tek seferde en fazla {BULK_MODERATION_MAX} kullanıcıya işlem yapılabilir. Seçicileri daraltın."
+        )
+        return
+    
+    job = BulkModerationJob(guild, interaction.user, islem, targets, sebep, duration, mesaj_sil, dm)
+    
+    embed = discord.Embed(
+        title=f"{BULK_ACTIONS[islem]['emoji']} Toplu İşlem Onayı",
+        description=f"**{len(targets)}** kullanıcı {BULK_ACTIONS[islem]['pending']}. Onaylıyor musunuz?",
+        color=discord.Color.red()
+    )
+    preview = [target.mention if isinstance(target, discord.Member) else f"<@{target.id}>" for target in targets[:20]]
+    if len(targets) > 20:
+        preview.append(f"... ve {len(targets) - 20} kullanıcı daha")
+    embed.add_field(name="Kullanıcılar", value=" ".join(preview)[:1024], inline=False)
+    if skipped_text:
+        embed.add_field(name="Atlananlar", value=skipped_text, inline=False)
+    if duration:
+        embed.add_field(name="Süre", value=format_duration(int(duration.total_seconds())), inline=True)
+    embed.add_field(name="Sebep", value=sebep or "Sebep belirtilmedi", inline=True)
+    add_default_footer(embed)
+    
+    await interaction.edit_original_response(embed=embed, view=BulkConfirmView(interaction, job))
+
 # Start the bot
 if __name__ == "__main__":
-    bot.run(config["token"]) 
\ No newline at end of file
+    try:
+        bot.run(config["token"])
+    finally:
+        # Force out anything still waiting in the write-behind buffer
+        config_store.flush()
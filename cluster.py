@@ -0,0 +1,213 @@
+"""Runs the bot as a cluster of worker processes, each owning a range of shards.
+
+    python cluster.py --workers 4            # shard count from Discord
+    python cluster.py --workers 4 --shards 16
+
+Every worker is a normal `python bot.py` process in AutoShardedBot mode. It gets
+its shard ids and the launcher's IPC address through DISCOSOFT_* environment
+variables. Workers are started one after another: the next one starts when the
+previous has reported ready, which keeps shard IDENTIFYs within Discord's
+concurrency limit. Messages a worker sends (other than hello/ready/stats) are
+relayed to all other workers. A worker that exits unexpectedly is restarted
+with the same shard range.
+"""
+import argparse
+import json
+import os
+import secrets
+import signal
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from multiprocessing.connection import Listener
+
+BOT_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIG_PATH = os.path.join(BOT_DIR, "config.json")
+# Handled by the launcher itself instead of being relayed
+LAUNCHER_KINDS = {"hello", "ready", "stats"}
+
+def recommended_shard_count(token):
+    request = urllib.request.Request(
+        "https://discord.com/api/v10/gateway/bot",
+        headers={"Authorization": f"Bot {token}", "User-Agent": "DiscordBot (discosoft-cluster, 1.0)"}
+    )
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return json.load(response)["shards"]
+
+def split_shards(shard_count, workers):
+    """Contiguous shard ranges, as even as possible: 10 shards / 3 workers -> 4, 3, 3."""
+    base, extra = divmod(shard_count, workers)
+    ranges, start = [], 0
+    for worker_id in range(workers):
+        size = base + (1 if worker_id < extra else 0)
+        ranges.append(list(range(start, start + size)))
+        start += size
+    return [shard_ids for shard_ids in ranges if shard_ids]
+
+class Worker:
+    def __init__(self, worker_id, shard_ids):
+        self.worker_id = worker_id
+        self.shard_ids = shard_ids
+        self.process = None
+        self.conn = None
+        self.ready = threading.Event()
+        self.stats = {}
+        self.restarts = 0
+        self.started_at = 0.0
+
+class ClusterLauncher:
+    def __init__(self, shard_count, workers, script=os.path.join(BOT_DIR, "bot.py"), python=sys.executable, extra_env=None):
+        self.shard_count = shard_count
+        self.workers = [Worker(i, shard_ids) for i, shard_ids in enumerate(split_shards(shard_count, workers))]
+        self.script = script
+        self.python = python
+        self.extra_env = extra_env or {}
+        self.authkey = secrets.token_bytes(32)
+        self.listener = Listener(("127.0.0.1", 0), authkey=self.authkey)
+        self.relayed = 0
+        # Called with every message from a worker (used by cluster_bench.py)
+        self.listeners = []
+        self._lock = threading.Lock()
+        self._stopping = False
+
+    @property
+    def address(self):
+        host, port = self.listener.address
+        return f"{host}:{port}"
+
+    # ------------------------------------------------------------------ IPC
+
+    def _accept_loop(self):
+        while not self._stopping:
+            try:
+                conn = self.listener.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        worker = None
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                break
+            kind = message.get("kind")
+            if kind == "hello":
+                worker = self.workers[message["worker_id"]]
+                with self._lock:
+                    worker.conn = conn
+            elif kind == "ready" and worker is not None:
+                worker.ready.set()
+                print(f"[küme] işçi {worker.worker_id} hazır ({message.get('guilds')} sunucu, "
+                      f"{time.monotonic() - worker.started_at:.1f} sn)")
+            elif kind == "stats" and worker is not None:
+                worker.stats = message
+            for listener in self.listeners:
+                listener(message)
+            if kind not in LAUNCHER_KINDS:
+                self.broadcast(message, exclude=conn)
+        with self._lock:
+            if worker is not None and worker.conn is conn:
+                worker.conn = None
+
+    def broadcast(self, message, exclude=None):
+        with self._lock:
+            targets = [w.conn for w in self.workers if w.conn is not None and w.conn is not exclude]
+        for conn in targets:
+            try:
+                conn.send(message)
+                self.relayed += 1
+            except OSError:
+                pass
+
+    # ------------------------------------------------------------ processes
+
+    def _spawn(self, worker):
+        env = dict(os.environ, **self.extra_env)
+        env.update({
+            "DISCOSOFT_SHARD_IDS": ",".join(map(str, worker.shard_ids)),
+            "DISCOSOFT_SHARD_COUNT": str(self.shard_count),
+            "DISCOSOFT_WORKER_ID": str(worker.worker_id),
+            "DISCOSOFT_WORKERS": str(len(self.workers)),
+            "DISCOSOFT_IPC_ADDRESS": self.address,
+            "DISCOSOFT_IPC_KEY": self.authkey.hex()
+        })
+        worker.ready.clear()
+        worker.started_at = time.monotonic()
+        worker.process = subprocess.Popen([self.python, self.script], cwd=BOT_DIR, env=env)
+        print(f"[küme] işçi {worker.worker_id} başlatıldı (pid {worker.process.pid}, shard {worker.shard_ids[0]}-{worker.shard_ids[-1]})")
+
+    def start(self, ready_timeout=120):
+        threading.Thread(target=self._accept_loop, name="kume-dinleyici", daemon=True).start()
+        print(f"[küme] {self.shard_count} shard, {len(self.workers)} işçi, IPC {self.address}")
+        for worker in self.workers:
+            self._spawn(worker)
+            if not worker.ready.wait(ready_timeout):
+                print(f"[küme] işçi {worker.worker_id} {ready_timeout} sn içinde hazır olmadı, devam ediliyor")
+
+    def supervise(self, stats_interval=60):
+        last_stats = time.monotonic()
+        while not self._stopping:
+            time.sleep(1)
+            for worker in self.workers:
+                code = worker.process.poll()
+                if code is None or self._stopping:
+                    continue
+                # Back off a little more after every crash, up to a minute
+                worker.restarts += 1
+                delay = min(60, 2 ** min(worker.restarts, 6))
+                print(f"[küme] işçi {worker.worker_id} çıktı (kod {code}), {delay} sn sonra yeniden başlatılıyor")
+                time.sleep(delay)
+                self._spawn(worker)
+            if time.monotonic() - last_stats >= stats_interval:
+                last_stats = time.monotonic()
+                self.print_stats()
+
+    def print_stats(self):
+        guilds = sum(w.stats.get("guilds", 0) for w in self.workers)
+        open_tickets = sum(w.stats.get("open_tickets", 0) for w in self.workers)
+        latencies = [w.stats["latency_ms"] for w in self.workers if w.stats.get("latency_ms") is not None]
+        latency = f", gecikme en fazla {max(latencies):.0f} ms" if latencies else ""
+        print(f"[küme] {guilds} sunucu, {open_tickets} açık talep, {self.relayed} mesaj aktarıldı{latency}")
+
+    def stop(self, timeout=30):
+        self._stopping = True
+        self.broadcast({"kind": "shutdown", "worker_id": None})
+        deadline = time.monotonic() + timeout
+        for worker in self.workers:
+            if worker.process is None:
+                continue
+            try:
+                worker.process.wait(max(0.1, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                worker.process.terminate()
+        self.listener.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Botu birden fazla işçi sürecinde, shard'lara bölerek çalıştır")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="işçi süreç sayısı")
+    parser.add_argument("--shards", type=int, help="toplam shard sayısı (varsayılan: config.json'daki shard_count, yoksa Discord'un önerisi)")
+    args = parser.parse_args()
+
+    with open(CONFIG_PATH) as f:
+        config = json.load(f)
+    shard_count = args.shards or config.get("shard_count") or recommended_shard_count(config["token"])
+    launcher = ClusterLauncher(shard_count, min(args.workers, shard_count))
+
+    # Ctrl+C / SIGTERM: ask workers to close cleanly (flushing logs and config) before exiting
+    def handle_signal(signum, frame):
+        raise KeyboardInterrupt
+    signal.signal(signal.SIGTERM, handle_signal)
+    try:
+        launcher.start()
+        launcher.supervise()
+    except KeyboardInterrupt:
+        print("[küme] kapatılıyor...")
+    finally:
+        launcher.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Gateway event throughput of the bot at different cluster sizes, fully offline.
+
+    python cluster_bench.py --workers 1 2 4 --events 20000
+
+For every cluster size, cluster.py's launcher starts that many workers, each
+owning one shard. Every worker runs bot.py against its own fake_discord.py
+gateway. Once all workers are ready, each one is sent `--events` MESSAGE_CREATE
+dispatches and counts them through on_message. Throughput is the total number
+of events divided by the slowest worker's time, so it only scales when the
+workers really run in parallel (one per core).
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+import yarl
+
+from cluster import ClusterLauncher
+from fake_discord import FakeDiscord, OP_DISPATCH
+
+BENCH_ENV = "DISCOSOFT_BENCH_EVENTS"
+
+async def run_worker(events):
+    server = FakeDiscord(users=1)
+    await server.start()
+
+    workdir = tempfile.mkdtemp(prefix="discosoft-kume-")
+    with open(os.path.join(workdir, "config.json"), "w") as f:
+        json.dump({"token": "fake-token"}, f)
+    os.chdir(workdir)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    import discord
+    import bot as discosoft
+
+    discord.http.Route.BASE = server.api_base
+    discord.gateway.DiscordWebSocket.DEFAULT_GATEWAY = yarl.URL(server.gateway_url)
+
+    # Encode the flood up front so the fake gateway costs as little as possible
+    author = server.customers[0]
+    frames = []
+    for sequence in range(events):
+        message = server.message_payload(server.panel_channel, author, {"content": f"mesaj {sequence}"})
+        message["member"] = {"roles": [], "joined_at": message["timestamp"], "deaf": False, "mute": False, "flags": 0}
+        frames.append(json.dumps({"op": OP_DISPATCH, "t": "MESSAGE_CREATE", "s": sequence + 1000, "d": message}))
+
+    done = asyncio.Event()
+    counted = 0
+
+    async def count_message(message):
+        nonlocal counted
+        counted += 1
+        if counted >= events:
+            done.set()
+    discosoft.bot.add_listener(count_message, "on_message")
+
+    async def flood():
+        started = time.perf_counter()
+        await server.send_frames(frames)
+        await done.wait()
+        discosoft.cluster.send("bench_result", events=counted, seconds=time.perf_counter() - started)
+
+    @discosoft.cluster.handler("bench_start")
+    def start_bench(message):
+        discosoft.spawn_background(flood(), "kume-olcum")
+
+    try:
+        await discosoft.bot.start("fake-token")
+    finally:
+        await server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def run_round(workers, events, timeout):
+    launcher = ClusterLauncher(workers, workers, script=os.path.abspath(__file__), extra_env={BENCH_ENV: str(events)})
+    results = {}
+    finished = threading.Event()
+
+    def collect(message):
+        if message.get("kind") == "bench_result":
+            results[message["worker_id"]] = message
+            if len(results) == len(launcher.workers):
+                finished.set()
+    launcher.listeners.append(collect)
+
+    try:
+        launcher.start(ready_timeout=60)
+        launcher.broadcast({"kind": "bench_start", "worker_id": None})
+        if not finished.wait(timeout):
+            print(f"{workers} işçi: {len(results)}/{workers} sonuç {timeout} sn içinde gelmedi")
+    finally:
+        launcher.stop()
+    if not results:
+        return None
+    total = sum(result["events"] for result in results.values())
+    slowest = max(result["seconds"] for result in results.values())
+    return total, slowest
+
+def main():
+    parser = argparse.ArgumentParser(description="İşçi sayısına göre gateway olay işleme hızı (çevrimdışı)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="denenecek işçi sayıları")
+    parser.add_argument("--events", type=int, default=20000, help="işçi başına olay sayısı")
+    parser.add_argument("--timeout", type=float, default=300, help="tur başına zaman aşımı (sn)")
+    args = parser.parse_args()
+
+    rows = []
+    for workers in args.workers:
+        result = run_round(workers, args.events, args.timeout)
+        if result is not None:
+            rows.append((workers, *result))
+
+    print()
+    print(f"CPU çekirdeği: {os.cpu_count()}")
+    print(f"{'işçi':>5}{'olay':>10}{'süre (sn)':>12}{'olay/sn':>12}{'hızlanma':>10}")
+    baseline = rows[0][1] / rows[0][2] if rows else None
+    for workers, total, seconds in rows:
+        rate = total / seconds
+        print(f"{workers:>5}{total:>10}{seconds:>12.2f}{rate:>12.0f}{rate / baseline:>9.2f}x")
+
+if __name__ == "__main__":
+    if os.environ.get(BENCH_ENV):
+        asyncio.run(run_worker(int(os.environ[BENCH_ENV])))
+    else:
+        main()
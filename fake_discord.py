@@ -0,0 +1,728 @@
+"""Local stand-in for the Discord gateway and REST API.
+
+Speaks just enough of both for discord.py to log in, receive a guild and run
+the ticket flows: guilds, channels, permission overwrites, messages, DMs and
+interactions. Every REST route has a per-bucket rate limit that answers with
+429 and the usual X-RateLimit-* headers once it is exhausted.
+
+Used by loadtest.py; discord.py is pointed at it with:
+
+    discord.http.Route.BASE = server.api_base
+    discord.gateway.DiscordWebSocket.DEFAULT_GATEWAY = yarl.URL(server.gateway_url)
+"""
+import asyncio
+import itertools
+import json
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+
+from aiohttp import web, WSMsgType
+
+API_PREFIX = "/api/v10"
+DISCORD_EPOCH = 1420070400000
+
+# Gateway opcodes
+OP_DISPATCH = 0
+OP_HEARTBEAT = 1
+OP_IDENTIFY = 2
+OP_RESUME = 6
+OP_REQUEST_MEMBERS = 8
+OP_HELLO = 10
+OP_HEARTBEAT_ACK = 11
+
+# Interaction types / callback types
+INTERACTION_COMPONENT = 3
+INTERACTION_MODAL_SUBMIT = 5
+CALLBACK_MESSAGE = 4
+CALLBACK_DEFERRED_MESSAGE = 5
+CALLBACK_UPDATE_MESSAGE = 7
+CALLBACK_MODAL = 9
+
+# Channel types
+CHANNEL_TEXT = 0
+CHANNEL_DM = 1
+CHANNEL_CATEGORY = 4
+
+EPHEMERAL_FLAG = 1 << 6
+ADMINISTRATOR = 1 << 3
+
+def json_response(data, status=200, headers=None):
+    # discord.py only decodes bodies whose content type is exactly application/json
+    return web.Response(body=json.dumps(data).encode(), status=status, headers=headers, content_type="application/json")
+
+async def read_body(request):
+    """JSON body of a request; for multipart uploads, payload_json plus attachment stubs."""
+    if not request.content_type.startswith("multipart/"):
+        return await request.json()
+    body, attachments = {}, []
+    reader = await request.multipart()
+    async for part in reader:
+        data = await part.read()
+        if part.name == "payload_json":
+            body = json.loads(data)
+        elif part.filename:
+            attachments.append({"filename": part.filename, "size": len(data)})
+    body["attachments"] = attachments
+    return body
+
+def now_iso():
+    return datetime.now(timezone.utc).isoformat()
+
+def user_payload(user_id, name, bot=False):
+    return {
+        "id": str(user_id),
+        "username": name,
+        "global_name": name,
+        "discriminator": "0",
+        "avatar": None,
+        "bot": bot
+    }
+
+# Sliding-window bucket limiter keyed like Discord's buckets (route + major id)
+class BucketLimiter:
+    def __init__(self, limit, window):
+        self.limit = limit
+        self.window = window
+        self.buckets = {}
+
+    def hit(self, key):
+        """Returns (allowed, remaining, reset_after)."""
+        now = time.monotonic()
+        used, reset_at = self.buckets.get(key, (0, now + self.window))
+        if now >= reset_at:
+            used, reset_at = 0, now + self.window
+        if used >= self.limit:
+            return False, 0, reset_at - now
+        used += 1
+        self.buckets[key] = (used, reset_at)
+        return True, self.limit - used, reset_at - now
+
+class FakeDiscord:
+    def __init__(self, users=10, rest_latency=0.0, bucket_limit=10, bucket_window=1.0):
+        self._ids = itertools.count(int(time.time() * 1000 - DISCORD_EPOCH) << 22)
+        self.rest_latency = rest_latency
+        self.limiter = BucketLimiter(bucket_limit, bucket_window)
+
+        # Request accounting for the load driver
+        self.request_counts = Counter()
+        self.rate_limited = Counter()
+        self.unhandled = Counter()
+
+        self.sockets = set()
+        self.sequence = 0
+        self.pending_interactions = {}
+        # Called with (event, data) for every gateway dispatch; lets drivers wait on side effects
+        self.listeners = []
+
+        self.application_id = self.snowflake()
+        self.bot_user = user_payload(self.application_id, "Discosoft", bot=True)
+        self.guild_id = self.snowflake()
+
+        self.roles = {}
+        self.everyone_role = self.add_role("@everyone", 0, role_id=self.guild_id)
+        self.bot_role = self.add_role("Bot", ADMINISTRATOR)
+        self.staff_role = self.add_role("Yetkili", 0)
+        self.support_role = self.add_role("Destek Ekibi", 0)
+
+        self.users = {self.application_id: self.bot_user}
+        self.members = {}
+        self.bans = set()
+        self.add_member(self.bot_user, [self.bot_role])
+        self.staff_user = self.add_user("yetkili")
+        self.add_member(self.staff_user, [self.staff_role])
+        self.customers = []
+        for index in range(users):
+            user = self.add_user(f"musteri{index}")
+            self.add_member(user, [])
+            self.customers.append(user)
+
+        self.channels = {}
+        self.messages = defaultdict(dict)
+        self.dm_channels = {}
+        self.panel_channel = self.add_channel("destek", CHANNEL_TEXT)
+        self.log_channel = self.add_channel("talep-log", CHANNEL_TEXT)
+        self.archive_category = self.add_channel("Arşiv", CHANNEL_CATEGORY)
+
+        self.app = web.Application()
+        self._setup_routes()
+        self._runner = None
+        self.port = None
+
+    # ------------------------------------------------------------------ state
+
+    def snowflake(self):
+        return next(self._ids)
+
+    def add_role(self, name, permissions, role_id=None):
+        role_id = role_id or self.snowflake()
+        self.roles[role_id] = {
+            "id": str(role_id),
+            "name": name,
+            "permissions": str(permissions),
+            "position": len(self.roles),
+            "color": 0,
+            "hoist": False,
+            "managed": False,
+            "mentionable": False,
+            "flags": 0
+        }
+        return role_id
+
+    def add_user(self, name):
+        user = user_payload(self.snowflake(), name)
+        self.users[int(user["id"])] = user
+        return user
+
+    def add_member(self, user, roles):
+        self.members[int(user["id"])] = {
+            "user": user,
+            "roles": [str(role_id) for role_id in roles],
+            "joined_at": now_iso(),
+            "deaf": False,
+            "mute": False,
+            "flags": 0
+        }
+
+    def add_channel(self, name, channel_type, parent_id=None, overwrites=None):
+        channel_id = self.snowflake()
+        self.channels[channel_id] = {
+            "id": str(channel_id),
+            "guild_id": str(self.guild_id),
+            "name": name,
+            "type": channel_type,
+            "position": len(self.channels),
+            "parent_id": str(parent_id) if parent_id else None,
+            "permission_overwrites": overwrites or [],
+            "nsfw": False,
+            "topic": None,
+            "last_message_id": None,
+            "rate_limit_per_user": 0
+        }
+        return channel_id
+
+    def guild_payload(self):
+        return {
+            "id": str(self.guild_id),
+            "name": "Discosoft Yük Testi",
+            "icon": None,
+            "owner_id": self.staff_user["id"],
+            "roles": list(self.roles.values()),
+            "emojis": [],
+            "stickers": [],
+            "features": [],
+            "channels": list(self.channels.values()),
+            "members": list(self.members.values()),
+            "member_count": len(self.members),
+            "threads": [],
+            "stage_instances": [],
+            "guild_scheduled_events": [],
+            "presences": [],
+            "voice_states": [],
+            "large": False,
+            "unavailable": False,
+            "verification_level": 0,
+            "default_message_notifications": 0,
+            "explicit_content_filter": 0,
+            "mfa_level": 0,
+            "premium_tier": 0,
+            "preferred_locale": "tr",
+            "nsfw_level": 0,
+            "system_channel_flags": 0,
+            "joined_at": now_iso()
+        }
+
+    def message_payload(self, channel_id, author, body):
+        message_id = self.snowflake()
+        message = {
+            "id": str(message_id),
+            "channel_id": str(channel_id),
+            "type": 0,
+            "content": body.get("content") or "",
+            "author": author,
+            "attachments": [
+                {
+                    "id": str(self.snowflake()),
+                    "filename": attachment["filename"],
+                    "size": attachment.get("size", 0),
+                    "url": f"http://127.0.0.1:{self.port}/attachments/{attachment['filename']}",
+                    "proxy_url": f"http://127.0.0.1:{self.port}/attachments/{attachment['filename']}"
+                }
+                for attachment in body.get("attachments") or []
+            ],
+            "embeds": body.get("embeds") or [],
+            "components": body.get("components") or [],
+            "mentions": [],
+            "mention_roles": [],
+            "mention_everyone": False,
+            "pinned": False,
+            "tts": False,
+            "flags": body.get("flags") or 0,
+            "timestamp": now_iso(),
+            "edited_timestamp": None
+        }
+        if channel_id in self.channels:
+            message["guild_id"] = str(self.guild_id)
+        return message
+
+    # ---------------------------------------------------------------- gateway
+
+    async def dispatch(self, event, data):
+        self.sequence += 1
+        payload = json.dumps({"op": OP_DISPATCH, "t": event, "s": self.sequence, "d": data})
+        for ws in list(self.sockets):
+            try:
+                await ws.send_str(payload)
+            except ConnectionResetError:
+                self.sockets.discard(ws)
+        for listener in self.listeners:
+            listener(event, data)
+
+    async def send_frames(self, frames):
+        """Pushes pre-encoded dispatch frames to every socket (for throughput benchmarks)."""
+        for frame in frames:
+            for ws in list(self.sockets):
+                await ws.send_str(frame)
+
+    async def gateway(self, request):
+        ws = web.WebSocketResponse(heartbeat=None)
+        await ws.prepare(request)
+        await ws.send_json({"op": OP_HELLO, "d": {"heartbeat_interval": 41250}})
+        async for message in ws:
+            if message.type != WSMsgType.TEXT:
+                continue
+            payload = json.loads(message.data)
+            op = payload.get("op")
+            if op == OP_HEARTBEAT:
+                await ws.send_json({"op": OP_HEARTBEAT_ACK})
+            elif op in (OP_IDENTIFY, OP_RESUME):
+                self.sockets.add(ws)
+                await self.dispatch("READY", {
+                    "v": 10,
+                    "user": self.bot_user,
+                    "guilds": [{"id": str(self.guild_id), "unavailable": True}],
+                    "session_id": "fake-session",
+                    "resume_gateway_url": self.gateway_url,
+                    "application": {"id": str(self.application_id), "flags": 0},
+                    "shard": payload["d"].get("shard") or [0, 1]
+                })
+                await self.dispatch("GUILD_CREATE", self.guild_payload())
+            elif op == OP_REQUEST_MEMBERS:
+                await self.dispatch("GUILD_MEMBERS_CHUNK", {
+                    "guild_id": str(self.guild_id),
+                    "members": list(self.members.values()),
+                    "chunk_index": 0,
+                    "chunk_count": 1,
+                    "nonce": payload["d"].get("nonce")
+                })
+        self.sockets.discard(ws)
+        return ws
+
+    # ----------------------------------------------------------- interactions
+
+    async def interact(self, interaction_type, user, channel_id, data, message=None, follow_deferred=False):
+        """Sends an INTERACTION_CREATE and returns the bot's callback payload.
+
+        With follow_deferred, a deferred callback is followed through to the
+        first followup message, returned in the callback's "data" slot."""
+        interaction_id = self.snowflake()
+        token = f"token-{interaction_id}"
+        channel = self.channels[channel_id]
+        payload = {
+            "id": str(interaction_id),
+            "application_id": str(self.application_id),
+            "type": interaction_type,
+            "token": token,
+            "version": 1,
+            "guild_id": str(self.guild_id),
+            "channel_id": str(channel_id),
+            "channel": {"id": str(channel_id), "type": channel["type"], "guild_id": str(self.guild_id)},
+            "member": dict(self.members[int(user["id"])], permissions="0"),
+            "data": data,
+            "app_permissions": str(ADMINISTRATOR),
+            "locale": "tr",
+            "guild_locale": "tr",
+            "entitlements": [],
+            "authorizing_integration_owners": {"0": str(self.guild_id)},
+            "context": 0,
+            "attachment_size_limit": 8 * 1024 * 1024
+        }
+        if message is not None:
+            payload["message"] = message
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        followup = loop.create_future()
+        self.pending_interactions[token] = {"future": future, "followup": followup, "channel_id": channel_id, "message": message}
+        await self.dispatch("INTERACTION_CREATE", payload)
+        callback = await future
+        if follow_deferred and callback["type"] == CALLBACK_DEFERRED_MESSAGE:
+            callback = {"type": callback["type"], "data": await followup}
+        return callback
+
+    # ------------------------------------------------------------------- REST
+
+    def _setup_routes(self):
+        add = self.app.router.add_route
+        add("GET", "/gateway", self.gateway)
+        add("GET", API_PREFIX + "/gateway/bot", self.get_gateway_bot)
+        add("GET", API_PREFIX + "/users/@me", self.get_me)
+        add("GET", API_PREFIX + "/oauth2/applications/@me", self.get_application)
+        add("PUT", API_PREFIX + "/applications/{application_id}/commands", self.put_commands)
+        add("GET", API_PREFIX + "/users/{user_id}", self.get_user)
+        add("POST", API_PREFIX + "/users/@me/channels", self.create_dm)
+        add("POST", API_PREFIX + "/guilds/{guild_id}/channels", self.create_channel)
+        add("PATCH", API_PREFIX + "/guilds/{guild_id}/members/{user_id}", self.edit_member)
+        add("DELETE", API_PREFIX + "/guilds/{guild_id}/members/{user_id}", self.kick_member)
+        add("PUT", API_PREFIX + "/guilds/{guild_id}/bans/{user_id}", self.ban_member)
+        add("POST", API_PREFIX + "/guilds/{guild_id}/bulk-ban", self.bulk_ban)
+        add("GET", API_PREFIX + "/channels/{channel_id}", self.get_channel)
+        add("PATCH", API_PREFIX + "/channels/{channel_id}", self.edit_channel)
+        add("DELETE", API_PREFIX + "/channels/{channel_id}", self.delete_channel)
+        add("PUT", API_PREFIX + "/channels/{channel_id}/permissions/{overwrite_id}", self.put_overwrite)
+        add("DELETE", API_PREFIX + "/channels/{channel_id}/permissions/{overwrite_id}", self.delete_overwrite)
+        add("GET", API_PREFIX + "/channels/{channel_id}/messages", self.get_messages)
+        add("POST", API_PREFIX + "/channels/{channel_id}/messages", self.create_message)
+        add("PATCH", API_PREFIX + "/channels/{channel_id}/messages/{message_id}", self.edit_message)
+        add("DELETE", API_PREFIX + "/channels/{channel_id}/messages/{message_id}", self.delete_message)
+        add("POST", API_PREFIX + "/channels/{channel_id}/messages/bulk-delete", self.bulk_delete_messages)
+        add("POST", API_PREFIX + "/interactions/{interaction_id}/{token}/callback", self.interaction_callback)
+        add("POST", API_PREFIX + "/webhooks/{application_id}/{token}", self.followup)
+        add("GET", API_PREFIX + "/webhooks/{application_id}/{token}/messages/@original", self.get_original)
+        add("PATCH", API_PREFIX + "/webhooks/{application_id}/{token}/messages/@original", self.edit_original)
+        add("*", API_PREFIX + "/{tail:.*}", self.unhandled_route)
+        self.app.middlewares.append(self.rest_middleware)
+
+    @web.middleware
+    async def rest_middleware(self, request, handler):
+        if not request.path.startswith(API_PREFIX):
+            return await handler(request)
+
+        # Bucket = method + route template + major parameter, like Discord's
+        resource = request.match_info.route.resource
+        template = resource.canonical if resource is not None else request.path
+        info = request.match_info
+        major = info.get("channel_id") or info.get("guild_id") or info.get("token") or ""
+        route_key = f"{request.method} {template.replace(API_PREFIX, '')}"
+        self.request_counts[route_key] += 1
+
+        if self.rest_latency:
+            await asyncio.sleep(self.rest_latency)
+
+        # Interaction responses are not rate limited by Discord either
+        exempt = "/interactions/" in template or "/webhooks/" in template or template.endswith("/gateway/bot")
+        bucket = f"{route_key}:{major}"
+        allowed, remaining, reset_after = self.limiter.hit(bucket)
+        headers = {
+            "X-RateLimit-Bucket": str(abs(hash(route_key))),
+            "X-RateLimit-Limit": str(self.limiter.limit),
+            "X-RateLimit-Remaining": str(remaining),
+            "X-RateLimit-Reset": f"{time.time() + reset_after:.3f}",
+            "X-RateLimit-Reset-After": f"{reset_after:.3f}"
+        }
+        if exempt:
+            return await handler(request)
+        if not allowed:
+            self.rate_limited[route_key] += 1
+            headers["Retry-After"] = f"{reset_after:.3f}"
+            headers["X-RateLimit-Scope"] = "user"
+            return json_response(
+                {"message": "You are being rate limited.", "retry_after": round(reset_after, 3), "global": False},
+                status=429, headers=headers
+            )
+        response = await handler(request)
+        response.headers.update(headers)
+        return response
+
+    async def unhandled_route(self, request):
+        self.unhandled[f"{request.method} /{request.match_info['tail']}"] += 1
+        return json_response({"message": "Unknown route", "code": 0}, status=404)
+
+    async def get_gateway_bot(self, request):
+        return json_response({
+            "url": self.gateway_url,
+            "shards": 1,
+            "session_start_limit": {"total": 1000, "remaining": 1000, "reset_after": 0, "max_concurrency": 1}
+        })
+
+    async def get_me(self, request):
+        return json_response(self.bot_user)
+
+    async def get_application(self, request):
+        return json_response({
+            "id": str(self.application_id),
+            "name": "Discosoft",
+            "icon": None,
+            "description": "",
+            "bot_public": False,
+            "bot_require_code_grant": False,
+            "owner": self.staff_user,
+            "team": None,
+            "verify_key": "0" * 64,
+            "flags": 0,
+            "interactions_endpoint_url": None
+        })
+
+    async def put_commands(self, request):
+        commands = await read_body(request)
+        for command in commands:
+            command.setdefault("id", str(self.snowflake()))
+            command["application_id"] = str(self.application_id)
+            command["version"] = str(self.snowflake())
+        return json_response(commands)
+
+    async def get_user(self, request):
+        user = self.users.get(int(request.match_info["user_id"]))
+        if user is None:
+            return json_response({"message": "Unknown User", "code": 10013}, status=404)
+        return json_response(user)
+
+    async def create_dm(self, request):
+        body = await read_body(request)
+        recipient_id = int(body["recipient_id"])
+        channel = self.dm_channels.get(recipient_id)
+        if channel is None:
+            channel = {
+                "id": str(self.snowflake()),
+                "type": CHANNEL_DM,
+                "recipients": [self.users[recipient_id]],
+                "last_message_id": None
+            }
+            self.dm_channels[recipient_id] = channel
+        return json_response(channel)
+
+    def _channel_or_404(self, request):
+        channel_id = int(request.match_info["channel_id"])
+        channel = self.channels.get(channel_id)
+        if channel is None and not any(int(dm["id"]) == channel_id for dm in self.dm_channels.values()):
+            raise web.HTTPNotFound(body=json.dumps({"message": "Unknown Channel", "code": 10003}).encode(), content_type="application/json")
+        return channel_id, channel
+
+    async def create_channel(self, request):
+        body = await read_body(request)
+        channel_id = self.add_channel(
+            body["name"],
+            body.get("type", CHANNEL_TEXT),
+            parent_id=body.get("parent_id"),
+            overwrites=body.get("permission_overwrites") or []
+        )
+        channel = self.channels[channel_id]
+        await self.dispatch("CHANNEL_CREATE", channel)
+        return json_response(channel)
+
+    async def remove_member(self, user_id):
+        member = self.members.pop(user_id, None)
+        if member is not None:
+            await self.dispatch("GUILD_MEMBER_REMOVE", {"guild_id": str(self.guild_id), "user": member["user"]})
+        return member
+
+    async def edit_member(self, request):
+        member = self.members.get(int(request.match_info["user_id"]))
+        if member is None:
+            return json_response({"message": "Unknown Member", "code": 10007}, status=404)
+        body = await read_body(request)
+        for key in ("nick", "roles", "communication_disabled_until"):
+            if key in body:
+                member[key] = body[key]
+        await self.dispatch("GUILD_MEMBER_UPDATE", dict(member, guild_id=str(self.guild_id)))
+        return json_response(member)
+
+    async def kick_member(self, request):
+        if await self.remove_member(int(request.match_info["user_id"])) is None:
+            return json_response({"message": "Unknown Member", "code": 10007}, status=404)
+        return web.Response(status=204)
+
+    async def ban_member(self, request):
+        user_id = int(request.match_info["user_id"])
+        self.bans.add(user_id)
+        await self.remove_member(user_id)
+        return web.Response(status=204)
+
+    async def bulk_ban(self, request):
+        user_ids = [int(user_id) for user_id in (await read_body(request)).get("user_ids") or []]
+        if not 1 <= len(user_ids) <= 200:
+            return json_response({"message": "Invalid Form Body", "code": 50035}, status=400)
+        banned, failed = [], []
+        for user_id in user_ids:
+            if user_id in self.bans:
+                failed.append(str(user_id))
+                continue
+            self.bans.add(user_id)
+            await self.remove_member(user_id)
+            banned.append(str(user_id))
+        return json_response({"banned_users": banned, "failed_users": failed})
+
+    async def get_channel(self, request):
+        _, channel = self._channel_or_404(request)
+        return json_response(channel)
+
+    async def edit_channel(self, request):
+        _, channel = self._channel_or_404(request)
+        body = await read_body(request)
+        for key in ("name", "parent_id", "permission_overwrites", "topic", "position"):
+            if key in body:
+                channel[key] = body[key]
+        await self.dispatch("CHANNEL_UPDATE", channel)
+        return json_response(channel)
+
+    async def delete_channel(self, request):
+        channel_id, channel = self._channel_or_404(request)
+        self.channels.pop(channel_id, None)
+        self.messages.pop(channel_id, None)
+        await self.dispatch("CHANNEL_DELETE", channel)
+        return json_response(channel)
+
+    async def put_overwrite(self, request):
+        _, channel = self._channel_or_404(request)
+        body = await read_body(request)
+        overwrite_id = request.match_info["overwrite_id"]
+        overwrites = [o for o in channel["permission_overwrites"] if o["id"] != overwrite_id]
+        overwrites.append({
+            "id": overwrite_id,
+            "type": body.get("type", 0),
+            "allow": str(body.get("allow", 0)),
+            "deny": str(body.get("deny", 0))
+        })
+        channel["permission_overwrites"] = overwrites
+        await self.dispatch("CHANNEL_UPDATE", channel)
+        return web.Response(status=204)
+
+    async def delete_overwrite(self, request):
+        _, channel = self._channel_or_404(request)
+        overwrite_id = request.match_info["overwrite_id"]
+        channel["permission_overwrites"] = [o for o in channel["permission_overwrites"] if o["id"] != overwrite_id]
+        await self.dispatch("CHANNEL_UPDATE", channel)
+        return web.Response(status=204)
+
+    async def get_messages(self, request):
+        channel_id, _ = self._channel_or_404(request)
+        limit = int(request.query.get("limit", 50))
+        messages = sorted(self.messages[channel_id].values(), key=lambda m: int(m["id"]), reverse=True)
+        if "before" in request.query:
+            before = int(request.query["before"])
+            messages = [m for m in messages if int(m["id"]) < before]
+        if "after" in request.query:
+            after = int(request.query["after"])
+            messages = [m for m in messages if int(m["id"]) > after]
+        return json_response(messages[:limit])
+
+    async def create_message(self, request):
+        channel_id, channel = self._channel_or_404(request)
+        message = self.message_payload(channel_id, self.bot_user, await read_body(request))
+        if channel is not None:
+            self.messages[channel_id][message["id"]] = message
+            channel["last_message_id"] = message["id"]
+        await self.dispatch("MESSAGE_CREATE", message)
+        return json_response(message)
+
+    async def delete_message(self, request):
+        channel_id, _ = self._channel_or_404(request)
+        message_id = request.match_info["message_id"]
+        if self.messages[channel_id].pop(message_id, None) is None:
+            return json_response({"message": "Unknown Message", "code": 10008}, status=404)
+        await self.dispatch("MESSAGE_DELETE", {"id": message_id, "channel_id": str(channel_id), "guild_id": str(self.guild_id)})
+        return web.Response(status=204)
+
+    async def bulk_delete_messages(self, request):
+        channel_id, _ = self._channel_or_404(request)
+        message_ids = [str(message_id) for message_id in (await read_body(request)).get("messages") or []]
+        if not 2 <= len(message_ids) <= 100:
+            return json_response({"message": "Invalid Form Body", "code": 50035}, status=400)
+        # Like Discord, refuse the whole request if any message is older than 14 days
+        oldest_allowed = (int(time.time() * 1000) - 14 * 24 * 3600 * 1000 - DISCORD_EPOCH) << 22
+        if any(int(message_id) < oldest_allowed for message_id in message_ids):
+            return json_response({"message": "You can only bulk delete messages that are under 14 days old.", "code": 50034}, status=400)
+        for message_id in message_ids:
+            self.messages[channel_id].pop(message_id, None)
+        await self.dispatch("MESSAGE_DELETE_BULK", {"ids": message_ids, "channel_id": str(channel_id), "guild_id": str(self.guild_id)})
+        return web.Response(status=204)
+
+    async def edit_message(self, request):
+        channel_id, _ = self._channel_or_404(request)
+        message = self.messages[channel_id].get(request.match_info["message_id"])
+        if message is None:
+            return json_response({"message": "Unknown Message", "code": 10008}, status=404)
+        message.update({k: v for k, v in (await read_body(request)).items() if k in ("content", "embeds", "components")})
+        message["edited_timestamp"] = now_iso()
+        await self.dispatch("MESSAGE_UPDATE", message)
+        return json_response(message)
+
+    async def interaction_callback(self, request):
+        token = request.match_info["token"]
+        pending = self.pending_interactions.pop(token, None)
+        if pending is None:
+            return json_response({"message": "Unknown interaction", "code": 10062}, status=404)
+        body = await read_body(request)
+        callback_type = body["type"]
+        data = body.get("data") or {}
+
+        resource = {"type": callback_type}
+        message = None
+        if callback_type in (CALLBACK_MESSAGE, CALLBACK_DEFERRED_MESSAGE):
+            # A deferred reply is an empty "thinking" message until edited
+            message = self.message_payload(pending["channel_id"], self.bot_user, data)
+            if not data.get("flags", 0) & EPHEMERAL_FLAG:
+                self.messages[pending["channel_id"]][message["id"]] = message
+        elif callback_type == CALLBACK_UPDATE_MESSAGE and pending["message"] is not None:
+            message = pending["message"]
+            message.update({k: v for k, v in data.items() if k in ("content", "embeds", "components")})
+        if message is not None:
+            resource["message"] = message
+            pending["original"] = message
+            self.pending_interactions[f"original:{token}"] = pending
+
+        if not pending["future"].done():
+            pending["future"].set_result(body)
+        return json_response({
+            "interaction": {
+                "id": token.split("-", 1)[1],
+                "type": INTERACTION_COMPONENT,
+                "response_message_id": message["id"] if message else None,
+                "response_message_loading": callback_type == CALLBACK_DEFERRED_MESSAGE,
+                "response_message_ephemeral": bool(data.get("flags", 0) & EPHEMERAL_FLAG)
+            },
+            "resource": resource
+        })
+
+    async def followup(self, request):
+        message = self.message_payload(0, self.bot_user, await read_body(request))
+        pending = self.pending_interactions.get(f"original:{request.match_info['token']}")
+        if pending is not None and not pending["followup"].done():
+            pending["followup"].set_result(message)
+        return json_response(message)
+
+    def _original(self, request):
+        pending = self.pending_interactions.get(f"original:{request.match_info['token']}")
+        if pending is None:
+            raise web.HTTPNotFound(body=json.dumps({"message": "Unknown Message", "code": 10008}).encode(), content_type="application/json")
+        return pending["original"]
+
+    async def get_original(self, request):
+        return json_response(self._original(request))
+
+    async def edit_original(self, request):
+        message = self._original(request)
+        message.update({k: v for k, v in (await read_body(request)).items() if k in ("content", "embeds", "components")})
+        return json_response(message)
+
+    # --------------------------------------------------------------- lifecycle
+
+    @property
+    def api_base(self):
+        return f"http://127.0.0.1:{self.port}{API_PREFIX}"
+
+    @property
+    def gateway_url(self):
+        return f"ws://127.0.0.1:{self.port}/gateway"
+
+    async def start(self, port=0):
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        for ws in list(self.sockets):
+            await ws.close()
+        if self._runner is not None:
+            await self._runner.cleanup()
@@ -0,0 +1,312 @@
+"""End-to-end load test for the ticket lifecycle, fully offline.
+
+Starts fake_discord.py, runs bot.py against it in the same process and drives
+N concurrent category select -> modal submit -> freeze -> close flows through
+real gateway interactions. Reports p50/p95/p99 latency per step, REST calls per
+ticket, 429s and event-loop lag.
+
+    python loadtest.py --tickets 200 --concurrency 50
+
+The bot runs in a throwaway directory, so the real config.json and tickets.db
+are never touched.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+import yarl
+
+from fake_discord import FakeDiscord, CALLBACK_MODAL, INTERACTION_COMPONENT, INTERACTION_MODAL_SUBMIT
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+STEPS = ["kategori", "form", "dondur", "kapat", "arsiv", "toplam"]
+CHANNEL_MENTION = re.compile(r"<#(\d+)>")
+
+# The bot turned the request away (open ticket or rate limit) instead of failing
+class Rejected(Exception):
+    pass
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))]
+
+# Measures how late a periodic sleep wakes up; anything blocking the loop shows up here
+class LoopLagMonitor:
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.samples = []
+        self._task = None
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append((time.perf_counter() - started - self.interval) * 1000)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+
+# Resolves futures when a gateway dispatch matches, e.g. "welcome message posted"
+class EventWaiter:
+    def __init__(self, server):
+        self.waiters = []
+        server.listeners.append(self._on_event)
+
+    def _on_event(self, event, data):
+        for waiter in list(self.waiters):
+            predicate, future = waiter
+            if not future.done() and predicate(event, data):
+                future.set_result(data)
+                self.waiters.remove(waiter)
+
+    def wait(self, predicate):
+        future = asyncio.get_running_loop().create_future()
+        self.waiters.append((predicate, future))
+        return future
+
+def modal_submission(modal, answers):
+    rows = []
+    for component in modal["components"]:
+        if component["type"] == 1:
+            inputs = component["components"]
+            rows.append({"type": 1, "components": [
+                {"type": 4, "custom_id": c["custom_id"], "value": answers.get(c["custom_id"], "test")} for c in inputs
+            ]})
+        elif component["type"] == 18:
+            inner = component["component"]
+            rows.append({"type": 18, "component": {
+                "type": 4, "custom_id": inner["custom_id"], "value": answers.get(inner["custom_id"], "test")
+            }})
+    return {"custom_id": modal["custom_id"], "components": rows}
+
+async def run_flow(server, waiter, user, category, timeout, timings):
+    flow_started = time.perf_counter()
+
+    async def step(name, coro):
+        started = time.perf_counter()
+        result = await asyncio.wait_for(coro, timeout)
+        timings[name].append((time.perf_counter() - started) * 1000)
+        return result
+
+    # 1. Pick a category; the bot answers with the ticket form
+    callback = await step("kategori", server.interact(
+        INTERACTION_COMPONENT, user, server.panel_channel,
+        {"custom_id": "category_select", "component_type": 3, "values": [category]}
+    ))
+    if callback["type"] != CALLBACK_MODAL:
+        raise Rejected(callback["data"].get("content"))
+    modal = callback["data"]
+
+    # 2. Submit the form; the bot defers, creates the channel and follows up with its mention
+    callback = await step("form", server.interact(
+        INTERACTION_MODAL_SUBMIT, user, server.panel_channel,
+        modal_submission(modal, {
+            "first_name": user["username"],
+            "last_name": "Test",
+            "email": f"{user['username']}@example.com",
+            "reason": "Yük testi"
+        }),
+        follow_deferred=True
+    ))
+    mention = CHANNEL_MENTION.search(callback["data"].get("content") or "")
+    if mention is None or "oluşturuldu" not in callback["data"]["content"]:
+        raise Rejected(callback["data"].get("content"))
+    channel_id = int(mention.group(1))
+
+    # The control buttons live on the welcome message, which is posted in the background
+    def is_welcome(event, data):
+        return event == "MESSAGE_CREATE" and int(data["channel_id"]) == channel_id and data["components"]
+    welcome = next((m for m in server.messages[channel_id].values() if m["components"]), None)
+    if welcome is None:
+        welcome = await asyncio.wait_for(waiter.wait(is_welcome), timeout)
+
+    # 3. Staff freezes the ticket
+    await step("dondur", server.interact(
+        INTERACTION_COMPONENT, server.staff_user, channel_id,
+        {"custom_id": f"freeze_ticket:{channel_id}", "component_type": 2}, message=welcome
+    ))
+
+    # 4. Staff closes it; archiving runs once the close delay has passed
+    archived = waiter.wait(lambda event, data: int(data.get("id", 0)) == channel_id and (
+        event == "CHANNEL_DELETE" or (event == "CHANNEL_UPDATE" and data.get("parent_id") is not None)
+    ))
+    await step("kapat", server.interact(
+        INTERACTION_COMPONENT, server.staff_user, channel_id,
+        {"custom_id": f"close_ticket:{channel_id}", "component_type": 2}, message=welcome
+    ))
+    await step("arsiv", archived)
+    timings["toplam"].append((time.perf_counter() - flow_started) * 1000)
+
+async def run(args):
+    server = FakeDiscord(
+        users=args.tickets,
+        rest_latency=args.rest_latency_ms / 1000,
+        bucket_limit=args.bucket_limit,
+        bucket_window=args.bucket_window
+    )
+    await server.start()
+
+    workdir = tempfile.mkdtemp(prefix="discosoft-yuk-")
+    with open(os.path.join(workdir, "config.json"), "w") as f:
+        json.dump({"token": "fake-token", "transcript_trace_memory": args.trace_memory}, f)
+    previous_cwd = os.getcwd()
+    os.chdir(workdir)
+    sys.path.insert(0, REPO_DIR)
+
+    import discord
+    import bot as discosoft
+
+    # bot.run() would set this up; errors inside handlers should stay visible
+    discord.utils.setup_logging(level=logging.WARNING)
+    discord.http.Route.BASE = server.api_base
+    discord.gateway.DiscordWebSocket.DEFAULT_GATEWAY = yarl.URL(server.gateway_url)
+    discosoft.CLOSE_DELAY = args.close_delay
+
+    # What /kurulum would have stored for the fake guild
+    guild_config = discosoft.guild_configs.get(server.guild_id)
+    guild_config.update({
+        "ticket_channel_id": server.panel_channel,
+        "staff_role_id": server.staff_role,
+        "ticket_log_channel_id": server.log_channel,
+        "archive_category_id": server.archive_category,
+        "category_roles": {"Genel Destek": str(server.support_role)}
+    })
+    discosoft.guild_configs.save(server.guild_id)
+
+    lag = LoopLagMonitor()
+    waiter = EventWaiter(server)
+    bot_task = asyncio.create_task(discosoft.bot.start("fake-token"))
+    try:
+        ready = asyncio.create_task(discosoft.bot.wait_until_ready())
+        await asyncio.wait({ready, bot_task}, timeout=30, return_when=asyncio.FIRST_COMPLETED)
+        if bot_task.done():
+            # Login or gateway failure: surface the bot's own exception
+            bot_task.result()
+        if not ready.done():
+            raise TimeoutError("Bot taklit sunucuya 30 sn içinde bağlanamadı")
+
+        # Only count traffic generated by the ticket flows
+        server.request_counts.clear()
+        server.rate_limited.clear()
+        lag.start()
+
+        timings = defaultdict(list)
+        failures = []
+        rejected = []
+        semaphore = asyncio.Semaphore(args.concurrency)
+        categories = [c["name"] for c in discosoft.TICKET_CATEGORIES]
+
+        async def guarded(index, user):
+            async with semaphore:
+                try:
+                    await run_flow(server, waiter, user, categories[index % len(categories)], args.timeout, timings)
+                except Rejected as e:
+                    rejected.append(str(e))
+                except Exception as e:
+                    failures.append(f"{user['username']}: {type(e).__name__} {e}")
+
+        started = time.perf_counter()
+        await asyncio.gather(*(guarded(i, user) for i, user in enumerate(server.customers)))
+        elapsed = time.perf_counter() - started
+
+        # Let background work (welcome messages, DMs, log batches, transcripts)
+        # finish: wait until the fake server has been quiet for `settle` seconds
+        quiet_since = time.perf_counter()
+        seen = sum(server.request_counts.values())
+        while time.perf_counter() - quiet_since < args.settle and time.perf_counter() - started < elapsed + 120:
+            await asyncio.sleep(0.25)
+            total = sum(server.request_counts.values())
+            if total != seen:
+                seen, quiet_since = total, time.perf_counter()
+        lag.stop()
+        report(args, server, timings, failures, rejected, lag.samples, elapsed)
+    finally:
+        await discosoft.bot.close()
+        bot_task.cancel()
+        await server.stop()
+        os.chdir(previous_cwd)
+        if args.keep:
+            print(f"Çalışma dizini: {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+def report(args, server, timings, failures, rejected, lag_samples, elapsed):
+    completed = len(timings["toplam"])
+    total_requests = sum(server.request_counts.values())
+    print()
+    print(f"{completed}/{args.tickets} talep tamamlandı, {elapsed:.1f} sn ({completed / elapsed:.1f} talep/sn)")
+    print(f"{'adım':<10}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}  (ms)")
+    for name in STEPS:
+        values = timings[name]
+        print(f"{name:<10}" + "".join(f"{percentile(values, p):>10.1f}" for p in (50, 95, 99, 100)))
+    print()
+    print(f"REST çağrısı: {total_requests} toplam, talep başına {total_requests / max(completed, 1):.1f}")
+    for route, count in server.request_counts.most_common(12):
+        limited = server.rate_limited.get(route, 0)
+        print(f"  {count:>6}  {route}" + (f"  ({limited} x 429)" if limited else ""))
+    print(f"429 yanıtı: {sum(server.rate_limited.values())}")
+    print(
+        f"Olay döngüsü gecikmesi: p50 {percentile(lag_samples, 50):.1f} ms, "
+        f"p99 {percentile(lag_samples, 99):.1f} ms, max {percentile(lag_samples, 100):.1f} ms"
+    )
+    if server.unhandled:
+        print(f"Taklit sunucuda karşılanmayan rotalar: {dict(server.unhandled)}")
+    if rejected:
+        print(f"{len(rejected)} talep bot tarafından reddedildi (açık talep / hız sınırı), örn. {rejected[0]!r}")
+    if failures:
+        print(f"{len(failures)} akış başarısız oldu:")
+        for failure in failures[:10]:
+            print(f"  {failure}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({
+                "tickets": args.tickets,
+                "completed": completed,
+                "elapsed_seconds": elapsed,
+                "latency_ms": {
+                    name: {f"p{p}": percentile(timings[name], p) for p in (50, 95, 99, 100)} for name in STEPS
+                },
+                "rest_calls": dict(server.request_counts),
+                "rest_calls_per_ticket": total_requests / max(completed, 1),
+                "rate_limited": dict(server.rate_limited),
+                "loop_lag_ms": {f"p{p}": percentile(lag_samples, p) for p in (50, 99, 100)},
+                "rejected": len(rejected),
+                "failures": failures
+            }, f, indent=2, ensure_ascii=False)
+
+def main():
+    parser = argparse.ArgumentParser(description="Talep yaşam döngüsü yük testi (çevrimdışı)")
+    parser.add_argument("--tickets", type=int, default=100, help="açılacak talep sayısı")
+    parser.add_argument("--concurrency", type=int, default=25, help="aynı anda çalışan akış sayısı")
+    parser.add_argument("--close-delay", type=float, default=0, help="kapatma gecikmesi (bot varsayılanı 5 sn)")
+    parser.add_argument("--rest-latency-ms", type=float, default=20, help="taklit REST yanıt gecikmesi")
+    parser.add_argument("--bucket-limit", type=int, default=10, help="rate limit kovası başına istek sayısı")
+    parser.add_argument("--bucket-window", type=float, default=1.0, help="rate limit penceresi (sn)")
+    parser.add_argument("--timeout", type=float, default=60, help="adım başına zaman aşımı (sn)")
+    parser.add_argument("--settle", type=float, default=3, help="arka plan işlerinin bittiği sayılması için gereken sessiz süre (sn)")
+    parser.add_argument("--trace-memory", action="store_true", help="transkript dışa aktarımlarının en yüksek belleğini ölç (tracemalloc, yavaşlatır)")
+    parser.add_argument("--json", help="sonuçları bu dosyaya JSON olarak yaz")
+    parser.add_argument("--keep", action="store_true", help="geçici çalışma dizinini silme")
+    args = parser.parse_args()
+    if args.json:
+        # The bot runs in a temporary directory; resolve against the caller's
+        args.json = os.path.abspath(args.json)
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
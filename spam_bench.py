@@ -0,0 +1,130 @@
+"""Memory use and per-message cost of the spam detector, fully offline.
+
+    python spam_bench.py --users 1000 10000 100000
+
+For every user count, that many members each post a few messages, spread
+over less time than the detector's longest window so nobody is evicted
+early. Memory is the detector's live allocation (tracemalloc) once everyone
+is tracked; cost is measured in a separate run without tracemalloc. A second
+round then lets the first crowd go idle and sends an equally large, new crowd
+through the same detector: tracked members and memory should stay where they
+were. Finally a few scripted floods check that each kind is still caught.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+GUILDS = 10
+CHANNELS_PER_GUILD = 20
+
+def load_detector_class():
+    # bot.py sets itself up on import (config.json, tickets.db); keep that out of the repo
+    workdir = tempfile.mkdtemp(prefix="discosoft-spam-")
+    with open(os.path.join(workdir, "config.json"), "w") as f:
+        json.dump({"token": "fake-token"}, f)
+    os.chdir(workdir)
+    sys.path.insert(0, REPO_DIR)
+    import bot
+    return bot.SpamDetector, workdir
+
+def make_traffic(users, per_user, spread, start, seed):
+    """(guild, user, channel, content, now) tuples, time-ordered, user ids offset by `seed`."""
+    rng = random.Random(seed)
+    sentences = [f"mesaj {i} " + "kelime " * (i % 12) for i in range(5000)]
+    guilds = [(1 << 40) + g for g in range(GUILDS)]
+    channels = {guild: [(guild << 22) + (c << 22) * 7919 for c in range(CHANNELS_PER_GUILD)] for guild in guilds}
+    traffic = []
+    for index in range(users):
+        user_id = (seed << 32) + index
+        guild = guilds[index % GUILDS]
+        for _ in range(per_user):
+            traffic.append((guild, user_id, rng.choice(channels[guild]), rng.choice(sentences), start + rng.random() * spread))
+    traffic.sort(key=lambda message: message[4])
+    return traffic
+
+def feed(detector, traffic):
+    observe = detector.observe
+    hits = 0
+    for guild, user, channel, content, now in traffic:
+        if observe(guild, user, channel, content, now):
+            hits += 1
+    return hits
+
+def measure(detector_class, users, args):
+    traffic = make_traffic(users, args.per_user, args.spread, 0.0, seed=1)
+
+    # Cost: a clean run without tracemalloc slowing every allocation down
+    detector = detector_class(max_users=args.max_users)
+    started = time.perf_counter()
+    hits = feed(detector, traffic)
+    cost = (time.perf_counter() - started) / len(traffic)
+
+    later = detector.horizon_ms / 1000 + args.spread + 1
+    next_crowd = make_traffic(users, args.per_user, args.spread, later, seed=2)
+
+    # Memory: live allocations while the same traffic is being tracked
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    detector = detector_class(max_users=args.max_users)
+    feed(detector, traffic)
+    memory = tracemalloc.get_traced_memory()[0] - baseline
+
+    # Idle crowd out, new crowd in: evicted state must be given back
+    feed(detector, next_crowd)
+    memory_after = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    return len(traffic), cost, memory, len(detector), memory_after, detector.evicted, hits
+
+def check_floods(detector_class):
+    detector = detector_class()
+    guild, channels = 1 << 40, [((1 << 40) + c) << 22 for c in range(5)]
+    verdicts = {}
+
+    def record(name, verdict):
+        verdicts[name] = verdicts.get(name) or verdict
+
+    # Ten different messages in two seconds
+    for i in range(10):
+        record("hız", detector.observe(guild, 1, channels[0], f"farklı {i}", now=100 + i * 0.2))
+    # The same text every four seconds in one channel
+    for i in range(4):
+        record("tekrar", detector.observe(guild, 2, channels[0], "Bedava  NITRO burada", now=100 + i * 4))
+    # The same text once in each of three channels
+    for i in range(3):
+        record("kanallar", detector.observe(guild, 3, channels[i], "reklam", now=100 + i * 2))
+    # A normal conversation
+    for i in range(6):
+        record("normal", detector.observe(guild, 4, channels[i % 2], f"cevap {i}", now=100 + i * 8))
+    return verdicts
+
+def main():
+    parser = argparse.ArgumentParser(description="Spam dedektörü bellek ve mesaj başı maliyet ölçümü (çevrimdışı)")
+    parser.add_argument("--users", type=int, nargs="+", default=[1000, 10000, 100000], help="aktif üye sayıları")
+    parser.add_argument("--per-user", type=int, default=3, help="üye başına mesaj")
+    parser.add_argument("--spread", type=float, default=20, help="mesajların yayıldığı süre (sn, simüle)")
+    parser.add_argument("--max-users", type=int, default=100000, help="dedektörün izlediği en fazla üye")
+    args = parser.parse_args()
+
+    detector_class, workdir = load_detector_class()
+    try:
+        print(f"{'üye':>8}{'mesaj':>9}{'µs/mesaj':>10}{'bellek':>10}{'B/üye':>7}"
+              f"{'izlenen':>10}{'sonra':>10}{'çıkarılan':>11}{'spam':>6}")
+        for users in args.users:
+            messages, cost, memory, tracked, memory_after, evicted, hits = measure(detector_class, users, args)
+            print(f"{users:>8}{messages:>9}{cost * 1e6:>10.2f}{memory / 2**20:>8.1f}MB{memory / users:>7.0f}"
+                  f"{tracked:>10}{memory_after / 2**20:>8.1f}MB{evicted:>11}{hits:>6}")
+        print()
+        print("Senaryolar:", ", ".join(f"{name}: {verdict or 'temiz'}" for name, verdict in check_floods(detector_class).items()))
+    finally:
+        os.chdir(REPO_DIR)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()